@@ -1,10 +1,25 @@
 from sanic import Sanic
-from sanic.response import text
+from sanic.response import json, text, stream, HTTPResponse
 from sanic_mongodb_ext import MongoDbExtension
 from sanic_amqp_ext import AmqpExtension
 
+from app.metrics import WorkerMetrics
+from app.statistics.cache import StatisticsCache
+from app.statistics.candidates import CandidateSearch
+from app.statistics.export import StatisticsExporter
+from app.statistics.history import RatingHistory
+from app.statistics.indexes import IndexManager
+from app.statistics.leaderboard import Leaderboard
+from app.statistics.ratings import RatingIndex
+from app.statistics.reader import StatisticsReader
+from app.statistics.repositories import MotorStatisticsRepository, MemoryStatisticsRepository, \
+    MotorRatingHistoryRepository, MemoryRatingHistoryRepository
+from app.statistics.windows import StatisticsWindows
 from app.workers import InitPlayerStatisticsWorker, RetrievePlayerStatisticsWorker, \
-    UpdatePlayerStatisticsWorker
+    BatchRetrievePlayerStatisticsWorker, UpdatePlayerStatisticsWorker, RecordMatchResultWorker, \
+    LeaderboardWorker, SearchByRatingWorker
+from app.workers.connection import AmqpConnectionManager
+from app.workers.events import StatisticsEventPublisher
 
 
 app = Sanic('microservice-player-statistics')
@@ -15,10 +30,103 @@ app.config.from_envvar('APP_CONFIG_PATH')
 AmqpExtension(app)
 MongoDbExtension(app)
 
+# Storage of the statistics, used by the workers and the leaderboard
+if app.config["STATISTICS_STORAGE"] == 'memory':
+    app.statistics_repository = MemoryStatisticsRepository()
+    app.rating_history_repository = MemoryRatingHistoryRepository()
+else:
+    app.statistics_repository = MotorStatisticsRepository()
+    app.rating_history_repository = MotorRatingHistoryRepository()
+
+# Statistics served over HTTP with the caching headers
+app.statistics_reader = StatisticsReader(app)
+
+# Streaming export of all statistics
+app.statistics_exporter = StatisticsExporter(app, batch_size=app.config["EXPORT_BATCH_SIZE"])
+
+# Counters of the current day, week and season next to the lifetime statistics
+app.statistics_windows = StatisticsWindows(
+    names=[name.strip() for name in app.config["STATISTICS_WINDOWS"].split(',') if name.strip()],
+    season_start=app.config["SEASON_START"],
+    season_length=app.config["SEASON_LENGTH"],
+)
+
+# Rating of the players over time, recorded by the workers
+app.rating_history = RatingHistory(
+    app,
+    bucket_size=app.config["RATING_HISTORY_BUCKET_SIZE"],
+    max_pending=app.config["RATING_HISTORY_MAX_PENDING"],
+)
+
+# Worker metrics, exposed in the Prometheus text format
+app.metrics = WorkerMetrics()
+
+# In-process cache for the retrieved statistics
+app.statistics_cache = StatisticsCache(
+    max_size=app.config["STATISTICS_CACHE_MAX_SIZE"],
+    ttl=app.config["STATISTICS_CACHE_TTL"],
+)
+
+# In-memory leaderboard, reloaded from the database in the background
+app.rating_index = RatingIndex()
+app.leaderboard = Leaderboard(
+    app,
+    app.rating_index,
+    refresh_interval=app.config["RATING_INDEX_REFRESH_INTERVAL"],
+)
+app.candidate_search = CandidateSearch(app, app.rating_index)
+
+# Declared indexes, checked (and created if needed) in the background on start
+app.index_manager = IndexManager(
+    app,
+    documents=[] if app.config["STATISTICS_STORAGE"] == 'memory' else None,
+    ensure=app.config["MONGODB_ENSURE_INDEXES"],
+    retry_interval=app.config["MONGODB_INDEXES_CHECK_INTERVAL"],
+)
+
 # RabbitMQ workers
+app.amqp_connection = AmqpConnectionManager(
+    app,
+    min_delay=app.config["AMQP_RECONNECT_MIN_DELAY"],
+    max_delay=app.config["AMQP_RECONNECT_MAX_DELAY"],
+)
 app.amqp.register_worker(InitPlayerStatisticsWorker(app))
 app.amqp.register_worker(RetrievePlayerStatisticsWorker(app))
+app.amqp.register_worker(BatchRetrievePlayerStatisticsWorker(app))
 app.amqp.register_worker(UpdatePlayerStatisticsWorker(app))
+app.amqp.register_worker(RecordMatchResultWorker(app))
+app.amqp.register_worker(LeaderboardWorker(app))
+app.amqp.register_worker(SearchByRatingWorker(app))
+
+# Events about the changed statistics, published for the written statistics
+app.statistics_events = StatisticsEventPublisher(
+    app,
+    window=app.config["STATISTICS_EVENTS_WINDOW"] / 1000.0,
+    max_players=app.config["STATISTICS_EVENTS_MAX_PLAYERS"],
+    enabled=app.config["STATISTICS_EVENTS_ENABLED"],
+)
+
+
+# Cleared by the consumer-only processes (see `RunConsumersCommand`)
+app.serves_http = True
+
+
+@app.listener('after_server_start')
+async def start_background_tasks(app, loop):
+    if app.serves_http:
+        app.index_manager.start()
+        app.leaderboard.start()
+    # Only the processes with the workers write the statistics
+    if app.amqp.workers:
+        loop.create_task(app.statistics_events.run())
+
+
+@app.listener('before_server_stop')
+async def stop_background_tasks(app, loop):
+    await app.amqp_connection.shutdown(app.config["AMQP_SHUTDOWN_TIMEOUT"])
+    await app.rating_history.flush()
+    app.leaderboard.stop()
+    app.index_manager.stop()
 
 
 # Public API
@@ -26,5 +134,76 @@ async def health_check(request):
     return text('OK')
 
 
+async def readiness(request):
+    index_manager = request.app.index_manager
+    if not index_manager.ready:
+        return json({'missing_indexes': index_manager.missing}, status=503)
+    return text('OK')
+
+
+async def cache_stats(request):
+    return json(request.app.statistics_cache.stats())
+
+
+async def metrics(request):
+    return HTTPResponse(
+        request.app.metrics.render(),
+        content_type=request.app.metrics.CONTENT_TYPE
+    )
+
+
+async def leaderboard(request):
+    result = request.app.leaderboard.schema.load(request.raw_args)
+    if result.errors:
+        return json({'error': result.errors}, status=400)
+
+    return json(await request.app.leaderboard.get_leaderboard(**result.data))
+
+
+async def player_statistic(request, player_id):
+    return await request.app.statistics_reader.get_player_statistic(request, player_id)
+
+
+async def player_statistics(request):
+    return await request.app.statistics_reader.get_player_statistics(request)
+
+
+async def rating_history(request, player_id):
+    history = request.app.rating_history
+    result = history.schema.load(dict(request.raw_args, player_id=player_id))
+    if result.errors:
+        return json({'error': result.errors}, status=400)
+
+    return json(await history.get_history(**result.data))
+
+
+async def export_statistics(request):
+    exporter = request.app.statistics_exporter
+    result = exporter.schema.load(request.raw_args)
+    if result.errors:
+        return json({'error': result.errors}, status=400)
+
+    async def write_rows(response):
+        await exporter.export(response.write, **result.data)
+
+    return stream(write_rows, content_type=exporter.CONTENT_TYPES[result.data['export_format']])
+
+
 app.add_route(health_check, '/player-statistics/api/health-check',
               methods=['GET', ], name='health-check')
+app.add_route(readiness, '/player-statistics/api/readiness',
+              methods=['GET', ], name='readiness')
+app.add_route(cache_stats, '/player-statistics/api/cache-stats',
+              methods=['GET', ], name='cache-stats')
+app.add_route(metrics, '/player-statistics/api/metrics',
+              methods=['GET', ], name='metrics')
+app.add_route(leaderboard, '/player-statistics/api/leaderboard',
+              methods=['GET', ], name='leaderboard')
+app.add_route(player_statistic, '/player-statistics/api/statistics/<player_id>',
+              methods=['GET', ], name='player-statistic')
+app.add_route(player_statistics, '/player-statistics/api/statistics',
+              methods=['GET', ], name='player-statistics')
+app.add_route(rating_history, '/player-statistics/api/statistics/<player_id>/history',
+              methods=['GET', ], name='rating-history')
+app.add_route(export_statistics, '/player-statistics/api/export',
+              methods=['GET', ], name='export')
@@ -0,0 +1,34 @@
+import asyncio
+from sanic_script import Command, Option
+
+from app import app
+from app.commands.utils import init_database
+from app.statistics.indexes import IndexManager
+
+
+class EnsureIndexesCommand(Command):
+    """
+    Create the missing indexes of the documents in the database.
+    """
+    app = app
+
+    option_list = (
+        Option('--check', '-c', dest='check', action='store_true', default=False,
+               help='Only report the missing indexes without creating them'),
+    )
+
+    def run(self, *args, **kwargs):
+        client = init_database(self.app)
+        loop = asyncio.get_event_loop()
+        manager = IndexManager(self.app, ensure=not kwargs.get('check', False))
+        missing = loop.run_until_complete(manager.verify())
+        client.close()
+        loop.close()
+
+        for collection_name, index_names in missing.items():
+            print("Missing indexes in the {} collection: {}".format(
+                collection_name, ', '.join(index_names)
+            ))
+        if missing:
+            raise SystemExit(1)
+        print("All indexes are in place.")
@@ -0,0 +1,53 @@
+import asyncio
+import sys
+
+from bson import ObjectId
+from sanic_script import Command, Option
+
+from app import app
+from app.commands.utils import init_database
+
+
+class ExportStatisticsCommand(Command):
+    """
+    Export the statistics of all players as NDJSON or CSV.
+    """
+    app = app
+
+    option_list = (
+        Option('--output', '-o', dest='output', default='-',
+               help='Output file, standard output by default'),
+        Option('--format', '-f', dest='export_format', default='ndjson',
+               choices=['ndjson', 'csv']),
+        Option('--after', '-a', dest='after', default=None,
+               help='Resume token: continue after the document with this id. '
+                    'Rows are appended to the output file then'),
+    )
+
+    def run(self, *args, **kwargs):
+        after_id = ObjectId(kwargs['after']) if kwargs.get('after', None) else None
+        path = kwargs.get('output', '-')
+        if path == '-':
+            output = sys.stdout
+        else:
+            output = open(path, 'a' if after_id else 'w', encoding='utf-8')
+
+        async def write(data):
+            output.write(data)
+
+        client = init_database(self.app)
+        loop = asyncio.get_event_loop()
+        try:
+            count, last_id = loop.run_until_complete(self.app.statistics_exporter.export(
+                write,
+                export_format=kwargs.get('export_format', 'ndjson'),
+                after_id=after_id,
+                with_header=after_id is None
+            ))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+            client.close()
+            loop.close()
+
+        print("Exported {} documents. Resume token: {}".format(count, last_id), file=sys.stderr)
@@ -0,0 +1,73 @@
+import asyncio
+import sys
+import time
+
+from sanic_script import Command, Option
+
+from app import app
+from app.commands.utils import init_database
+from app.statistics.importer import StatisticsImporter
+
+
+class ImportStatisticsCommand(Command):
+    """
+    Import the statistics of players from a NDJSON or CSV file.
+    """
+    app = app
+
+    option_list = (
+        Option('--input', '-i', dest='input', default='-',
+               help='Input file, standard input by default'),
+        Option('--format', '-f', dest='import_format', default=None,
+               choices=['ndjson', 'csv'],
+               help='Format of the input, by the file extension (or ndjson) by default'),
+        Option('--batch-size', '-b', dest='batch_size', type=int, default=None,
+               help='Records written at once (IMPORT_BATCH_SIZE by default)'),
+        Option('--concurrency', '-c', dest='concurrency', type=int, default=None,
+               help='Bulk writes running at the same time (IMPORT_CONCURRENCY by default)'),
+        Option('--progress-interval', dest='progress_interval', type=float, default=5.0,
+               help='Seconds between the progress reports'),
+    )
+
+    def get_format(self, path, import_format):
+        if import_format:
+            return import_format
+        return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+    def run(self, *args, **kwargs):
+        path = kwargs.get('input', '-')
+        importer = StatisticsImporter(
+            self.app,
+            batch_size=kwargs.get('batch_size', None) or self.app.config["IMPORT_BATCH_SIZE"],
+            concurrency=kwargs.get('concurrency', None) or self.app.config["IMPORT_CONCURRENCY"],
+        )
+        progress_interval = kwargs.get('progress_interval', 5.0)
+        last_report = [time.perf_counter()]
+
+        def on_progress(stats):
+            if time.perf_counter() - last_report[0] >= progress_interval:
+                last_report[0] = time.perf_counter()
+                print("Progress: {}".format(stats), file=sys.stderr)
+
+        def on_error(record_number, errors):
+            print("Invalid record #{}: {}".format(record_number, errors), file=sys.stderr)
+
+        lines = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        client = init_database(self.app)
+        loop = asyncio.get_event_loop()
+        try:
+            stats = loop.run_until_complete(importer.import_lines(
+                lines,
+                import_format=self.get_format(path, kwargs.get('import_format', None)),
+                on_progress=on_progress,
+                on_error=on_error
+            ))
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+            client.close()
+            loop.close()
+
+        print("Done: {}".format(stats), file=sys.stderr)
+        if stats.invalid:
+            raise SystemExit(1)
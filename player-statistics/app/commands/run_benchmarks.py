@@ -0,0 +1,55 @@
+import asyncio
+from sanic_script import Command, Option
+
+from app import app
+
+
+class RunBenchmarksCommand(Command):
+    """
+    Run the workers benchmark with in-process MongoDB and RabbitMQ stand-ins.
+    """
+    app = app
+
+    option_list = (
+        Option('--messages', '-n', dest='messages', type=int, default=10000,
+               help='Amount of the processed messages'),
+        Option('--concurrency', '-c', dest='concurrency', type=int, default=64,
+               help='Amount of the messages processed at the same time'),
+        Option('--mix', '-m', dest='mix', default=None,
+               help='Message kinds with weights, e.g. "retrieve=80,update=20"'),
+        Option('--players', '-p', dest='players', type=int, default=10000,
+               help='Amount of the players created before the run'),
+        Option('--db-latency', '-l', dest='db_latency', type=float, default=0.0,
+               help='Delay of each database call, in milliseconds'),
+        Option('--storage', '-s', dest='storage', default='mongodb',
+               choices=['mongodb', 'memory'],
+               help='Statistics repository: MongoDB stand-in or the in-memory one '
+                    '(the database latency is not applied)'),
+        Option('--update-mode', '-u', dest='update_mode', default=None,
+               help='Overrides the UPDATE_STATISTICS_MODE setting'),
+        Option('--no-rating-index', dest='use_rating_index', action='store_false', default=True,
+               help="Don't load the in-memory rating index"),
+        Option('--seed', dest='seed', type=int, default=None,
+               help='Seed for the generated messages'),
+    )
+
+    def run(self, *args, **kwargs):
+        from benchmarks.workers import DEFAULT_MIX, run_benchmark, format_results
+
+        if kwargs.get('update_mode', None):
+            self.app.config["UPDATE_STATISTICS_MODE"] = kwargs['update_mode']
+
+        loop = asyncio.get_event_loop()
+        results = loop.run_until_complete(run_benchmark(
+            self.app,
+            messages=kwargs['messages'],
+            concurrency=kwargs['concurrency'],
+            mix=kwargs.get('mix', None) or DEFAULT_MIX,
+            players=kwargs['players'],
+            db_latency=kwargs['db_latency'] / 1000.0,
+            use_rating_index=kwargs['use_rating_index'],
+            seed=kwargs.get('seed', None),
+            storage=kwargs['storage'],
+        ))
+        loop.close()
+        print(format_results(results))
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import signal
+from inspect import isawaitable
+from multiprocessing import Process
+
+from sanic_script import Command, Option
+
+from app import app
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RunConsumersCommand(Command):
+    """
+    Run the AMQP workers without the HTTP server.
+
+    Each of the started processes runs the selected workers, so the consumers
+    of the busy queues can be scaled apart from the web server (which can be
+    started with `run --no-consumers` then). The background tasks of the web
+    server (the index verification and the leaderboard reloads) aren't
+    started in these processes.
+    """
+    app = app
+
+    option_list = (
+        Option('--processes', '-n', dest='processes', type=int, default=None,
+               help='Amount of the consumer processes (CONSUMER_PROCESSES by default)'),
+        Option('--workers', '-w', dest='workers', default=None,
+               help='Comma-separated worker names, e.g. "retrieve,update" '
+                    '(CONSUMER_WORKERS by default, all workers if empty)'),
+    )
+
+    def select_workers(self, names):
+        workers = {worker.name: worker for worker in self.app.amqp.workers}
+        if not names:
+            return list(workers.values())
+
+        unknown = set(names) - set(workers)
+        if unknown:
+            raise SystemExit("Unknown workers: {}. Available: {}.".format(
+                ', '.join(sorted(unknown)), ', '.join(sorted(workers))
+            ))
+        return [workers[name] for name in names]
+
+    def register_workers(self, workers):
+        # The extension starts each registered worker
+        self.app.amqp.workers[:] = workers
+        self.app.serves_http = False
+
+    def trigger_listeners(self, event_name, loop, reverse=False):
+        # The same lifecycle as for the server, so the extensions are set up and freed
+        listeners = list(self.app.listeners[event_name])
+        if reverse:
+            listeners.reverse()
+        for listener in listeners:
+            result = listener(self.app, loop)
+            if isawaitable(result):
+                loop.run_until_complete(result)
+
+    def serve(self, workers):
+        # Forked processes inherit the handlers of the parent process
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.register_workers(workers)
+        self.app.is_running = True
+
+        self.trigger_listeners('before_server_start', loop)
+        self.trigger_listeners('after_server_start', loop)
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, loop.stop)
+        LOGGER.info("Consuming messages with the workers: {}".format(
+            ', '.join(worker.name for worker in workers)
+        ))
+        loop.run_forever()
+
+        # Repeated signals must not interrupt the drain of the in-flight requests
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signal_number)
+            signal.signal(signal_number, signal.SIG_IGN)
+        self.trigger_listeners('before_server_stop', loop, reverse=True)
+        self.trigger_listeners('after_server_stop', loop, reverse=True)
+        self.app.is_running = False
+
+        # For example, the workers still waiting for the broker
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+    def serve_multiple(self, workers, processes):
+        def stop_processes(signal_number, _frame):
+            LOGGER.info("Received signal {}. Shutting down.".format(
+                signal.Signals(signal_number).name
+            ))
+            for process in started_processes:
+                process.terminate()
+
+        started_processes = []
+        signal.signal(signal.SIGINT, stop_processes)
+        signal.signal(signal.SIGTERM, stop_processes)
+        for _ in range(processes):
+            process = Process(target=self.serve, args=(workers, ))
+            process.daemon = True
+            process.start()
+            started_processes.append(process)
+
+        for process in started_processes:
+            process.join()
+
+    def run(self, *args, **kwargs):
+        names = kwargs.get('workers', None)
+        if names is None:
+            names = self.app.config["CONSUMER_WORKERS"]
+        processes = kwargs.get('processes', None) or self.app.config["CONSUMER_PROCESSES"]
+
+        workers = self.select_workers([name.strip() for name in names.split(',') if name.strip()])
+        if processes > 1:
+            self.serve_multiple(workers, processes)
+        else:
+            self.serve(workers)
@@ -14,6 +14,8 @@ class RunServerCommand(Command):
     option_list = (
         Option('--host', '-h', dest='host'),
         Option('--port', '-p', dest='port'),
+        Option('--no-consumers', dest='consumers', action='store_false', default=True,
+               help="Don't run the AMQP workers (use the `consume` command for them)"),
     )
 
     def register_microservice(self):
@@ -25,6 +27,8 @@ class RunServerCommand(Command):
 
     def run(self, *args, **kwargs):
         self.register_microservice()
+        if not kwargs.get('consumers', True):
+            self.app.amqp.workers[:] = []
         self.app.run(
             host=kwargs.get('host', None) or self.app.config["APP_HOST"],
             port=kwargs.get('port', None) or self.app.config["APP_PORT"],
@@ -0,0 +1,8 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+def init_database(app):
+    # The same as the MongoDB extension does on the server start
+    client = AsyncIOMotorClient(app.config['MONGODB_URI'])
+    app.config["LAZY_UMONGO"].init(client[app.config['MONGODB_DATABASE']])
+    return client
@@ -0,0 +1,156 @@
+from bisect import bisect_left
+
+
+class Metric(object):
+    """
+    Base class for the metrics exposed in the Prometheus text format. Each
+    combination of the label values is stored as a separate series.
+    """
+    TYPE = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series = {}
+
+    def get_key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def format_labels(self, key, extra=()):
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(
+            '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"'))
+            for name, value in pairs
+        ) + '}'
+
+    def get_samples(self):
+        for key, value in sorted(self._series.items()):
+            yield self.name, key, (), value
+
+    def render(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} {}'.format(self.name, self.TYPE),
+        ]
+        for name, key, extra, value in self.get_samples():
+            lines.append('{}{} {}'.format(name, self.format_labels(key, extra), repr(float(value))))
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def inc(self, value=1, **labels):
+        key = self.get_key(labels)
+        self._series[key] = self._series.get(key, 0) + value
+
+    def get(self, **labels):
+        return self._series.get(self.get_key(labels), 0)
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+
+    def dec(self, value=1, **labels):
+        self.inc(-value, **labels)
+
+    def set(self, value, **labels):
+        self._series[self.get_key(labels)] = value
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+    DEFAULT_BUCKETS = (
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+    )
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.get_key(labels)
+        series = self._series.get(key, None)
+        if series is None:
+            # Counts per bucket (the last one is +Inf), sum of the observed values
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def get_count(self, **labels):
+        series = self._series.get(self.get_key(labels), None)
+        return sum(series[0]) if series is not None else 0
+
+    def get_samples(self):
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + (float('inf'), ), counts):
+                cumulative += count
+                le = '+Inf' if upper_bound == float('inf') else repr(upper_bound)
+                yield self.name + '_bucket', key, (('le', le), ), cumulative
+            yield self.name + '_sum', key, (), total
+            yield self.name + '_count', key, (), cumulative
+
+
+class MetricsRegistry(object):
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), **kwargs):
+        return self.register(Histogram(name, documentation, label_names, **kwargs))
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+class WorkerMetrics(MetricsRegistry):
+    """
+    Metrics of the AMQP workers, labeled by the queue name.
+
+    The stages of the request processing are: `parse` (decoding the message),
+    `validate` (schema validation), `mongo` (storage access, including the
+    in-memory indexes and the update buffer) and `publish` (sending the reply).
+    """
+
+    def __init__(self):
+        super(WorkerMetrics, self).__init__()
+        self.messages = self.counter(
+            'player_statistics_messages_total',
+            'Messages received by the worker.',
+            ('queue', )
+        )
+        self.in_flight = self.gauge(
+            'player_statistics_messages_in_flight',
+            'Received messages that are not processed yet.',
+            ('queue', )
+        )
+        self.errors = self.counter(
+            'player_statistics_errors_total',
+            'Error responses and failed messages by the error type.',
+            ('queue', 'type')
+        )
+        self.latency = self.histogram(
+            'player_statistics_request_duration_seconds',
+            'Time from receiving the message until it was processed.',
+            ('queue', )
+        )
+        self.stage_latency = self.histogram(
+            'player_statistics_stage_duration_seconds',
+            'Time spent in the stages of the message processing.',
+            ('queue', 'stage')
+        )
@@ -0,0 +1,118 @@
+import time
+from collections import OrderedDict
+
+
+class StatisticsCache(object):
+    """
+    In-process LRU cache with TTL for serialized player statistics.
+
+    Each worker process has its own copy, so the TTL bounds how long a value
+    written by another process can stay stale. A `max_size` equal to zero
+    disables caching entirely.
+
+    Every change of a key gets the next generation number. The readers take
+    `get_generation()` before reading the repository and pass it to `set()`,
+    which skips the value if the key was changed in the meantime, so a stale
+    read can't overwrite the value cached by a concurrent write. Generations
+    of up to `max_size` recently changed keys are kept; for the older ones
+    the skip is conservative.
+    """
+
+    def __init__(self, max_size=10000, ttl=10, timer=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_skips = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._forgotten_generation = 0
+        self._changes = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        key = str(key)
+        entry = self._entries.get(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self.timer():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(value)
+
+    def get_many(self, keys):
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def get_generation(self):
+        return self._generation
+
+    def _is_changed_after(self, key, generation):
+        return self._changes.get(key, self._forgotten_generation) > generation
+
+    def _mark_changed(self, key):
+        self._generation += 1
+        self._changes[key] = self._generation
+        self._changes.move_to_end(key)
+        while len(self._changes) > self.max_size:
+            _key, self._forgotten_generation = self._changes.popitem(last=False)
+
+    def set(self, key, value, generation=None):
+        if not self.enabled:
+            return
+
+        key = str(key)
+        if generation is not None and self._is_changed_after(key, generation):
+            self.stale_skips += 1
+            return
+
+        self._mark_changed(key)
+        self._entries[key] = (self.timer() + self.ttl, dict(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        key = str(key)
+        self._entries.pop(key, None)
+        self._mark_changed(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._changes.clear()
+        self._generation += 1
+        self._forgotten_generation = self._generation
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'stale_skips': self.stale_skips,
+        }
@@ -0,0 +1,91 @@
+def take_nearest(rating, higher, lower, limit, exclude):
+    """
+    Merges two iterators of (player_id, rating) pairs, which are moving away
+    from the `rating` in the opposite directions, into the `limit` closest
+    players.
+    """
+    candidates = []
+    next_higher, next_lower = next(higher, None), next(lower, None)
+    while len(candidates) < limit and (next_higher is not None or next_lower is not None):
+        if next_lower is None or \
+                next_higher is not None and next_higher[1] - rating <= rating - next_lower[1]:
+            candidate, next_higher = next_higher, next(higher, None)
+        else:
+            candidate, next_lower = next_lower, next(lower, None)
+
+        if candidate[0] not in exclude:
+            candidates.append(candidate)
+    return candidates
+
+
+async def _next_candidate(iterator):
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class CandidateSearch(object):
+    """
+    Looks up the players with the rating in the `rating ± delta` range, the
+    closest ratings first.
+
+    The in-memory `RatingIndex` is used when it's loaded. Otherwise two range
+    iterators of `app.statistics_repository` (one going up from the rating
+    and one going down) are read in parallel and merged while the players
+    arrive, so only `limit` players per side can be fetched.
+    """
+
+    def __init__(self, app, rating_index):
+        self.app = app
+        self.rating_index = rating_index
+
+    @property
+    def repository(self):
+        return self.app.statistics_repository
+
+    async def find_in_repository(self, rating, delta, limit, exclude_player_ids):
+        # Ratings are integers, so the lower side ends right below the rating
+        higher = self.repository.iter_by_rating(
+            rating, rating + delta, descending=False, limit=limit,
+            exclude_player_ids=exclude_player_ids
+        )
+        lower = self.repository.iter_by_rating(
+            rating - delta, rating - 1, descending=True, limit=limit,
+            exclude_player_ids=exclude_player_ids
+        )
+
+        candidates = []
+        try:
+            next_higher, next_lower = await _next_candidate(higher), await _next_candidate(lower)
+            while len(candidates) < limit and (next_higher is not None or next_lower is not None):
+                if next_lower is None or next_higher is not None and \
+                        next_higher[1] - rating <= rating - next_lower[1]:
+                    candidates.append(next_higher)
+                    next_higher = await _next_candidate(higher)
+                else:
+                    candidates.append(next_lower)
+                    next_lower = await _next_candidate(lower)
+        finally:
+            # Closes the cursors which weren't read to the end
+            await higher.aclose()
+            await lower.aclose()
+        return candidates
+
+    async def find_candidates(self, rating, delta, limit=20, exclude_player_ids=None):
+        exclude_player_ids = exclude_player_ids or []
+        if self.rating_index.loaded:
+            candidates = take_nearest(
+                rating,
+                self.rating_index.iter_higher(rating, rating + delta),
+                self.rating_index.iter_lower(rating, rating - delta),
+                limit,
+                {str(player_id) for player_id in exclude_player_ids}
+            )
+        else:
+            candidates = await self.find_in_repository(rating, delta, limit, exclude_player_ids)
+
+        return [
+            {'player_id': player_id, 'rating': candidate_rating}
+            for player_id, candidate_rating in candidates
+        ]
@@ -1,6 +1,6 @@
 from marshmallow import validate
 from umongo import Document
-from umongo.fields import ObjectIdField, IntegerField
+from umongo.fields import ObjectIdField, IntegerField, DateTimeField, ListField, DictField
 
 from app import app
 
@@ -47,3 +47,34 @@ class PlayerStatistic(Document):
             error='Field value cannot be represented by a negative integer value.'
         )
     )
+    # Changed on each write by the repository and used for the HTTP caching
+    # headers, so they aren't included in the serialized statistics
+    version = IntegerField(allow_none=False, required=False, load_only=True)
+    updated_at = DateTimeField(allow_none=True, required=False, load_only=True)
+    # Counters of the current windows, returned only on request (see `StatisticsWindows`)
+    windows = DictField(required=False, load_only=True)
+
+    class Meta:
+        # Leaderboard pages and rank lookups
+        indexes = [('-rating', '+player_id'), ]
+
+
+@instance.register
+class RatingHistoryBucket(Document):
+    """
+    Rating changes of one player during one time bucket. The points are packed
+    into two arrays: the offsets (in seconds) from the bucket start and the
+    ratings, and `last_rating` is the rating of the latest point.
+    """
+    player_id = ObjectIdField(allow_none=False, required=True)
+    start = DateTimeField(allow_none=False, required=True)
+    last_rating = IntegerField(allow_none=False, required=True)
+    offsets = ListField(IntegerField(), required=False)
+    ratings = ListField(IntegerField(), required=False)
+
+    class Meta:
+        collection_name = 'rating_history'
+        # One bucket per player and time bucket, also used by the history queries
+        indexes = [
+            {'key': ['+player_id', '+start'], 'unique': True},
+        ]
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+
+class StatisticsExporter(object):
+    """
+    Writes the statistics of all players in the `_id` order, batch by batch,
+    so the memory use doesn't depend on the size of the collection.
+
+    Each exported row has the `id` of the document, so the `id` of the last
+    received row is the resume token: the export started with it as
+    `after_id` continues right after that document.
+    """
+    CONTENT_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv; charset=utf-8',
+    }
+    CSV_FIELDS = ('id', 'player_id', 'total_games', 'wins', 'loses', 'rating')
+
+    def __init__(self, app, batch_size=1000):
+        from app.statistics.documents import PlayerStatistic
+        from app.statistics.schemas import ExportSchema
+        self.app = app
+        self.player_statistic_document = PlayerStatistic
+        self.schema = ExportSchema()
+        self.batch_size = batch_size
+
+    @property
+    def repository(self):
+        return self.app.statistics_repository
+
+    def format_rows(self, export_format, contents):
+        if export_format == 'ndjson':
+            return ''.join(json.dumps(content) + '\n' for content in contents)
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, self.CSV_FIELDS, extrasaction='ignore',
+                                lineterminator='\n')
+        writer.writerows(contents)
+        return buffer.getvalue()
+
+    def get_header(self, export_format):
+        if export_format == 'csv':
+            return ','.join(self.CSV_FIELDS) + '\n'
+        return ''
+
+    async def export(self, write, export_format='ndjson', after_id=None, with_header=True):
+        if export_format not in self.CONTENT_TYPES:
+            raise ValueError("Unknown export format: {}".format(export_format))
+
+        header = self.get_header(export_format)
+        if header and with_header:
+            await write(header)
+
+        count, last_id = 0, after_id
+        contents = []
+        iterator = self.repository.iter_documents(after_id, batch_size=self.batch_size)
+        async for raw_document in iterator:
+            contents.append(self.player_statistic_document.build_from_mongo(raw_document).dump())
+            last_id = raw_document['_id']
+            if len(contents) >= self.batch_size:
+                await write(self.format_rows(export_format, contents))
+                count += len(contents)
+                contents = []
+
+        if contents:
+            await write(self.format_rows(export_format, contents))
+            count += len(contents)
+        return count, last_id
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RatingHistory(object):
+    """
+    Rating of the players over time, for the rating charts.
+
+    The workers call `record(player_id, rating)` after the writes which
+    changed the rating, and the point is stored in the background unless the rating
+    is the same as the previous point. Points are grouped into one document
+    per player and `bucket_size` seconds (see `RatingHistoryBucket`), so the
+    collection and its index grow with the amount of the buckets instead of
+    the amount of the changes. A `bucket_size` equal to zero disables
+    recording.
+
+    One writer task stores the queued points, up to `concurrency` at once.
+    When more than `max_pending` points are waiting, the oldest ones are
+    dropped and counted in `dropped`.
+
+    The history is returned downsampled to at most `points` intervals of the
+    requested time range, each with the last, min and max rating.
+    """
+    DEFAULT_RANGE = timedelta(days=30)
+
+    def __init__(self, app, bucket_size=86400, max_pending=10000, concurrency=16):
+        from app.statistics.schemas import RatingHistorySchema
+        self.app = app
+        self.schema = RatingHistorySchema()
+        self.bucket_size = bucket_size
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.dropped = 0
+        self._pending = deque()
+        self._writer = None
+
+    @property
+    def repository(self):
+        return self.app.rating_history_repository
+
+    @property
+    def enabled(self):
+        return self.bucket_size > 0
+
+    def get_bucket_start(self, timestamp):
+        # Buckets are aligned to the epoch, so every process uses the same boundaries
+        seconds = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+        return datetime(1970, 1, 1) + timedelta(seconds=seconds - seconds % self.bucket_size)
+
+    async def append(self, player_id, rating, timestamp):
+        bucket_start = self.get_bucket_start(timestamp)
+        offset = int((timestamp - bucket_start).total_seconds())
+        return await self.repository.append(player_id, bucket_start, offset, rating)
+
+    def record(self, player_id, rating, timestamp=None):
+        if not self.enabled:
+            return
+
+        self._pending.append((player_id, rating, timestamp or datetime.utcnow()))
+        if len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self.write_pending())
+
+    async def write_pending(self):
+        while self._pending:
+            points = [self._pending.popleft()
+                      for _ in range(min(self.concurrency, len(self._pending)))]
+            results = await asyncio.gather(
+                *(self.append(*point) for point in points), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    LOGGER.error("Can't record the rating history", exc_info=result)
+
+    async def flush(self):
+        # Waits for the points which are still being written, e.g. on shutdown
+        if self._writer is not None and not self._writer.done():
+            await self._writer
+
+    @staticmethod
+    def format_time(timestamp):
+        return timestamp.replace(microsecond=0).isoformat() + 'Z'
+
+    async def get_points(self, player_id, start, end):
+        raw_buckets = await self.repository.find(
+            player_id, min_start=self.get_bucket_start(start), max_start=end
+        )
+        points = [
+            (raw_bucket['start'] + timedelta(seconds=offset), rating)
+            for raw_bucket in raw_buckets
+            for offset, rating in zip(raw_bucket['offsets'], raw_bucket['ratings'])
+        ]
+        # Concurrent writes can append the points of a bucket out of order
+        points.sort(key=lambda point: point[0])
+        return [(timestamp, rating) for timestamp, rating in points if start <= timestamp <= end]
+
+    @staticmethod
+    def downsample(points, start, end, max_points):
+        interval = (end - start).total_seconds() / max_points
+        samples = []
+        current_key = None
+        for timestamp, rating in points:
+            key = int((timestamp - start).total_seconds() / interval) if interval else 0
+            # The point at the end of the range belongs to the last interval
+            key = min(key, max_points - 1)
+            if key != current_key:
+                current_key = key
+                samples.append({'time': timestamp, 'rating': rating, 'min': rating, 'max': rating})
+            else:
+                sample = samples[-1]
+                sample.update(time=timestamp, rating=rating)
+                sample['min'] = min(sample['min'], rating)
+                sample['max'] = max(sample['max'], rating)
+        return samples
+
+    async def get_history(self, player_id, start=None, end=None, points=100):
+        # The times are in UTC without the time zone, as loaded by the schema
+        end = end if end is not None else datetime.utcnow()
+        start = start if start is not None else end - self.DEFAULT_RANGE
+
+        samples = self.downsample(await self.get_points(player_id, start, end), start, end, points)
+        for sample in samples:
+            sample['time'] = self.format_time(sample['time'])
+        return {
+            'player_id': str(player_id),
+            'start': self.format_time(start),
+            'end': self.format_time(end),
+            'points': samples,
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import csv
+import json
+import time
+
+from marshmallow.utils import missing
+
+
+class ImportStats(object):
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.read = 0
+        self.imported = 0
+        self.invalid = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    @property
+    def throughput(self):
+        elapsed = self.elapsed
+        return self.imported / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return "read {}, imported {}, invalid {} in {:.1f} s ({:.0f} records/s)".format(
+            self.read, self.imported, self.invalid, self.elapsed, self.throughput
+        )
+
+
+class StatisticsImporter(object):
+    """
+    Loads the statistics from NDJSON or CSV lines (the formats of the export,
+    whose `id` column is ignored) into `app.statistics_repository`.
+
+    Records are validated with the `PlayerStatistic` field rules and written
+    in batches of `batch_size` with the unordered bulk upserts, up to
+    `concurrency` batches at the same time. Only these batches are kept in
+    memory, so the input of any size is streamed. The missing fields get
+    their default values, as for the init requests. If a player is listed
+    more than once, the last record of the batch is written, but the order
+    of the writes from different batches isn't defined.
+    """
+    FORMATS = ('ndjson', 'csv')
+    IGNORED_FIELDS = ('id', )
+
+    def __init__(self, app, batch_size=1000, concurrency=4):
+        from app.statistics.documents import PlayerStatistic
+        from app.statistics.schemas import ImportPlayerStatisticSchema
+        self.app = app
+        self.schema = ImportPlayerStatisticSchema()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.initial_values = {
+            name: field.default
+            for name, field in PlayerStatistic.schema.fields.items()
+            if field.default is not missing
+        }
+
+    @property
+    def repository(self):
+        return self.app.statistics_repository
+
+    def read_records(self, lines, import_format='ndjson'):
+        if import_format == 'csv':
+            for record in csv.DictReader(lines):
+                # Empty cells are the missing values
+                yield {key: value for key, value in record.items() if value != ''}
+        else:
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+    def validate(self, record):
+        if not isinstance(record, dict):
+            return None, {'_schema': ['The record must be a JSON object.']}
+
+        record = {
+            key: value for key, value in record.items() if key not in self.IGNORED_FIELDS
+        }
+        result = self.schema.load(record)
+        if result.errors:
+            return None, result.errors
+
+        values = dict(self.initial_values, **result.data)
+        return values.pop('player_id'), values
+
+    async def write(self, items, stats, on_progress):
+        # Only the last record of each player in the batch
+        items = list(dict(items).items())
+        await self.repository.bulk_upsert(items)
+        stats.imported += len(items)
+        if on_progress is not None:
+            on_progress(stats)
+
+    async def import_lines(self, lines, import_format='ndjson', on_progress=None, on_error=None):
+        if import_format not in self.FORMATS:
+            raise ValueError("Unknown import format: {}".format(import_format))
+
+        stats = ImportStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        failures = []
+
+        async def write_batch(batch):
+            try:
+                await self.write(batch, stats, on_progress)
+            except Exception as exc:
+                failures.append(exc)
+            finally:
+                semaphore.release()
+
+        async def start_batch(batch):
+            await semaphore.acquire()
+            task = asyncio.ensure_future(write_batch(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        batch = []
+        records = self.read_records(lines, import_format)
+        for record_number, record in enumerate(records, start=1):
+            stats.read += 1
+            player_id, values = self.validate(record)
+            if player_id is None:
+                stats.invalid += 1
+                if on_error is not None:
+                    on_error(record_number, values)
+                continue
+
+            batch.append((player_id, values))
+            if len(batch) >= self.batch_size:
+                await start_batch(batch)
+                batch = []
+            if failures:
+                break
+        else:
+            if batch:
+                await start_batch(batch)
+
+        if tasks:
+            await asyncio.wait(list(tasks))
+        if failures:
+            raise failures[0]
+        return stats
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from pymongo import IndexModel
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IndexManager(object):
+    """
+    Verifies that the indexes declared in the `Meta.indexes` of the documents
+    (including the ones of the `unique=True` fields) exist in the database,
+    and creates the missing ones in background.
+
+    The manager is ready only when no declared index is missing, which is
+    used by the readiness check: without the `player_id` index each lookup
+    becomes a collection scan.
+    """
+
+    def __init__(self, app, documents=None, ensure=True, retry_interval=30):
+        if documents is None:
+            from app.statistics.documents import PlayerStatistic, RatingHistoryBucket
+            documents = [PlayerStatistic, RatingHistoryBucket, ]
+        self.app = app
+        self.documents = documents
+        self.ensure = ensure
+        self.retry_interval = retry_interval
+        self.missing = None
+        self._task = None
+
+    @property
+    def ready(self):
+        return self.missing is not None and not self.missing
+
+    @staticmethod
+    def get_index_signature(index):
+        keys = index['key']
+        if hasattr(keys, 'items'):
+            keys = keys.items()
+        # The server can return the directions as floats
+        keys = [
+            (name, int(direction) if isinstance(direction, (int, float)) else direction)
+            for name, direction in keys
+        ]
+        return keys, bool(index.get('unique', False))
+
+    async def get_missing_indexes(self, document):
+        existing_signatures = [
+            self.get_index_signature(index)
+            for index in (await document.collection.index_information()).values()
+        ]
+        return [
+            index for index in document.opts.indexes
+            if self.get_index_signature(index.document) not in existing_signatures
+        ]
+
+    async def ensure_indexes(self, document):
+        missing_indexes = await self.get_missing_indexes(document)
+        if not missing_indexes:
+            return []
+
+        # Don't block the other operations on the collection while the indexes are built
+        indexes = [
+            IndexModel(list(index.document['key'].items()), background=True, **{
+                name: value for name, value in index.document.items() if name != 'key'
+            })
+            for index in missing_indexes
+        ]
+        return await document.collection.create_indexes(indexes)
+
+    async def verify(self):
+        missing = {}
+        for document in self.documents:
+            try:
+                if self.ensure:
+                    created = await self.ensure_indexes(document)
+                    if created:
+                        LOGGER.info("Created indexes for the {} collection: {}".format(
+                            document.collection.name, ', '.join(created)
+                        ))
+                indexes = await self.get_missing_indexes(document)
+            except Exception:
+                LOGGER.exception("Can't verify indexes of the {} collection".format(
+                    document.collection.name
+                ))
+                indexes = document.opts.indexes
+
+            if indexes:
+                missing[document.collection.name] = [index.document['name'] for index in indexes]
+
+        self.missing = missing
+        return missing
+
+    async def run_verification(self):
+        # Repeat the check until everything is in place, e.g. the database wasn't
+        # available yet or an index is still being built by another process
+        while not self.ready:
+            await self.verify()
+            if not self.ready:
+                await asyncio.sleep(self.retry_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = self.app.loop.create_task(self.run_verification())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Leaderboard(object):
+    """
+    Top players by rating and rank lookups.
+
+    Requests are served from the in-memory `RatingIndex` once it has been
+    loaded; before that (or when the periodic refresh is disabled) the same
+    answers are computed by `app.statistics_repository`.
+    """
+
+    def __init__(self, app, rating_index, refresh_interval=300):
+        from app.statistics.schemas import LeaderboardSchema
+        self.app = app
+        self.schema = LeaderboardSchema()
+        self.rating_index = rating_index
+        self.refresh_interval = refresh_interval
+        self._refresh_task = None
+
+    @property
+    def repository(self):
+        return self.app.statistics_repository
+
+    @property
+    def enabled(self):
+        return self.refresh_interval > 0
+
+    async def refresh(self):
+        self.rating_index.start_refresh()
+        self.rating_index.load(await self.repository.find_by_rating())
+
+    async def run_refresh(self):
+        # Other processes update the statistics too, so reload the whole index from
+        # time to time instead of relying only on the local updates
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                LOGGER.exception("Can't load the rating index")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self.enabled and self._refresh_task is None:
+            self._refresh_task = self.app.loop.create_task(self.run_refresh())
+
+    def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def get_total(self):
+        if self.rating_index.loaded:
+            return len(self.rating_index)
+        return await self.repository.count()
+
+    async def count_higher(self, rating):
+        if self.rating_index.loaded:
+            return self.rating_index.count_higher(rating)
+        return await self.repository.count(greater_than=rating)
+
+    async def count_lower(self, rating):
+        if self.rating_index.loaded:
+            return self.rating_index.count_lower(rating)
+        return await self.repository.count(less_than=rating)
+
+    async def get_top(self, offset, limit):
+        if self.rating_index.loaded:
+            return self.rating_index.top(offset, limit)
+        return await self.repository.find_by_rating(offset=offset, limit=limit)
+
+    async def get_rating(self, player_id):
+        if self.rating_index.loaded:
+            rating = self.rating_index.get_rating(player_id)
+            if rating is not None:
+                return rating
+
+        raw_document = await self.repository.get(player_id)
+        return raw_document.get('rating', 0) if raw_document is not None else None
+
+    async def get_page(self, offset, limit):
+        top = await self.get_top(offset, limit)
+
+        players = []
+        previous_rating, rank = None, None
+        for position, (player_id, rating) in enumerate(top, start=offset + 1):
+            # Players with the same rating share the same rank, so only the first
+            # player of the page (who can tie with the previous page) needs a count
+            if rank is None:
+                rank = await self.count_higher(rating) + 1
+            elif rating != previous_rating:
+                rank = position
+            previous_rating = rating
+            players.append({'player_id': player_id, 'rating': rating, 'rank': rank})
+        return players
+
+    async def get_player_rank(self, player_id):
+        rating = await self.get_rating(player_id)
+        if rating is None:
+            return None
+
+        total = await self.get_total()
+        lower = await self.count_lower(rating)
+        return {
+            'player_id': str(player_id),
+            'rating': rating,
+            'rank': await self.count_higher(rating) + 1,
+            'percentile': round(100.0 * lower / total, 2) if total else 0.0,
+        }
+
+    async def get_leaderboard(self, offset=0, limit=10, player_id=None):
+        result = {
+            'total': await self.get_total(),
+            'offset': offset,
+            'limit': limit,
+            'players': await self.get_page(offset, limit),
+        }
+        if player_id is not None:
+            result['player'] = await self.get_player_rank(player_id)
+        return result
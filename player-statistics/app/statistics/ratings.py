@@ -0,0 +1,117 @@
+from bisect import bisect_left, insort
+
+
+# Greater than any player identifier, used to find the end of a block of equal ratings
+_LAST_PLAYER_ID = '\U0010ffff'
+
+
+class RatingIndex(object):
+    """
+    In-memory list of the players ordered by rating (from the highest one),
+    used for the leaderboard pages and rank lookups.
+
+    The list is loaded from MongoDB with `load(items)` and then kept up to date
+    by the workers with `update(player_id, rating)`. Updates received between
+    `start_refresh()` and `load(items)` are applied on top of the loaded data,
+    so a periodic reload doesn't lose them. Until the first load (or when
+    the index is disabled and never loaded) the updates are ignored, so the
+    index doesn't grow. Ties are ordered by the player
+    identifier, so the order is the same as for the `('-rating', 'player_id')`
+    index in MongoDB.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._keys = []
+        self._ratings = {}
+        self._refresh_updates = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def start_refresh(self):
+        self._refresh_updates = {}
+
+    def load(self, items):
+        ratings = {str(player_id): rating for player_id, rating in items}
+        if self._refresh_updates:
+            ratings.update(self._refresh_updates)
+        self._refresh_updates = None
+
+        self._ratings = ratings
+        self._keys = sorted((-rating, player_id) for player_id, rating in ratings.items())
+        self.loaded = True
+
+    def update(self, player_id, rating):
+        player_id = str(player_id)
+        if self._refresh_updates is not None:
+            self._refresh_updates[player_id] = rating
+        if not self.loaded:
+            return
+
+        current_rating = self._ratings.get(player_id, None)
+        if current_rating == rating:
+            return
+        if current_rating is not None:
+            self._remove_key(current_rating, player_id)
+
+        self._ratings[player_id] = rating
+        insort(self._keys, (-rating, player_id))
+
+    def remove(self, player_id):
+        if not self.loaded:
+            return
+
+        player_id = str(player_id)
+        rating = self._ratings.pop(player_id, None)
+        if rating is not None:
+            self._remove_key(rating, player_id)
+
+    def _remove_key(self, rating, player_id):
+        key = (-rating, player_id)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def get_rating(self, player_id):
+        return self._ratings.get(str(player_id), None)
+
+    def count_higher(self, rating):
+        return bisect_left(self._keys, (-rating, ))
+
+    def count_lower(self, rating):
+        return len(self._keys) - bisect_left(self._keys, (-rating, _LAST_PLAYER_ID))
+
+    def iter_higher(self, rating, max_rating):
+        # Players with rating in [rating, max_rating], starting from the closest one
+        start = bisect_left(self._keys, (-max_rating, ))
+        position = bisect_left(self._keys, (-rating, _LAST_PLAYER_ID))
+        while position > start:
+            position -= 1
+            negative_rating, player_id = self._keys[position]
+            yield player_id, -negative_rating
+
+    def iter_lower(self, rating, min_rating):
+        # Players with rating in [min_rating, rating), starting from the closest one
+        position = bisect_left(self._keys, (-rating, _LAST_PLAYER_ID))
+        end = bisect_left(self._keys, (-min_rating, _LAST_PLAYER_ID))
+        while position < end:
+            negative_rating, player_id = self._keys[position]
+            position += 1
+            yield player_id, -negative_rating
+
+    def iter_range(self, min_rating=None, max_rating=None, descending=True):
+        # Players with rating in [min_rating, max_rating], in the index order or the reversed one
+        start = 0 if max_rating is None else bisect_left(self._keys, (-max_rating, ))
+        end = len(self._keys) if min_rating is None else \
+            bisect_left(self._keys, (-min_rating, _LAST_PLAYER_ID))
+        positions = range(start, end) if descending else range(end - 1, start - 1, -1)
+        for position in positions:
+            negative_rating, player_id = self._keys[position]
+            yield player_id, -negative_rating
+
+    def top(self, offset=0, limit=10):
+        return [
+            (player_id, -negative_rating)
+            for negative_rating, player_id in self._keys[offset:offset + limit]
+        ]
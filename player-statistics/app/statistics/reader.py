@@ -0,0 +1,124 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from sanic.response import json, HTTPResponse
+
+
+class StatisticsReader(object):
+    """
+    Serves the statistics for the HTTP API with the conditional requests.
+
+    The ETag is made of the `_id` and `version` of the requested documents
+    (the version starts over when a document is created again) and the
+    Last-Modified header of their latest `updated_at` time, so a request
+    with the matching `If-None-Match` (or `If-Modified-Since`) header gets
+    the 304 response without serializing the documents. The documents are
+    always read from `app.statistics_repository`, because the cached
+    statistics don't contain the versions.
+    """
+    PLAYER_NOT_FOUND_ERROR = "Player was not found or doesn't exist."
+
+    def __init__(self, app):
+        from app.statistics.documents import PlayerStatistic
+        from app.statistics.schemas import RetrievePlayerStatisticSchema, \
+            BatchRetrievePlayerStatisticSchema
+        self.app = app
+        self.player_statistic_document = PlayerStatistic
+        self.schema = RetrievePlayerStatisticSchema()
+        self.batch_schema = BatchRetrievePlayerStatisticSchema()
+
+    @property
+    def repository(self):
+        return self.app.statistics_repository
+
+    @staticmethod
+    def get_etag(player_ids, raw_documents):
+        versions = [
+            (player_id, '{}-{}'.format(
+                raw_documents[player_id].get('_id', ''), raw_documents[player_id].get('version', 0)
+            ) if player_id in raw_documents else None)
+            for player_id in player_ids
+        ]
+        if len(versions) == 1:
+            return '"{}"'.format(versions[0][1])
+
+        digest = hashlib.sha1(','.join(
+            '{}:{}'.format(player_id, version) for player_id, version in versions
+        ).encode('utf-8'))
+        return '"{}"'.format(digest.hexdigest())
+
+    @staticmethod
+    def get_last_modified(raw_documents):
+        # Stored in UTC without the time zone, and the header has the precision of seconds
+        updated_at = [
+            raw_document['updated_at'] for raw_document in raw_documents.values()
+            if raw_document.get('updated_at', None) is not None
+        ]
+        if not updated_at:
+            return None
+        return max(updated_at).replace(microsecond=0, tzinfo=timezone.utc)
+
+    @staticmethod
+    def is_not_modified(headers, etag, last_modified):
+        if_none_match = headers.get('If-None-Match', None)
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+
+        if_modified_since = headers.get('If-Modified-Since', None)
+        if if_modified_since is None or last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+
+    def get_response(self, request, player_ids, raw_documents, get_content):
+        etag = self.get_etag(player_ids, raw_documents)
+        last_modified = self.get_last_modified(raw_documents)
+        headers = {'ETag': etag}
+        if last_modified is not None:
+            headers['Last-Modified'] = format_datetime(last_modified, usegmt=True)
+
+        if self.is_not_modified(request.headers, etag, last_modified):
+            return HTTPResponse(status=304, headers=headers)
+        return json(get_content(), headers=headers)
+
+    def dump(self, raw_document):
+        return self.player_statistic_document.build_from_mongo(raw_document).dump()
+
+    async def get_player_statistic(self, request, player_id):
+        result = self.schema.load({'player_id': player_id})
+        if result.errors:
+            return json({'error': result.errors}, status=400)
+
+        player_id = result.data['player_id']
+        raw_document = await self.repository.get(player_id)
+        if raw_document is None:
+            return json({'error': self.PLAYER_NOT_FOUND_ERROR}, status=404)
+
+        return self.get_response(
+            request, [player_id], {player_id: raw_document},
+            lambda: self.dump(raw_document)
+        )
+
+    async def get_player_statistics(self, request):
+        player_ids = request.raw_args.get('player_ids', None)
+        result = self.batch_schema.load({
+            'player_ids': player_ids.split(',') if player_ids else None
+        })
+        if result.errors:
+            return json({'error': result.errors}, status=400)
+
+        player_ids = list(dict.fromkeys(result.data['player_ids']))
+        raw_documents = await self.repository.get_many(player_ids)
+        return self.get_response(request, player_ids, raw_documents, lambda: {
+            'found': [self.dump(raw_documents[player_id])
+                      for player_id in player_ids if player_id in raw_documents],
+            'missing': [str(player_id) for player_id in player_ids
+                        if player_id not in raw_documents],
+        })
@@ -0,0 +1,570 @@
+import copy
+from datetime import datetime
+from itertools import islice
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.write_concern import WriteConcern
+
+from app.statistics.ratings import RatingIndex
+
+
+class StatisticsUpdate(object):
+    """
+    Changes of the statistics of one player.
+
+    The `set_values` are written as is, the `inc_values` are added to the
+    current values and the `max_values` replace the current values only when
+    they are greater. The update is applied only if each field from the
+    `not_greater` mapping is less than or equal to the passed bound, and the
+    fields listed in `non_negative` are clamped at zero afterwards.
+
+    The `window_inc_values` are added to the counters of each window from the
+    `window_starts` mapping (stored in the `windows.<name>` subdocument), and
+    the counters of a window are reset first when it has another start. The
+    counters of the `window_fields` are increased by the change of the
+    lifetime value made by the same write, e.g. by an absolute value.
+    """
+
+    def __init__(self, player_id, set_values=None, inc_values=None, max_values=None,
+                 not_greater=None, non_negative=(), window_starts=None, window_inc_values=None,
+                 window_fields=()):
+        self.player_id = player_id
+        self.set_values = set_values or {}
+        self.inc_values = inc_values or {}
+        self.max_values = max_values or {}
+        self.not_greater = not_greater or {}
+        self.non_negative = tuple(non_negative)
+        self.window_starts = window_starts or {}
+        self.window_inc_values = window_inc_values or {}
+        self.window_fields = tuple(window_fields)
+
+    def __eq__(self, other):
+        return isinstance(other, StatisticsUpdate) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return 'StatisticsUpdate({})'.format(', '.join(
+            '{}={!r}'.format(name, value) for name, value in sorted(vars(self).items()) if value
+        ))
+
+    @property
+    def is_empty(self):
+        return not (self.set_values or self.inc_values or self.max_values)
+
+
+class StatisticsRepository(object):
+    """
+    Storage of the player statistics used by the workers.
+
+    The documents are exchanged in the raw form (as stored in MongoDB), so
+    they are serialized by `PlayerStatistic.build_from_mongo(...).dump()`
+    the same way for each implementation. Each write increments the
+    `version` of the document and sets its `updated_at` time. The range queries return the
+    (player_id, rating) pairs, where the player identifier is a string;
+    the descending order of the ratings orders the ties by the player
+    identifier, and the ascending order reverses both.
+    """
+
+    async def get(self, player_id):
+        raise NotImplementedError('`get(player_id)` method must be implemented.')
+
+    async def get_many(self, player_ids):
+        # Returns the found documents by the player identifiers
+        raise NotImplementedError('`get_many(player_ids)` method must be implemented.')
+
+    async def exists(self, player_id):
+        return await self.get(player_id) is not None
+
+    async def upsert(self, player_id, values, only_if_absent=False):
+        raise NotImplementedError('`upsert(player_id, values)` method must be implemented.')
+
+    async def update(self, update):
+        # Returns the updated document, or None if it doesn't exist or the condition failed
+        raise NotImplementedError('`update(update)` method must be implemented.')
+
+    async def bulk_update(self, updates, durable=False):
+        # Returns the amount of the matched documents
+        raise NotImplementedError('`bulk_update(updates)` method must be implemented.')
+
+    async def bulk_upsert(self, items):
+        # Overwrites the statistics from the (player_id, values) pairs, in any order
+        raise NotImplementedError('`bulk_upsert(items)` method must be implemented.')
+
+    async def count(self, greater_than=None, less_than=None):
+        raise NotImplementedError('`count()` method must be implemented.')
+
+    async def find_by_rating(self, min_rating=None, max_rating=None, descending=True,
+                             offset=0, limit=None, exclude_player_ids=None):
+        raise NotImplementedError('`find_by_rating()` method must be implemented.')
+
+    def iter_by_rating(self, min_rating=None, max_rating=None, descending=True,
+                       limit=None, exclude_player_ids=None):
+        # Asynchronous iterator over the same pairs as `find_by_rating()`, fetched lazily
+        raise NotImplementedError('`iter_by_rating()` method must be implemented.')
+
+    def iter_documents(self, after_id=None, batch_size=1000):
+        # Asynchronous iterator over all documents in the `_id` order, starting after `after_id`
+        raise NotImplementedError('`iter_documents()` method must be implemented.')
+
+
+class MotorStatisticsRepository(StatisticsRepository):
+    """
+    Repository over the `PlayerStatistic` collection. The conditional and the
+    bulk updates are done in one call, so the checks happen in MongoDB.
+
+    The updates with the clamped fields or the windows are written as the
+    update pipelines (MongoDB 4.2+), so the whole change of a player is one
+    atomic write and a clamped value is never stored below zero.
+    """
+    PROJECTION = {'_id': False, 'player_id': True, 'rating': True}
+
+    def __init__(self, document=None):
+        if document is None:
+            from app.statistics.documents import PlayerStatistic
+            document = PlayerStatistic
+        self.document = document
+
+    @property
+    def collection(self):
+        return self.document.collection
+
+    @staticmethod
+    def get_query(update):
+        query = {'player_id': update.player_id}
+        # `$lte` doesn't match the documents without the field (e.g. created by the init
+        # with the player identifier only), where the field has the default zero value
+        query.update({
+            field: {'$not': {'$gt': value}} for field, value in update.not_greater.items()
+        })
+        return query
+
+    @staticmethod
+    def get_inc_values(update):
+        inc_values = dict(update.inc_values, version=1)
+        inc_values.update({
+            'windows.{}.{}'.format(name, field): value
+            for name in update.window_starts for field, value in update.window_inc_values.items()
+        })
+        return inc_values
+
+    @classmethod
+    def get_pipeline(cls, update):
+        stages = []
+        if update.window_starts:
+            # Ended windows start from zero, before the counters are incremented
+            stages.append({'$set': {
+                'windows.{}'.format(name): {'$cond': [
+                    {'$eq': ['$windows.{}.start'.format(name), start]},
+                    '$windows.{}'.format(name),
+                    {'$literal': {'start': start}},
+                ]}
+                for name, start in update.window_starts.items()
+            }})
+
+        values = {
+            field: {'$literal': value}
+            for field, value in dict(update.set_values, updated_at=datetime.utcnow()).items()
+        }
+        for field, value in cls.get_inc_values(update).items():
+            values[field] = {'$add': [{'$ifNull': ['$' + field, 0]}, value]}
+        for field, value in update.max_values.items():
+            # `$max` ignores the missing values
+            values[field] = {'$max': [values.get(field, '$' + field), value]}
+        for field in update.non_negative:
+            values[field] = {'$max': [0, values.get(field, '$' + field)]}
+        for field in update.window_fields:
+            # The expressions of the stage see the lifetime value before the write
+            change = {'$subtract': [values.get(field, '$' + field), {'$ifNull': ['$' + field, 0]}]}
+            for name in update.window_starts:
+                key = 'windows.{}.{}'.format(name, field)
+                values[key] = {'$add': [values.get(key, {'$ifNull': ['$' + key, 0]}), change]}
+        stages.append({'$set': values})
+        return stages
+
+    @classmethod
+    def get_update_document(cls, update):
+        if update.non_negative or update.window_starts:
+            return cls.get_pipeline(update)
+
+        operators = (
+            ('$set', dict(update.set_values, updated_at=datetime.utcnow())),
+            ('$inc', cls.get_inc_values(update)),
+            ('$max', update.max_values),
+        )
+        return {operator: values for operator, values in operators if values}
+
+    def get_operation(self, update):
+        return UpdateOne(self.get_query(update), self.get_update_document(update))
+
+    async def get(self, player_id):
+        return await self.collection.find_one({'player_id': player_id})
+
+    async def get_many(self, player_ids):
+        raw_documents = await self.collection.find(
+            {'player_id': {'$in': list(player_ids)}}
+        ).to_list(length=len(player_ids))
+        return {raw_document['player_id']: raw_document for raw_document in raw_documents}
+
+    async def exists(self, player_id):
+        return await self.collection.count_documents({'player_id': player_id}, limit=1) > 0
+
+    async def upsert(self, player_id, values, only_if_absent=False):
+        values = dict(values, player_id=player_id, updated_at=datetime.utcnow())
+        if only_if_absent:
+            update = {'$setOnInsert': dict(values, version=1)}
+        else:
+            # Overwrites all fields (the windowed counters start over with the lifetime
+            # ones), but keeps counting the versions of the document
+            update = {'$set': values, '$unset': {'windows': ''}, '$inc': {'version': 1}}
+        return await self.collection.find_one_and_update(
+            {'player_id': player_id}, update,
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+
+    async def update(self, update):
+        query = self.get_query(update)
+        if update.is_empty:
+            return await self.collection.find_one(query)
+
+        return await self.collection.find_one_and_update(
+            query, self.get_update_document(update), return_document=ReturnDocument.AFTER
+        )
+
+    async def bulk_update(self, updates, durable=False):
+        updates = [update for update in updates if not update.is_empty]
+        if not updates:
+            return 0
+
+        collection = self.collection
+        if durable:
+            collection = collection.with_options(write_concern=WriteConcern(j=True))
+        result = await collection.bulk_write(
+            [self.get_operation(update) for update in updates], ordered=False
+        )
+        return result.matched_count
+
+    async def bulk_upsert(self, items):
+        updated_at = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {'player_id': player_id},
+                {'$set': dict(values, player_id=player_id, updated_at=updated_at),
+                 '$unset': {'windows': ''},
+                 '$inc': {'version': 1}},
+                upsert=True
+            )
+            for player_id, values in items
+        ], ordered=False)
+
+    async def count(self, greater_than=None, less_than=None):
+        query = {}
+        if greater_than is not None:
+            query.setdefault('rating', {})['$gt'] = greater_than
+        if less_than is not None:
+            query.setdefault('rating', {})['$lt'] = less_than
+        if not query:
+            return await self.collection.estimated_document_count()
+        return await self.collection.count_documents(query)
+
+    def get_rating_cursor(self, min_rating, max_rating, descending, offset, limit,
+                          exclude_player_ids):
+        query = {}
+        if min_rating is not None:
+            query.setdefault('rating', {})['$gte'] = min_rating
+        if max_rating is not None:
+            query.setdefault('rating', {})['$lte'] = max_rating
+        if exclude_player_ids:
+            query['player_id'] = {'$nin': list(exclude_player_ids)}
+
+        # Both directions are served by the ('-rating', 'player_id') index
+        if descending:
+            sort = [('rating', DESCENDING), ('player_id', ASCENDING)]
+        else:
+            sort = [('rating', ASCENDING), ('player_id', DESCENDING)]
+        cursor = self.collection.find(query, self.PROJECTION).sort(sort)
+        if offset:
+            cursor = cursor.skip(offset)
+        if limit:
+            cursor = cursor.limit(limit).batch_size(limit)
+        return cursor
+
+    async def find_by_rating(self, min_rating=None, max_rating=None, descending=True,
+                             offset=0, limit=None, exclude_player_ids=None):
+        cursor = self.get_rating_cursor(
+            min_rating, max_rating, descending, offset, limit, exclude_player_ids
+        )
+        return [
+            (str(raw_document['player_id']), raw_document.get('rating', 0))
+            for raw_document in await cursor.to_list(length=limit)
+        ]
+
+    async def iter_by_rating(self, min_rating=None, max_rating=None, descending=True,
+                             limit=None, exclude_player_ids=None):
+        cursor = self.get_rating_cursor(
+            min_rating, max_rating, descending, 0, limit, exclude_player_ids
+        )
+        async for raw_document in cursor:
+            yield str(raw_document['player_id']), raw_document.get('rating', 0)
+
+    async def iter_documents(self, after_id=None, batch_size=1000):
+        query = {'_id': {'$gt': after_id}} if after_id is not None else {}
+        cursor = self.collection.find(query).sort('_id', ASCENDING).batch_size(batch_size)
+        async for raw_document in cursor:
+            yield raw_document
+
+
+class MemoryStatisticsRepository(StatisticsRepository):
+    """
+    Repository which keeps the statistics in the process memory, for the
+    benchmarks and the tests without MongoDB. The data isn't shared with
+    other processes and is lost on restart.
+
+    Each operation is done without awaiting anything, so it's atomic
+    for the other coroutines. The range queries use own `RatingIndex`.
+    """
+
+    def __init__(self):
+        self._documents = {}
+        self._ratings = RatingIndex()
+        self._ratings.load([])
+
+    def __len__(self):
+        return len(self._documents)
+
+    def clear(self):
+        self._documents.clear()
+        self._ratings.load([])
+
+    def _store(self, raw_document):
+        self._documents[str(raw_document['player_id'])] = raw_document
+        self._ratings.update(raw_document['player_id'], raw_document.get('rating', 0))
+        return copy.deepcopy(raw_document)
+
+    def _is_matched(self, raw_document, update):
+        # The same as `{'$not': {'$gt': value}}`, which matches the missing fields too
+        return all(
+            field not in raw_document or raw_document[field] <= value
+            for field, value in update.not_greater.items()
+        )
+
+    async def get(self, player_id):
+        raw_document = self._documents.get(str(player_id), None)
+        return copy.deepcopy(raw_document) if raw_document is not None else None
+
+    async def get_many(self, player_ids):
+        found = {}
+        for player_id in player_ids:
+            raw_document = self._documents.get(str(player_id), None)
+            if raw_document is not None:
+                found[player_id] = copy.deepcopy(raw_document)
+        return found
+
+    async def exists(self, player_id):
+        return str(player_id) in self._documents
+
+    async def upsert(self, player_id, values, only_if_absent=False):
+        current = self._documents.get(str(player_id), None)
+        if current is not None and only_if_absent:
+            return copy.deepcopy(current)
+
+        raw_document = copy.deepcopy(dict(values, player_id=player_id))
+        raw_document['_id'] = current['_id'] if current is not None else ObjectId()
+        raw_document['version'] = current.get('version', 0) + 1 if current is not None else 1
+        raw_document['updated_at'] = datetime.utcnow()
+        return self._store(raw_document)
+
+    def _apply(self, update):
+        current = self._documents.get(str(update.player_id), None)
+        if current is None or not self._is_matched(current, update):
+            return None
+
+        if update.is_empty:
+            return copy.deepcopy(current)
+
+        raw_document = dict(current)
+        previous = {field: current.get(field, 0) for field in update.window_fields}
+        raw_document['version'] = raw_document.get('version', 0) + 1
+        raw_document['updated_at'] = datetime.utcnow()
+        raw_document.update(update.set_values)
+        for field, value in update.inc_values.items():
+            raw_document[field] = raw_document.get(field, 0) + value
+        for field, value in update.max_values.items():
+            raw_document[field] = max(raw_document.get(field, value), value)
+        for field in update.non_negative:
+            if raw_document.get(field, 0) < 0:
+                raw_document[field] = 0
+        if update.window_starts:
+            windows = copy.deepcopy(raw_document.get('windows', {}))
+            for name, start in update.window_starts.items():
+                if windows.get(name, {}).get('start', None) != start:
+                    windows[name] = {'start': start}
+                for field, value in update.window_inc_values.items():
+                    windows[name][field] = windows[name].get(field, 0) + value
+                for field, value in previous.items():
+                    windows[name][field] = \
+                        windows[name].get(field, 0) + raw_document.get(field, 0) - value
+            raw_document['windows'] = windows
+        return self._store(raw_document)
+
+    async def update(self, update):
+        return self._apply(update)
+
+    async def bulk_update(self, updates, durable=False):
+        return sum(
+            self._apply(update) is not None for update in updates if not update.is_empty
+        )
+
+    async def bulk_upsert(self, items):
+        for player_id, values in items:
+            await self.upsert(player_id, values)
+
+    async def count(self, greater_than=None, less_than=None):
+        total = count = len(self._ratings)
+        if greater_than is not None:
+            count -= total - self._ratings.count_higher(greater_than)
+        if less_than is not None:
+            count -= total - self._ratings.count_lower(less_than)
+        return max(count, 0)
+
+    async def find_by_rating(self, min_rating=None, max_rating=None, descending=True,
+                             offset=0, limit=None, exclude_player_ids=None):
+        excluded = {str(player_id) for player_id in exclude_player_ids or []}
+        items = (
+            item for item in self._ratings.iter_range(min_rating, max_rating, descending)
+            if item[0] not in excluded
+        )
+        return list(islice(items, offset, offset + limit if limit else None))
+
+    async def iter_by_rating(self, min_rating=None, max_rating=None, descending=True,
+                             limit=None, exclude_player_ids=None):
+        excluded = {str(player_id) for player_id in exclude_player_ids or []}
+        items = (
+            item for item in self._ratings.iter_range(min_rating, max_rating, descending)
+            if item[0] not in excluded
+        )
+        # Taken at once, so the index changed by the concurrent writes isn't iterated
+        for item in list(islice(items, limit)):
+            yield item
+
+    async def iter_documents(self, after_id=None, batch_size=1000):
+        # The documents changed during the iteration are returned in the current state
+        keys = sorted(
+            (raw_document['_id'], key) for key, raw_document in self._documents.items()
+            if after_id is None or raw_document['_id'] > after_id
+        )
+        for _id, key in keys:
+            raw_document = self._documents.get(key, None)
+            if raw_document is not None:
+                yield copy.deepcopy(raw_document)
+
+
+class RatingHistoryRepository(object):
+    """
+    Storage of the rating history, bucketed by player and time (see
+    `RatingHistoryBucket`). The buckets are exchanged in the raw form.
+    """
+
+    async def append(self, player_id, bucket_start, offset, rating):
+        raise NotImplementedError(
+            '`append(player_id, bucket_start, offset, rating)` method must be implemented.'
+        )
+
+    async def find(self, player_id, min_start=None, max_start=None):
+        raise NotImplementedError(
+            '`find(player_id, min_start=None, max_start=None)` method must be implemented.'
+        )
+
+
+class MotorRatingHistoryRepository(RatingHistoryRepository):
+    """
+    Repository over the `RatingHistoryBucket` collection. A point is written
+    with one upsert of the bucket, as an update pipeline (MongoDB 4.2+) which
+    appends the point unless it repeats the last rating of the bucket, so the
+    check works for all processes. MongoDB retries the concurrent upserts of
+    a new bucket, since the filter matches its unique index exactly.
+    """
+    PROJECTION = {'_id': False, 'start': True, 'offsets': True, 'ratings': True}
+
+    def __init__(self, document=None):
+        if document is None:
+            from app.statistics.documents import RatingHistoryBucket
+            document = RatingHistoryBucket
+        self.document = document
+
+    @property
+    def collection(self):
+        return self.document.collection
+
+    async def append(self, player_id, bucket_start, offset, rating):
+        is_repeated = {'$eq': ['$last_rating', rating]}
+        result = await self.collection.update_one(
+            {'player_id': player_id, 'start': bucket_start},
+            [{'$set': {
+                'offsets': {'$cond': [is_repeated, '$offsets', {'$concatArrays': [
+                    {'$ifNull': ['$offsets', []]}, {'$literal': [offset]}
+                ]}]},
+                'ratings': {'$cond': [is_repeated, '$ratings', {'$concatArrays': [
+                    {'$ifNull': ['$ratings', []]}, {'$literal': [rating]}
+                ]}]},
+                'last_rating': {'$literal': rating},
+            }}],
+            upsert=True
+        )
+        # A repeated rating leaves the bucket unmodified
+        return result.upserted_id is not None or result.modified_count > 0
+
+    async def find(self, player_id, min_start=None, max_start=None):
+        query = {'player_id': player_id}
+        start = {}
+        if min_start is not None:
+            start['$gte'] = min_start
+        if max_start is not None:
+            start['$lte'] = max_start
+        if start:
+            query['start'] = start
+
+        cursor = self.collection.find(query, self.PROJECTION).sort('start', ASCENDING)
+        return [raw_bucket async for raw_bucket in cursor]
+
+
+class MemoryRatingHistoryRepository(RatingHistoryRepository):
+    """
+    Rating history kept in the process memory, used together with
+    `MemoryStatisticsRepository`.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+
+    def clear(self):
+        self._buckets.clear()
+
+    async def append(self, player_id, bucket_start, offset, rating):
+        buckets = self._buckets.setdefault(str(player_id), {})
+        raw_bucket = buckets.get(bucket_start, None)
+        if raw_bucket is None:
+            raw_bucket = buckets[bucket_start] = {
+                'player_id': player_id, 'start': bucket_start, 'offsets': [], 'ratings': []
+            }
+        elif raw_bucket['last_rating'] == rating:
+            return False
+
+        raw_bucket['offsets'].append(offset)
+        raw_bucket['ratings'].append(rating)
+        raw_bucket['last_rating'] = rating
+        return True
+
+    async def find(self, player_id, min_start=None, max_start=None):
+        buckets = self._buckets.get(str(player_id), {})
+        starts = [
+            start for start in sorted(buckets)
+            if min_start is None or start >= min_start
+        ]
+        return [
+            {
+                'start': start,
+                'offsets': list(buckets[start]['offsets']),
+                'ratings': list(buckets[start]['ratings']),
+            }
+            for start in starts if max_start is None or start <= max_start
+        ]
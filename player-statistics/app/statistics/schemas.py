@@ -1,4 +1,8 @@
-from marshmallow import Schema, fields, validates, ValidationError, post_load
+from datetime import datetime, timezone
+
+from marshmallow import Schema, fields, validate, validates, validates_schema, \
+    ValidationError, post_load
+from umongo.marshmallow_bonus import ObjectId
 
 from app import app
 
@@ -7,46 +11,221 @@ PlayerStatistic = app.config["LAZY_UMONGO"].PlayerStatistic
 
 
 class InitPlayerStatisticSchema(PlayerStatistic.schema.as_marshmallow_schema()):
+    if_absent = fields.Boolean(required=False, missing=False)
 
     class Meta:
         model = PlayerStatistic
         fields = (
             'player_id',
+            'if_absent',
         )
 
 
 class RetrievePlayerStatisticSchema(PlayerStatistic.schema.as_marshmallow_schema()):
+    with_windows = fields.Boolean(required=False, missing=False)
 
     class Meta:
         model = PlayerStatistic
         fields = (
             'player_id',
+            'with_windows',
         )
 
 
-class UpdatePlayerStatisticSchema(PlayerStatistic.schema.as_marshmallow_schema()):
-    IS_DECREASED_ERROR_TEMPLATE = "The passed value='{}' must be greater or equal to the current."
+class ImportPlayerStatisticSchema(PlayerStatistic.schema.as_marshmallow_schema()):
+
+    class Meta:
+        model = PlayerStatistic
+        fields = (
+            'player_id',
+            'total_games',
+            'wins',
+            'loses',
+            'rating',
+        )
+
+
+class BatchRetrievePlayerStatisticSchema(Schema):
+    MAX_PLAYER_IDS = 100
+
+    player_ids = fields.List(
+        ObjectId(),
+        required=True,
+        validate=validate.Length(
+            min=1,
+            max=MAX_PLAYER_IDS,
+            error='The list must contain from {min} to {max} player identifiers.'
+        )
+    )
+
+
+class LeaderboardSchema(Schema):
+    MAX_LIMIT = 100
+
+    offset = fields.Integer(
+        required=False,
+        missing=0,
+        validate=validate.Range(min=0, error='The offset cannot be negative.')
+    )
+    limit = fields.Integer(
+        required=False,
+        missing=10,
+        validate=validate.Range(
+            min=1,
+            max=MAX_LIMIT,
+            error='The limit must be in the range from {min} to {max}.'
+        )
+    )
+    player_id = ObjectId(required=False)
+
+
+class SearchByRatingSchema(Schema):
+    MAX_LIMIT = 100
+    MAX_EXCLUDED_PLAYERS = 1000
+
+    rating = fields.Integer(
+        required=True,
+        validate=validate.Range(min=0, error='The rating cannot be negative.')
+    )
+    delta = fields.Integer(
+        required=True,
+        validate=validate.Range(min=0, error='The delta cannot be negative.')
+    )
+    limit = fields.Integer(
+        required=False,
+        missing=20,
+        validate=validate.Range(
+            min=1,
+            max=MAX_LIMIT,
+            error='The limit must be in the range from {min} to {max}.'
+        )
+    )
+    exclude_player_ids = fields.List(
+        ObjectId(),
+        required=False,
+        missing=list,
+        validate=validate.Length(
+            max=MAX_EXCLUDED_PLAYERS,
+            error='The list can contain up to {max} player identifiers.'
+        )
+    )
+
+
+class ExportSchema(Schema):
+    FORMATS = ('ndjson', 'csv')
+
+    export_format = fields.String(
+        load_from='format',
+        required=False,
+        missing='ndjson',
+        validate=validate.OneOf(FORMATS, error='The format must be one of: {choices}.')
+    )
+    after_id = ObjectId(load_from='after', required=False)
+
+
+class RatingHistorySchema(Schema):
+    MAX_POINTS = 1000
+    INVALID_RANGE_ERROR = 'The start of the range must be earlier than its end.'
+
+    player_id = ObjectId(required=True)
+    start = fields.DateTime(load_from='from', required=False)
+    end = fields.DateTime(load_from='to', required=False)
+    points = fields.Integer(
+        required=False,
+        missing=100,
+        validate=validate.Range(
+            min=1,
+            max=MAX_POINTS,
+            error='The amount of points must be in the range from {min} to {max}.'
+        )
+    )
+
+    @staticmethod
+    def to_utc(timestamp):
+        # The history is stored in UTC without the time zone
+        if timestamp is not None and timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return timestamp
+
+    @validates_schema
+    def validate_range(self, data):
+        # The range ends at the current time by default
+        start = self.to_utc(data.get('start', None))
+        end = self.to_utc(data.get('end', None)) or datetime.utcnow()
+        if start is not None and start >= end:
+            raise ValidationError(self.INVALID_RANGE_ERROR, 'start')
+
+    @post_load
+    def convert_to_utc(self, data):
+        for field_name in ('start', 'end'):
+            if field_name in data:
+                data[field_name] = self.to_utc(data[field_name])
+        return data
+
+
+class MatchParticipantSchema(Schema):
+    WIN = 'win'
+    LOSE = 'lose'
+
+    player_id = ObjectId(required=True)
+    result = fields.String(
+        required=True,
+        validate=validate.OneOf(
+            (WIN, LOSE),
+            error='The result must be one of: {choices}.'
+        )
+    )
+    rating_delta = fields.Integer(required=False, missing=0)
+
+
+class RecordMatchResultSchema(Schema):
+    MAX_PARTICIPANTS = 100
+    DUPLICATED_PLAYER_ERROR = 'Each player can be mentioned only once in the match.'
+
+    participants = fields.Nested(
+        MatchParticipantSchema,
+        many=True,
+        required=True,
+        validate=validate.Length(
+            min=1,
+            max=MAX_PARTICIPANTS,
+            error='The list must contain from {min} to {max} participants.'
+        )
+    )
+
+    @validates('participants')
+    def validate_unique_players(self, participants):
+        # Invalid participants are already reported by the nested schema
+        player_ids = [participant['player_id'] for participant in participants
+                      if 'player_id' in participant]
+        if len(set(player_ids)) != len(player_ids):
+            raise ValidationError(self.DUPLICATED_PLAYER_ERROR)
 
-    def __init__(self, instance, *args, **kwargs):
-        super(UpdatePlayerStatisticSchema, self).__init__(*args, **kwargs)
-        self.instance = instance
 
-    def validate_for_increased_value(self, old_value, new_value):
-        if new_value < old_value:
-            raise ValidationError(self.IS_DECREASED_ERROR_TEMPLATE.format(new_value))
+class UpdatePlayerStatisticSchema(PlayerStatistic.schema.as_marshmallow_schema()):
+    """
+    Schema for the statistics update. It doesn't store the updated document,
+    so one instance can be reused for all requests: the current document is
+    passed to the `load_for_instance(instance, data)` call instead.
+    """
+    IS_DECREASED_ERROR_TEMPLATE = "The passed value='{}' must be greater or equal to the current."
+    MONOTONIC_FIELDS = ('total_games', 'wins', 'loses')
 
-    @validates('total_games')
-    def validate_total_games_is_increased(self, value):
-        self.validate_for_increased_value(self.instance.total_games, value)
+    def validate_for_increased_values(self, instance, data):
+        errors = {}
+        for field_name in self.MONOTONIC_FIELDS:
+            if field_name in data and data[field_name] < getattr(instance, field_name):
+                errors[field_name] = [self.IS_DECREASED_ERROR_TEMPLATE.format(data[field_name])]
 
-    @validates('wins')
-    def validate_wins_is_increased(self, value):
-        self.validate_for_increased_value(self.instance.wins, value)
+        if errors:
+            raise ValidationError(errors)
 
-    @validates('loses')
-    def validate_loses_is_increased(self, value):
-        self.validate_for_increased_value(self.instance.loses, value)
+    def load_for_instance(self, instance, data):
+        result = self.load(data)
+        self.validate_for_increased_values(instance, result.data)
+        return result
 
     class Meta:
         strict = True
         model = PlayerStatistic
+        exclude = ('version', 'updated_at', 'windows')
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+
+class StatisticsWindows(object):
+    """
+    Counters of the games played during the current day, week and season,
+    kept next to the lifetime ones in the `windows` subdocument.
+
+    Each window is identified by its start time (in UTC): a day starts at
+    midnight, a week on Monday and the seasons are `season_length` days long,
+    counted from `season_start`. The counters are incremented with the
+    lifetime ones in the same write, which also resets the counters of the
+    ended windows, so the stored values are never summed over the matches.
+    The absolute updates of the lifetime counters increase the windows by
+    the change made by the write (see `get_update_options(values)`).
+    Windows of the players without the games in the current one are reported
+    as zeros.
+    """
+    FIELDS = ('total_games', 'wins', 'loses')
+    NAMES = ('day', 'week', 'season')
+
+    def __init__(self, names=NAMES, season_start=datetime(2026, 1, 1), season_length=91):
+        unknown = set(names) - set(self.NAMES)
+        if unknown:
+            raise ValueError("Unknown statistics windows: {}".format(', '.join(sorted(unknown))))
+        self.names = tuple(names)
+        self.season_start = season_start
+        self.season_length = timedelta(days=season_length)
+
+    @property
+    def enabled(self):
+        return bool(self.names)
+
+    def get_start(self, name, now):
+        day = datetime(now.year, now.month, now.day)
+        if name == 'day':
+            return day
+        elif name == 'week':
+            return day - timedelta(days=day.weekday())
+        seasons = (now - self.season_start) // self.season_length
+        return self.season_start + seasons * self.season_length
+
+    def get_starts(self, now=None):
+        now = now or datetime.utcnow()
+        return {name: self.get_start(name, now) for name in self.names}
+
+    def get_update_options(self, values, now=None):
+        # Arguments of a `StatisticsUpdate` which writes the lifetime counters from `values`
+        fields = tuple(field for field in self.FIELDS if field in values)
+        if not fields or not self.enabled:
+            return {}
+        return {'window_starts': self.get_starts(now), 'window_fields': fields}
+
+    def dump(self, raw_document, now=None):
+        stored = raw_document.get('windows', None) or {}
+        windows = {}
+        for name, start in self.get_starts(now).items():
+            counters = stored.get(name, {})
+            if counters.get('start', None) != start:
+                counters = {}
+            windows[name] = dict(
+                {field: counters.get(field, 0) for field in self.FIELDS},
+                start=start.isoformat() + 'Z'
+            )
+        return windows
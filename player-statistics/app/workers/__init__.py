@@ -1,4 +1,8 @@
+from app.workers.batch_retrieve_player_statistics import BatchRetrievePlayerStatisticsWorker  # NOQA
 from app.workers.init_player_statistics import InitPlayerStatisticsWorker  # NOQA
+from app.workers.leaderboard import LeaderboardWorker  # NOQA
 from app.workers.microservice_register import MicroserviceRegisterWorker  # NOQA
+from app.workers.record_match_result import RecordMatchResultWorker  # NOQA
 from app.workers.retrieve_player_statistics import RetrievePlayerStatisticsWorker  # NOQA
+from app.workers.search_by_rating import SearchByRatingWorker  # NOQA
 from app.workers.update_player_statistics import UpdatePlayerStatisticsWorker  # NOQA
@@ -0,0 +1,86 @@
+import asyncio
+import heapq
+import logging
+
+from aioamqp.exceptions import AioamqpException
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AckBatcher(object):
+    """
+    Collects completed delivery tags of one channel and acknowledges them
+    with `multiple=True` when `max_batch_size` tags are waiting or after
+    `max_delay` seconds.
+
+    A tag is acknowledged with `multiple=True` only when every tag delivered
+    before it has been completed too, so a slow request can never be acked
+    by a later one. Completed tags behind a still processed request are
+    acknowledged one by one on the timer, so that they don't hold the
+    prefetch window until the slow request is done.
+    """
+
+    def __init__(self, channel, max_batch_size=32, max_delay=0.05, loop=None):
+        self.channel = channel
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.loop = loop or asyncio.get_event_loop()
+        self._pending = set()
+        self._completed = []
+        self._timer = None
+
+    def track(self, delivery_tag):
+        self._pending.add(delivery_tag)
+
+    async def complete(self, delivery_tag):
+        self._pending.discard(delivery_tag)
+        heapq.heappush(self._completed, delivery_tag)
+
+        if len(self._completed) >= self.max_batch_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = self.loop.call_later(self.max_delay, self._on_timer)
+
+    async def reject(self, delivery_tag, requeue=True):
+        self._pending.discard(delivery_tag)
+        try:
+            await self.channel.basic_client_nack(delivery_tag=delivery_tag, requeue=requeue)
+        except AioamqpException as exc:
+            LOGGER.warning("Can't reject the message: {!r}".format(exc))
+
+    def _on_timer(self):
+        self._timer = None
+        asyncio.ensure_future(self.flush(with_out_of_order=True), loop=self.loop)
+
+    async def flush(self, with_out_of_order=False):
+        oldest_pending = min(self._pending) if self._pending else None
+        last_tag = None
+        while self._completed and (oldest_pending is None or self._completed[0] < oldest_pending):
+            last_tag = heapq.heappop(self._completed)
+
+        out_of_order_tags = []
+        if with_out_of_order:
+            while self._completed:
+                out_of_order_tags.append(heapq.heappop(self._completed))
+
+        if not self._completed:
+            self.close()
+        elif self._timer is None:
+            # An armed timer is kept, so the flushes triggered by the batch size can't
+            # postpone the tags waiting behind a slow request
+            self._timer = self.loop.call_later(self.max_delay, self._on_timer)
+
+        try:
+            if last_tag is not None:
+                await self.channel.basic_client_ack(delivery_tag=last_tag, multiple=True)
+            for delivery_tag in out_of_order_tags:
+                await self.channel.basic_client_ack(delivery_tag=delivery_tag)
+        except AioamqpException as exc:
+            # Unacknowledged messages of a closed channel are redelivered by the broker
+            LOGGER.warning("Can't acknowledge messages: {!r}".format(exc))
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+from aioamqp.exceptions import AioamqpException
+from bson import ObjectId
+from sanic_amqp_ext import AmqpWorker
+from sage_utils.wrappers import Response
+
+from app.workers.acks import AckBatcher
+from app.workers.codecs import get_codec
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BaseStatisticsWorker(AmqpWorker):
+    """
+    Base class for the workers which are processing RPC requests from the
+    queue declared in QUEUE_NAME.
+
+    The prefetch count limits the amount of unacknowledged messages that can be
+    delivered to the worker, and the max in-flight limit bounds the amount of
+    requests processed concurrently. Both values are taken from the app config
+    with the CONFIG_PREFIX prefix (for example `RETRIEVE_WORKER_PREFETCH_COUNT`).
+
+    Workers don't open own connections: each of them gets a channel on the
+    connection shared by the process (see `AmqpConnectionManager`), and the
+    `setup_channel(channel)` method is called again after each reconnect.
+
+    The statistics are stored with `app.statistics_repository` (see
+    `StatisticsRepository`), so the workers don't depend on MongoDB.
+
+    On shutdown `drain(timeout)` cancels the consumer and waits for the
+    requests which are already processed, so that their replies are published
+    and the messages are acknowledged instead of being redelivered.
+
+    Workers report their metrics to `app.metrics`; the handlers wrap their
+    validation and storage calls in `measure_stage('validate')` and
+    `measure_stage('mongo')` blocks.
+    """
+    QUEUE_NAME = None
+    REQUEST_EXCHANGE_NAME = None
+    RESPONSE_EXCHANGE_NAME = 'open-matchmaking.responses.direct'
+    CONFIG_PREFIX = None
+
+    def __init__(self, app, *args, **kwargs):
+        super(BaseStatisticsWorker, self).__init__(app, *args, **kwargs)
+        self.prefetch_count = self.get_config_value('PREFETCH_COUNT')
+        self.max_in_flight = self.get_config_value('MAX_IN_FLIGHT') or self.prefetch_count
+        self.in_flight_semaphore = None
+        self.ack_batcher = None
+        self.channel = None
+        self.consumer_tag = None
+        self.draining = False
+        self.tasks = set()
+        self.metrics = app.metrics
+
+    @property
+    def name(self):
+        # The last part of the queue name, e.g. "retrieve" or "batch-retrieve"
+        return self.QUEUE_NAME.rsplit('.', 1)[-1]
+
+    def get_config_value(self, name):
+        return self.app.config['{}_{}'.format(self.CONFIG_PREFIX, name)]
+
+    @property
+    def repository(self):
+        return self.app.statistics_repository
+
+    @contextmanager
+    def measure_stage(self, stage):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.metrics.stage_latency.observe(
+                time.perf_counter() - started_at, queue=self.QUEUE_NAME, stage=stage
+            )
+
+    def statistics_changed(self, content, version=None, rating_changed=False):
+        # Called with the serialized statistics and the version of the stored document
+        # after each successful write. The history gets a point only when the write
+        # changed the rating, so the init and the updates of other fields are skipped
+        self.app.statistics_cache.set(content['player_id'], content)
+        self.app.rating_index.update(content['player_id'], content['rating'])
+        if rating_changed:
+            self.app.rating_history.record(ObjectId(content['player_id']), content['rating'])
+        self.app.statistics_events.publish(content, version)
+
+    async def get_response(self, data):
+        raise NotImplementedError('`get_response(data)` method must be implemented.')
+
+    async def process_request(self, channel, body, envelope, properties):
+        # Reply in the same format that was used by the client
+        codec = get_codec(properties.content_type)
+        with self.measure_stage('parse'):
+            data = codec.decode(body)
+
+        response = await self.get_response(data)
+        response.data[Response.EVENT_FIELD_NAME] = properties.correlation_id
+        if Response.ERROR_FIELD_NAME in response.data:
+            error_type = response.data[Response.ERROR_FIELD_NAME][Response.ERROR_TYPE_FIELD_NAME]
+            self.metrics.errors.inc(queue=self.QUEUE_NAME, type=error_type)
+
+        if properties.reply_to:
+            with self.measure_stage('publish'):
+                await channel.publish(
+                    codec.encode(response.data),
+                    exchange_name=self.RESPONSE_EXCHANGE_NAME,
+                    routing_key=properties.reply_to,
+                    properties={
+                        'content_type': codec.CONTENT_TYPE,
+                        'delivery_mode': 2,
+                        'correlation_id': properties.correlation_id
+                    },
+                    mandatory=True
+                )
+
+    async def process_request_in_flight(self, ack_batcher, channel, body, envelope, properties,
+                                        received_at):
+        try:
+            async with self.in_flight_semaphore:
+                await self.process_request(channel, body, envelope, properties)
+        except Exception:
+            # Give the message one more attempt, but drop it if it was already redelivered
+            LOGGER.exception("Can't process the message from the {} queue".format(self.QUEUE_NAME))
+            self.metrics.errors.inc(queue=self.QUEUE_NAME, type='UnhandledException')
+            await ack_batcher.reject(envelope.delivery_tag, requeue=not envelope.is_redeliver)
+        else:
+            await ack_batcher.complete(envelope.delivery_tag)
+        finally:
+            self.metrics.in_flight.dec(queue=self.QUEUE_NAME)
+            self.metrics.latency.observe(time.perf_counter() - received_at, queue=self.QUEUE_NAME)
+
+    async def consume_callback(self, channel, body, envelope, properties):
+        if self.draining:
+            # Delivered before the broker got the cancellation, so let another process take it
+            await self.ack_batcher.reject(envelope.delivery_tag, requeue=True)
+            return
+
+        # Don't block there: this callback is awaited by the connection reader. The
+        # amount of waiting tasks is bounded by the prefetch count instead.
+        self.metrics.messages.inc(queue=self.QUEUE_NAME)
+        self.metrics.in_flight.inc(queue=self.QUEUE_NAME)
+        self.ack_batcher.track(envelope.delivery_tag)
+        task = self.app.loop.create_task(self.process_request_in_flight(
+            self.ack_batcher, channel, body, envelope, properties, time.perf_counter()
+        ))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def drain(self, timeout):
+        self.draining = True
+        if self.channel is not None and self.channel.is_open and self.consumer_tag is not None:
+            try:
+                await self.channel.basic_cancel(self.consumer_tag)
+            except AioamqpException as exc:
+                LOGGER.warning("Can't cancel the consumer of the {} queue: {!r}".format(
+                    self.QUEUE_NAME, exc
+                ))
+
+        if self.tasks:
+            _done, pending = await asyncio.wait(list(self.tasks), timeout=timeout)
+            if pending:
+                # Unacknowledged messages are redelivered after the channel is closed
+                LOGGER.warning("{} message(s) of the {} queue weren't processed in time".format(
+                    len(pending), self.QUEUE_NAME
+                ))
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
+
+        if self.ack_batcher is not None:
+            await self.ack_batcher.flush(with_out_of_order=True)
+            self.ack_batcher.close()
+
+    async def run(self, *args, **kwargs):
+        self.draining = False
+        self.in_flight_semaphore = asyncio.Semaphore(self.max_in_flight)
+        await self.app.amqp_connection.register(self)
+
+    async def setup_channel(self, channel):
+        self.channel = channel
+        if self.ack_batcher is not None:
+            self.ack_batcher.close()
+        self.ack_batcher = AckBatcher(
+            channel,
+            max_batch_size=self.app.config["AMQP_ACK_BATCH_SIZE"],
+            max_delay=self.app.config["AMQP_ACK_BATCH_DELAY"] / 1000.0,
+            loop=self.app.loop
+        )
+
+        await channel.queue_declare(
+            queue_name=self.QUEUE_NAME,
+            durable=True,
+            passive=False,
+            auto_delete=False
+        )
+        await channel.queue_bind(
+            queue_name=self.QUEUE_NAME,
+            exchange_name=self.REQUEST_EXCHANGE_NAME,
+            routing_key=self.QUEUE_NAME
+        )
+        await channel.basic_qos(
+            prefetch_count=self.prefetch_count,
+            prefetch_size=0,
+            connection_global=False
+        )
+        result = await channel.basic_consume(self.consume_callback, queue_name=self.QUEUE_NAME)
+        self.consumer_tag = result['consumer_tag']
+
+    async def deinit(self):
+        await self.app.amqp_connection.unregister(self)
@@ -0,0 +1,56 @@
+from marshmallow import ValidationError
+from sage_utils.constants import VALIDATION_ERROR
+from sage_utils.wrappers import Response
+
+from app.workers.base import BaseStatisticsWorker
+
+
+class BatchRetrievePlayerStatisticsWorker(BaseStatisticsWorker):
+    QUEUE_NAME = 'player-stats.statistic.batch-retrieve'
+    REQUEST_EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.batch-retrieve.direct'
+    CONFIG_PREFIX = 'BATCH_RETRIEVE_WORKER'
+
+    def __init__(self, app, *args, **kwargs):
+        super(BatchRetrievePlayerStatisticsWorker, self).__init__(app, *args, **kwargs)
+        from app.statistics.documents import PlayerStatistic
+        from app.statistics.schemas import BatchRetrievePlayerStatisticSchema
+        self.player_statistic_document = PlayerStatistic
+        self.schema = BatchRetrievePlayerStatisticSchema()
+        self.cache = app.statistics_cache
+
+    async def validate_data(self, data):
+        result = self.schema.load(data)
+        if result.errors:
+            raise ValidationError(result.errors)
+
+        return result.data
+
+    async def retrieve_player_statistics(self, data):
+        try:
+            with self.measure_stage('validate'):
+                data = await self.validate_data(data)
+        except ValidationError as exc:
+            return Response.from_error(VALIDATION_ERROR, exc.normalized_messages())
+
+        player_ids = list(dict.fromkeys(data['player_ids']))
+        found = self.cache.get_many(player_ids)
+
+        not_cached_ids = [player_id for player_id in player_ids if player_id not in found]
+        if not_cached_ids:
+            generation = self.cache.get_generation()
+            with self.measure_stage('mongo'):
+                raw_documents = await self.repository.get_many(not_cached_ids)
+
+            for player_id, raw_document in raw_documents.items():
+                content = self.player_statistic_document.build_from_mongo(raw_document).dump()
+                self.cache.set(player_id, content, generation)
+                found[player_id] = content
+
+        return Response.with_content({
+            'found': [found[player_id] for player_id in player_ids if player_id in found],
+            'missing': [str(player_id) for player_id in player_ids
+                        if player_id not in found],
+        })
+
+    async def get_response(self, data):
+        return await self.retrieve_player_statistics(data)
@@ -0,0 +1,94 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+class JsonCodec(object):
+    """
+    JSON codec which is using the fastest available backend: orjson, ujson
+    or the standard json module.
+    """
+    CONTENT_TYPE = 'application/json'
+
+    def __init__(self):
+        if orjson is not None:
+            self.backend = 'orjson'
+            self._loads = orjson.loads
+            self._dumps = self._orjson_dumps
+        elif ujson is not None:
+            self.backend = 'ujson'
+            self._loads = ujson.loads
+            self._dumps = self._ujson_dumps
+        else:
+            self.backend = 'json'
+            self._loads = json.loads
+            self._dumps = self._json_dumps
+
+    @staticmethod
+    def _orjson_dumps(data):
+        # Validation errors of list fields are using indexes as the keys
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    @staticmethod
+    def _ujson_dumps(data):
+        return ujson.dumps(data).encode('utf-8')
+
+    @staticmethod
+    def _json_dumps(data):
+        return json.dumps(data).encode('utf-8')
+
+    def decode(self, raw_data):
+        try:
+            return self._loads(raw_data.strip())
+        except ValueError:
+            return {}
+
+    def encode(self, data):
+        return self._dumps(data)
+
+
+class MsgPackCodec(object):
+    CONTENT_TYPE = 'application/msgpack'
+
+    def decode(self, raw_data):
+        try:
+            return msgpack.unpackb(raw_data, raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException):
+            return {}
+
+    def encode(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+
+
+JSON_CODEC = JsonCodec()
+CODECS = {
+    JsonCodec.CONTENT_TYPE: JSON_CODEC,
+}
+if msgpack is not None:
+    CODECS[MsgPackCodec.CONTENT_TYPE] = MsgPackCodec()
+    CODECS['application/x-msgpack'] = CODECS[MsgPackCodec.CONTENT_TYPE]
+
+
+def get_codec(content_type, default=JSON_CODEC):
+    """
+    Returns the codec for the given content type of the message. Unknown or
+    unsupported content types are handled by the default (JSON) codec.
+    """
+    if not content_type:
+        return default
+
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return CODECS.get(media_type, default)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+
+from aioamqp import connect as amqp_connect
+from aioamqp.exceptions import AioamqpException
+from aioamqp.protocol import OPEN
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AmqpConnectionManager(object):
+    """
+    Shares one AMQP connection between all workers of the current process.
+
+    Each registered worker gets its own channel on this connection. When the
+    connection is lost, the manager reconnects with exponential backoff and
+    calls `setup_channel(channel)` of every worker again, so that the queues,
+    bindings and consumers are re-declared on the new channel. A channel
+    closed by the broker while the connection stays up (e.g. after a failed
+    declaration) is reopened for its worker the same way, with the delays
+    growing from `min_delay` to `max_delay` while the channel keeps closing.
+
+    On shutdown the workers are drained first, and only then the channels and
+    the connection are closed. The publishers (registered with
+    `publisher=True`) are drained after the consumers, because the requests
+    that are still processed can send messages through them.
+    """
+
+    def __init__(self, app, min_delay=1, max_delay=30):
+        self.app = app
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.transport = None
+        self.protocol = None
+        self.workers = []
+        self.publishers = []
+        self.channels = {}
+        self._connect_lock = None
+        self._reconnect_task = None
+        self._watchers = set()
+        self._closing = False
+
+    def get_connection_config(self):
+        config = self.app.amqp.get_config(self.app)
+        config['on_error'] = self.on_connection_error
+        return config
+
+    async def connect(self):
+        delay = self.min_delay
+        while not self._closing:
+            try:
+                self.transport, self.protocol = await amqp_connect(
+                    **self.get_connection_config()
+                )
+                return
+            except (AioamqpException, OSError) as exc:
+                LOGGER.error(
+                    "Can't connect to the AMQP broker: {!r}. Retry after {} second(s)."
+                    .format(exc, delay)
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+
+    async def ensure_connection(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self.protocol is None:
+                await self.connect()
+
+    async def open_channel(self, worker, delay=None):
+        channel = await self.protocol.channel()
+        self.channels[worker] = channel
+        # Watched before the declarations, which make the broker close a channel on errors
+        watcher = asyncio.ensure_future(
+            self.watch_channel(worker, channel, delay or self.min_delay)
+        )
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+        await worker.setup_channel(channel)
+        return channel
+
+    def is_channel_lost(self, worker, channel):
+        # Closed channels of a lost connection are reopened by `reconnect()` instead
+        return not self._closing and worker in self.workers and \
+            self.channels.get(worker) is channel and \
+            self.protocol is not None and self.protocol.state == OPEN
+
+    async def watch_channel(self, worker, channel, delay):
+        await channel.close_event.wait()
+        if not self.is_channel_lost(worker, channel):
+            return
+
+        LOGGER.warning("AMQP channel of the {} worker was closed. Reopen after {} second(s)."
+                       .format(type(worker).__name__, delay))
+        await asyncio.sleep(delay)
+        if not self.is_channel_lost(worker, channel):
+            return
+
+        try:
+            await self.open_channel(worker, delay=min(delay * 2, self.max_delay))
+        except (AioamqpException, OSError) as exc:
+            # A channel closed during the declarations is reopened by its own watcher
+            LOGGER.error("Can't reopen the AMQP channel: {!r}".format(exc))
+
+    async def register(self, worker, publisher=False):
+        self._closing = False
+        await self.ensure_connection()
+        if self.protocol is None:
+            return None
+
+        self.workers.append(worker)
+        if publisher:
+            self.publishers.append(worker)
+        return await self.open_channel(worker)
+
+    async def unregister(self, worker):
+        if worker in self.workers:
+            self.workers.remove(worker)
+        if worker in self.publishers:
+            self.publishers.remove(worker)
+
+        channel = self.channels.pop(worker, None)
+        if channel is not None and channel.is_open:
+            try:
+                await channel.close()
+            except AioamqpException:
+                pass
+
+        if not self.workers:
+            await self.close()
+
+    async def shutdown(self, timeout):
+        # Don't reconnect anymore: the acknowledgements would be sent to a new channel
+        self._closing = True
+        consumers = [worker for worker in self.workers if worker not in self.publishers]
+        await asyncio.gather(*[worker.drain(timeout) for worker in consumers])
+        await asyncio.gather(*[publisher.drain(timeout) for publisher in self.publishers])
+        for worker in list(self.workers):
+            await self.unregister(worker)
+
+    async def on_connection_error(self, exc):
+        if self._closing or not self.workers:
+            return
+
+        if self._reconnect_task is None or self._reconnect_task.done():
+            LOGGER.warning("AMQP connection was lost: {!r}. Reconnecting.".format(exc))
+            self._reconnect_task = asyncio.ensure_future(self.reconnect())
+
+    async def reconnect(self):
+        delay = self.min_delay
+        while not self._closing:
+            self.free_connection()
+            await self.connect()
+            if self.protocol is None:
+                return
+
+            try:
+                for worker in list(self.workers):
+                    await self.open_channel(worker)
+                return
+            except (AioamqpException, OSError) as exc:
+                LOGGER.error(
+                    "Can't declare the topology after reconnect: {!r}. Retry after {} second(s)."
+                    .format(exc, delay)
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+
+    def free_connection(self):
+        for watcher in list(self._watchers):
+            watcher.cancel()
+        if self.transport is not None:
+            self.transport.close()
+
+        self.channels = {}
+        self.transport = None
+        self.protocol = None
+
+    async def close(self):
+        self._closing = True
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            self._reconnect_task.cancel()
+
+        if self.protocol is not None:
+            try:
+                await self.protocol.close()
+            except AioamqpException:
+                pass
+
+        self.free_connection()
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+
+from aioamqp.exceptions import AioamqpException
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class StatisticsEventPublisher(object):
+    """
+    Publishes a "statistics changed" event to the EXCHANGE_NAME topic
+    exchange after the statistics of a player were written by the workers,
+    so the clients can subscribe to the changes instead of polling the
+    retrieve queue. The routing key is `<ROUTING_KEY_PREFIX>.<player_id>`.
+
+    Changes are collected during `window` seconds and each player gets at
+    most one event per window, with the values before the first and after
+    the last change. An event has only the changed fields:
+
+        {"player_id": "...", "old": {"wins": 5}, "new": {"wins": 6}}
+
+    The `old` values are sent only when they are known to be the stored ones
+    right before the first change: this process saw the document with the
+    previous `version` (each write increments it by one), and up to
+    `max_players` of them are remembered. Otherwise, e.g. for the players
+    which were changed by another process in between or weren't seen yet,
+    `old` is null and `new` has all fields. Events are skipped only for the
+    writes which provably didn't change any value.
+
+    The publisher gets its channel from `AmqpConnectionManager` like the
+    workers do, and the pending events are published on shutdown after the
+    consumers were drained.
+    """
+    EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.changed.topic'
+    ROUTING_KEY_PREFIX = 'player-stats.statistic.changed'
+    CONTENT_TYPE = 'application/json'
+    FIELDS = ('total_games', 'wins', 'loses', 'rating')
+
+    def __init__(self, app, window=1.0, max_players=10000, enabled=True):
+        self.app = app
+        self.window = window
+        self.max_players = max_players
+        self.enabled = enabled
+        self.metrics = app.metrics.counter(
+            'player_statistics_events_total',
+            'Statistics changed events by the outcome: published, coalesced or dropped.',
+            ('status', )
+        )
+        self.channel = None
+        self._pending = OrderedDict()
+        self._known = OrderedDict()
+        self._timer = None
+        self._flush_task = None
+
+    def get_values(self, content):
+        return {field: content[field] for field in self.FIELDS if field in content}
+
+    def publish(self, content, version=None):
+        if not self.enabled:
+            return
+
+        player_id = str(content['player_id'])
+        values = self.get_values(content)
+        pending = self._pending.get(player_id, None)
+        if pending is not None:
+            # Coalesced: the old values stay the ones from before the first change
+            pending['new'], pending['version'] = values, version
+            self.metrics.inc(status='coalesced')
+        else:
+            self._pending[player_id] = {
+                'old': self.get_old_values(player_id, version),
+                'new': values,
+                'version': version,
+            }
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if self._timer is None:
+            self._timer = asyncio.get_event_loop().call_later(self.window, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        # A running flush schedules the next one itself
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    def get_old_values(self, player_id, version):
+        known_version, values = self._known.get(player_id, (None, None))
+        if version is None or known_version is None:
+            return None
+        # The same version if nothing was written, the next one after one write
+        if version - known_version in (0, 1):
+            return values
+        return None
+
+    def remember(self, player_id, version, values):
+        if version is None:
+            self._known.pop(player_id, None)
+            return
+
+        self._known[player_id] = (version, values)
+        self._known.move_to_end(player_id)
+        while len(self._known) > self.max_players:
+            self._known.popitem(last=False)
+
+    @staticmethod
+    def get_event(player_id, old, new):
+        if old is None:
+            return {'player_id': player_id, 'old': None, 'new': new}
+
+        changed = [field for field, value in new.items() if old.get(field, None) != value]
+        if not changed:
+            return None
+        return {
+            'player_id': player_id,
+            'old': {field: old.get(field, None) for field in changed},
+            'new': {field: new[field] for field in changed},
+        }
+
+    async def flush(self):
+        pending, self._pending = self._pending, OrderedDict()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        try:
+            await self.publish_events(pending)
+        finally:
+            # Changes received while publishing
+            if self._pending:
+                self.schedule_flush()
+
+    async def publish_events(self, pending):
+        for player_id, change in pending.items():
+            event = self.get_event(player_id, change['old'], change['new'])
+            self.remember(player_id, change['version'], change['new'])
+            if event is None:
+                continue
+
+            if self.channel is None or not self.channel.is_open:
+                self.metrics.inc(status='dropped')
+                continue
+
+            try:
+                await self.channel.publish(
+                    json.dumps(event),
+                    exchange_name=self.EXCHANGE_NAME,
+                    routing_key='{}.{}'.format(self.ROUTING_KEY_PREFIX, player_id),
+                    properties={'content_type': self.CONTENT_TYPE, 'delivery_mode': 2}
+                )
+            except AioamqpException as exc:
+                LOGGER.warning("Can't publish the statistics changed event: {!r}".format(exc))
+                self.metrics.inc(status='dropped')
+            else:
+                self.metrics.inc(status='published')
+
+    async def setup_channel(self, channel):
+        self.channel = channel
+        await channel.exchange_declare(
+            exchange_name=self.EXCHANGE_NAME,
+            type_name='topic',
+            durable=True,
+            auto_delete=False
+        )
+
+    async def run(self):
+        if self.enabled:
+            await self.app.amqp_connection.register(self, publisher=True)
+
+    async def drain(self, timeout):
+        if self._flush_task is not None and not self._flush_task.done():
+            await asyncio.wait([self._flush_task], timeout=timeout)
+        await asyncio.wait_for(self.flush(), timeout)
@@ -0,0 +1,37 @@
+from marshmallow import ValidationError
+from sage_utils.constants import VALIDATION_ERROR
+from sage_utils.wrappers import Response
+
+from app.workers.base import BaseStatisticsWorker
+
+
+class LeaderboardWorker(BaseStatisticsWorker):
+    QUEUE_NAME = 'player-stats.statistic.leaderboard'
+    REQUEST_EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.leaderboard.direct'
+    CONFIG_PREFIX = 'LEADERBOARD_WORKER'
+
+    def __init__(self, app, *args, **kwargs):
+        super(LeaderboardWorker, self).__init__(app, *args, **kwargs)
+        from app.statistics.schemas import LeaderboardSchema
+        self.schema = LeaderboardSchema()
+
+    async def validate_data(self, data):
+        result = self.schema.load(data)
+        if result.errors:
+            raise ValidationError(result.errors)
+
+        return result.data
+
+    async def get_leaderboard(self, data):
+        try:
+            with self.measure_stage('validate'):
+                data = await self.validate_data(data)
+        except ValidationError as exc:
+            return Response.from_error(VALIDATION_ERROR, exc.normalized_messages())
+
+        with self.measure_stage('mongo'):
+            content = await self.app.leaderboard.get_leaderboard(**data)
+        return Response.with_content(content)
+
+    async def get_response(self, data):
+        return await self.get_leaderboard(data)
@@ -17,9 +17,25 @@ class MicroserviceRegisterWorker(SanicAmqpExtensionMixin, BaseRegisterWorker):
                     'codename': 'player-stats.statistic.retrieve',
                     'description': 'Get a player statistics',
                 },
+                {
+                    'codename': 'player-stats.statistic.batch-retrieve',
+                    'description': 'Get statistics for the list of players',
+                },
+                {
+                    'codename': 'player-stats.statistic.search-by-rating',
+                    'description': 'Find players with the rating close to the given one',
+                },
                 {
                     'codename': 'player-stats.statistic.update',
                     'description': 'Update a player statistics',
                 },
+                {
+                    'codename': 'player-stats.statistic.leaderboard',
+                    'description': 'Get the top players by rating and the rank of a player',
+                },
+                {
+                    'codename': 'player-stats.statistic.record-match-result',
+                    'description': 'Apply a match result to the statistics of the participants',
+                },
             ]
         }
@@ -0,0 +1,109 @@
+from marshmallow import ValidationError
+from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
+from sage_utils.wrappers import Response
+
+from app.statistics.repositories import StatisticsUpdate
+from app.workers.base import BaseStatisticsWorker
+
+
+class RecordMatchResultWorker(BaseStatisticsWorker):
+    """
+    Applies the result of a match as increments instead of absolute values, so
+    the clients don't need to retrieve the statistics first.
+
+    The request is either one participant (`player_id`, `result` and the
+    optional `rating_delta`) or the whole match in the `participants` list.
+    A single participant is updated with one conditional update, which
+    returns the stored document. All participants of a match are updated
+    with one bulk update of the repository and read back once; the players
+    which don't exist are found by the amount of the matched documents, and
+    the results of the existing ones are recorded anyway. The counters of
+    the current windows are incremented in the same writes.
+    """
+    QUEUE_NAME = 'player-stats.statistic.record-match-result'
+    REQUEST_EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.record-match-result.direct'
+    CONFIG_PREFIX = 'RECORD_MATCH_RESULT_WORKER'
+
+    PLAYERS_NOT_FOUND_ERROR = "Players were not found or don't exist: {}."
+
+    def __init__(self, app, *args, **kwargs):
+        super(RecordMatchResultWorker, self).__init__(app, *args, **kwargs)
+        from app.statistics.documents import PlayerStatistic
+        from app.statistics.schemas import MatchParticipantSchema, RecordMatchResultSchema
+        self.player_statistic_document = PlayerStatistic
+        self.schema = RecordMatchResultSchema()
+        self.win_result = MatchParticipantSchema.WIN
+
+    async def validate_data(self, data):
+        result = self.schema.load(data)
+        if result.errors:
+            raise ValidationError(result.errors)
+
+        return result.data
+
+    def get_update(self, participant, window_starts=None):
+        rating_delta = participant['rating_delta']
+        result_field = 'wins' if participant['result'] == self.win_result else 'loses'
+        # The rating can't be negative, so it's clamped in the same write instead of
+        # reading the current value first
+        return StatisticsUpdate(
+            participant['player_id'],
+            inc_values={'total_games': 1, result_field: 1, 'rating': rating_delta},
+            non_negative=('rating', ) if rating_delta < 0 else (),
+            window_starts=window_starts,
+            window_inc_values={'total_games': 1, result_field: 1}
+        )
+
+    async def record_match_result(self, data):
+        is_single_participant = 'participants' not in data
+        if is_single_participant:
+            data = {'participants': [data]}
+
+        try:
+            with self.measure_stage('validate'):
+                data = await self.validate_data(data)
+        except ValidationError as exc:
+            errors = exc.normalized_messages()
+            if is_single_participant and 'participants' in errors:
+                errors = errors['participants'].get(0, errors['participants'])
+            return Response.from_error(VALIDATION_ERROR, errors)
+
+        participants = data['participants']
+        player_ids = [participant['player_id'] for participant in participants]
+        # The same windows for all participants, even at the boundary
+        window_starts = self.app.statistics_windows.get_starts()
+        updates = [self.get_update(participant, window_starts) for participant in participants]
+        with self.measure_stage('mongo'):
+            if len(updates) == 1:
+                raw_document = await self.repository.update(updates[0])
+                raw_documents = {player_ids[0]: raw_document} if raw_document is not None else {}
+                matched_count = len(raw_documents)
+            else:
+                matched_count = await self.repository.bulk_update(updates)
+                raw_documents = await self.repository.get_many(player_ids)
+
+        rating_deltas = {
+            participant['player_id']: participant['rating_delta'] for participant in participants
+        }
+        contents = {}
+        for player_id, raw_document in raw_documents.items():
+            content = self.player_statistic_document.build_from_mongo(raw_document).dump()
+            self.statistics_changed(
+                content, raw_document.get('version', None),
+                rating_changed=rating_deltas[player_id] != 0
+            )
+            contents[player_id] = content
+
+        if matched_count < len(updates):
+            missing_ids = [str(player_id) for player_id in player_ids
+                           if player_id not in raw_documents]
+            return Response.from_error(
+                NOT_FOUND_ERROR, self.PLAYERS_NOT_FOUND_ERROR.format(', '.join(missing_ids))
+            )
+
+        if is_single_participant:
+            return Response.with_content(contents[player_ids[0]])
+        return Response.with_content([contents[player_id] for player_id in player_ids])
+
+    async def get_response(self, data):
+        return await self.record_match_result(data)
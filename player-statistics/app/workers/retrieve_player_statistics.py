@@ -1,17 +1,14 @@
-import json
-
-from aioamqp import AmqpClosedConnection
 from marshmallow import ValidationError
-from sanic_amqp_ext import AmqpWorker
 from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
 from sage_utils.wrappers import Response
 
+from app.workers.base import BaseStatisticsWorker
+
 
-class RetrievePlayerStatisticsWorker(AmqpWorker):
+class RetrievePlayerStatisticsWorker(BaseStatisticsWorker):
     QUEUE_NAME = 'player-stats.statistic.retrieve'
     REQUEST_EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.retrieve.direct'
-    RESPONSE_EXCHANGE_NAME = 'open-matchmaking.responses.direct'
-    CONTENT_TYPE = 'application/json'
+    CONFIG_PREFIX = 'RETRIEVE_WORKER'
 
     PLAYER_NOT_FOUND_ERROR = "Player was not found or doesn't exist."
 
@@ -20,75 +17,41 @@ class RetrievePlayerStatisticsWorker(AmqpWorker):
         from app.statistics.documents import PlayerStatistic
         from app.statistics.schemas import RetrievePlayerStatisticSchema
         self.player_statistic_document = PlayerStatistic
-        self.schema = RetrievePlayerStatisticSchema
+        self.schema = RetrievePlayerStatisticSchema()
+        self.cache = app.statistics_cache
 
-    async def validate_data(self, raw_data):
-        try:
-            data = json.loads(raw_data.strip())
-        except json.decoder.JSONDecodeError:
-            data = {}
-
-        deserializer = self.schema()
-        result = deserializer.load(data)
+    async def validate_data(self, data):
+        result = self.schema.load(data)
         if result.errors:
             raise ValidationError(result.errors)
 
         return result.data
 
-    async def retrieve_player_statistic(self, raw_data):
+    async def retrieve_player_statistic(self, data):
         try:
-            data = await self.validate_data(raw_data)
+            with self.measure_stage('validate'):
+                data = await self.validate_data(data)
         except ValidationError as exc:
             return Response.from_error(VALIDATION_ERROR, exc.normalized_messages())
 
-        document = await self.player_statistic_document.find_one(
-            {'player_id': data['player_id']}
-        )
-
-        if document is None:
-            return Response.from_error(NOT_FOUND_ERROR, self.PLAYER_NOT_FOUND_ERROR)
-        return Response.with_content(document.dump())
-
-    async def process_request(self, channel, body, envelope, properties):
-        response = await self.retrieve_player_statistic(body)
-        response.data[Response.EVENT_FIELD_NAME] = properties.correlation_id
-
-        if properties.reply_to:
-            await channel.publish(
-                json.dumps(response.data),
-                exchange_name=self.RESPONSE_EXCHANGE_NAME,
-                routing_key=properties.reply_to,
-                properties={
-                    'content_type': self.CONTENT_TYPE,
-                    'delivery_mode': 2,
-                    'correlation_id': properties.correlation_id
-                },
-                mandatory=True
-            )
+        # The cache has only the lifetime statistics
+        with_windows = data['with_windows']
+        content = self.cache.get(data['player_id']) if not with_windows else None
+        if content is not None:
+            return Response.with_content(content)
 
-        await channel.basic_client_ack(delivery_tag=envelope.delivery_tag)
+        generation = self.cache.get_generation()
+        with self.measure_stage('mongo'):
+            raw_document = await self.repository.get(data['player_id'])
 
-    async def consume_callback(self, channel, body, envelope, properties):
-        self.app.loop.create_task(self.process_request(channel, body, envelope, properties))
+        if raw_document is None:
+            return Response.from_error(NOT_FOUND_ERROR, self.PLAYER_NOT_FOUND_ERROR)
 
-    async def run(self, *args, **kwargs):
-        try:
-            _transport, protocol = await self.connect()
-        except AmqpClosedConnection as exc:
-            print(exc)
-            return
+        content = self.player_statistic_document.build_from_mongo(raw_document).dump()
+        self.cache.set(data['player_id'], content, generation)
+        if with_windows:
+            content = dict(content, windows=self.app.statistics_windows.dump(raw_document))
+        return Response.with_content(content)
 
-        channel = await protocol.channel()
-        await channel.queue_declare(
-            queue_name=self.QUEUE_NAME,
-            durable=True,
-            passive=False,
-            auto_delete=False
-        )
-        await channel.queue_bind(
-            queue_name=self.QUEUE_NAME,
-            exchange_name=self.REQUEST_EXCHANGE_NAME,
-            routing_key=self.QUEUE_NAME
-        )
-        await channel.basic_qos(prefetch_count=1, prefetch_size=0, connection_global=False)
-        await channel.basic_consume(self.consume_callback, queue_name=self.QUEUE_NAME)
+    async def get_response(self, data):
+        return await self.retrieve_player_statistic(data)
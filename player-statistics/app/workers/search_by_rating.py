@@ -0,0 +1,42 @@
+from marshmallow import ValidationError
+from sage_utils.constants import VALIDATION_ERROR
+from sage_utils.wrappers import Response
+
+from app.workers.base import BaseStatisticsWorker
+
+
+class SearchByRatingWorker(BaseStatisticsWorker):
+    """
+    Returns the players with the rating close to the passed one, which are
+    the candidates for a match. Players already picked by the matchmaker can
+    be skipped with the `exclude_player_ids` list.
+    """
+    QUEUE_NAME = 'player-stats.statistic.search-by-rating'
+    REQUEST_EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.search-by-rating.direct'
+    CONFIG_PREFIX = 'SEARCH_BY_RATING_WORKER'
+
+    def __init__(self, app, *args, **kwargs):
+        super(SearchByRatingWorker, self).__init__(app, *args, **kwargs)
+        from app.statistics.schemas import SearchByRatingSchema
+        self.schema = SearchByRatingSchema()
+
+    async def validate_data(self, data):
+        result = self.schema.load(data)
+        if result.errors:
+            raise ValidationError(result.errors)
+
+        return result.data
+
+    async def search_by_rating(self, data):
+        try:
+            with self.measure_stage('validate'):
+                data = await self.validate_data(data)
+        except ValidationError as exc:
+            return Response.from_error(VALIDATION_ERROR, exc.normalized_messages())
+
+        with self.measure_stage('mongo'):
+            players = await self.app.candidate_search.find_candidates(**data)
+        return Response.with_content({'players': players})
+
+    async def get_response(self, data):
+        return await self.search_by_rating(data)
@@ -0,0 +1,169 @@
+import asyncio
+
+from marshmallow import ValidationError
+from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
+from sage_utils.wrappers import Response
+
+from app.statistics.repositories import StatisticsUpdate
+
+
+class UpdateBuffer(object):
+    """
+    Write-behind buffer for the statistics updates.
+
+    Updates received during `window` seconds (or until `max_size` updates are
+    waiting) are flushed together: the current documents are read with one
+    `get_many` call, each update is validated in the arrival order against the
+    state left by the previous ones, and updates of the same player are merged
+    into one update. The monotonic fields are written as the maximum values, so
+    the stored values can't decrease even if another process wrote in between.
+    All updates are sent in one durable `bulk_update` of the repository, and
+    the responses are resolved only after it succeeded. The counters of the
+    passed `windows` grow by the change of the lifetime counters in the same
+    writes.
+
+    The written documents are read back afterwards, so the last response for
+    each player and `on_change` get the stored values (e.g. a greater value
+    written by another process) with a flag whether the rating was changed
+    since the batch was read, and the earlier responses get the stored
+    monotonic values when they are greater than the ones written by the batch.
+    """
+
+    def __init__(self, repository, document, schema, on_change, not_found_message,
+                 windows=None, window=0.05, max_size=500, loop=None):
+        self.repository = repository
+        self.document = document
+        self.schema = schema
+        self.on_change = on_change
+        self.not_found_message = not_found_message
+        self.windows = windows
+        self.window = window
+        self.max_size = max_size
+        self.loop = loop
+        self._pending = []
+        self._timer = None
+        self._flush_lock = None
+
+    def get_loop(self):
+        if self.loop is None:
+            self.loop = asyncio.get_event_loop()
+        return self.loop
+
+    async def submit(self, player_id, values):
+        future = self.get_loop().create_future()
+        self._pending.append((player_id, values, future))
+
+        if len(self._pending) >= self.max_size:
+            self.schedule_flush(0)
+        elif self._timer is None:
+            self.schedule_flush(self.window)
+
+        return await future
+
+    def schedule_flush(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.get_loop().call_later(
+            delay, lambda: asyncio.ensure_future(self.flush(), loop=self.get_loop())
+        )
+
+    async def flush(self):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        # Flushes are serialized, so that each batch is validated against the data
+        # already written by the previous one
+        async with self._flush_lock:
+            self._timer = None
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+
+            try:
+                await self.write(pending)
+            except Exception as exc:
+                for _player_id, _values, future in pending:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    async def write(self, pending):
+        player_ids = list({player_id for player_id, _values, _future in pending})
+        states = await self.repository.get_many(player_ids)
+        ratings = {player_id: state.get('rating', None) for player_id, state in states.items()}
+
+        results = []
+        changes = {}
+        for player_id, values, future in pending:
+            state = states.get(player_id, None)
+            if state is None:
+                results.append((future, Response.from_error(
+                    NOT_FOUND_ERROR, self.not_found_message
+                )))
+                continue
+
+            try:
+                self.schema.validate_for_increased_values(
+                    self.document.build_from_mongo(state), values
+                )
+            except ValidationError as exc:
+                results.append((future, Response.from_error(
+                    VALIDATION_ERROR, exc.normalized_messages()
+                )))
+                continue
+
+            state = dict(state, **values)
+            states[player_id] = state
+            if values:
+                changes.setdefault(player_id, {}).update(values)
+            results.append((future, state))
+
+        stored = {}
+        if changes:
+            await self.repository.bulk_update(
+                [self.get_update(player_id, values) for player_id, values in changes.items()],
+                durable=True
+            )
+            stored = await self.repository.get_many(list(changes.keys()))
+
+        for player_id, raw_document in stored.items():
+            content = self.document.build_from_mongo(raw_document).dump()
+            rating_changed = ratings.get(player_id, None) != raw_document.get('rating', None)
+            self.on_change(content, raw_document.get('version', None), rating_changed)
+
+        for future, result in results:
+            if future.done():
+                continue
+            if not isinstance(result, Response):
+                player_id = result['player_id']
+                result = Response.with_content(self.document.build_from_mongo(self.get_reply_state(
+                    result, states[player_id], stored.get(player_id, None)
+                )).dump())
+            future.set_result(result)
+
+    def get_reply_state(self, state, last_state, raw_document):
+        if raw_document is None:
+            return state
+        # The last update of the player gets the stored document
+        if state is last_state:
+            return raw_document
+        # The earlier ones only when another process wrote a greater value than this batch
+        return dict(state, **{
+            field_name: max(state.get(field_name, 0), raw_document.get(field_name, 0))
+            for field_name in self.schema.MONOTONIC_FIELDS
+            if raw_document.get(field_name, 0) > last_state.get(field_name, 0)
+        })
+
+    def get_update(self, player_id, values):
+        window_options = self.windows.get_update_options(values) if self.windows else {}
+        return StatisticsUpdate(
+            player_id,
+            set_values={
+                field_name: value for field_name, value in values.items()
+                if field_name not in self.schema.MONOTONIC_FIELDS
+            },
+            max_values={
+                field_name: value for field_name, value in values.items()
+                if field_name in self.schema.MONOTONIC_FIELDS
+            },
+            **window_options
+        )
@@ -1,99 +1,164 @@
-import json
-
-from aioamqp import AmqpClosedConnection
 from bson import ObjectId
 from marshmallow import ValidationError
-from sanic_amqp_ext import AmqpWorker
 from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
 from sage_utils.wrappers import Response
 
+from app.statistics.repositories import StatisticsUpdate
+from app.workers.base import BaseStatisticsWorker
+from app.workers.update_buffer import UpdateBuffer
+
 
-class UpdatePlayerStatisticsWorker(AmqpWorker):
+class UpdatePlayerStatisticsWorker(BaseStatisticsWorker):
     QUEUE_NAME = 'player-stats.statistic.update'
     REQUEST_EXCHANGE_NAME = 'open-matchmaking.player-stats.statistic.update.direct'
-    RESPONSE_EXCHANGE_NAME = 'open-matchmaking.responses.direct'
-    CONTENT_TYPE = 'application/json'
+    CONFIG_PREFIX = 'UPDATE_WORKER'
 
     PLAYER_NOT_FOUND_ERROR = "Player was not found or doesn't exist."
+    CONCURRENT_UPDATE_ERROR = "Player statistics were concurrently changed. Try again later."
+    MAX_ATOMIC_UPDATE_ATTEMPTS = 3
 
     def __init__(self, app, *args, **kwargs):
         super(UpdatePlayerStatisticsWorker, self).__init__(app, *args, **kwargs)
         from app.statistics.documents import PlayerStatistic
         from app.statistics.schemas import UpdatePlayerStatisticSchema
         self.player_statistic_document = PlayerStatistic
-        self.schema = UpdatePlayerStatisticSchema
-
-    async def validate_data(self, raw_data):
-        try:
-            data = json.loads(raw_data.strip())
-        except json.decoder.JSONDecodeError:
-            data = {}
+        self.schema = UpdatePlayerStatisticSchema()
+        self.update_buffer = UpdateBuffer(
+            app.statistics_repository,
+            PlayerStatistic,
+            self.schema,
+            self.statistics_changed,
+            self.PLAYER_NOT_FOUND_ERROR,
+            windows=app.statistics_windows,
+            window=app.config["UPDATE_BUFFER_WINDOW"] / 1000.0,
+            max_size=app.config["UPDATE_BUFFER_MAX_SIZE"]
+        )
 
+    async def validate_data(self, data):
         player_id = ObjectId(data['player_id']) if 'player_id' in data else None
-        document = await self.player_statistic_document.find_one({'player_id': player_id})
-        if document is None:
+        with self.measure_stage('mongo'):
+            raw_document = await self.repository.get(player_id)
+        if raw_document is None:
             raise ValueError()
 
-        deserializer = self.schema(instance=document)
-        result = deserializer.load(data)
+        document = self.player_statistic_document.build_from_mongo(raw_document)
+
+        with self.measure_stage('validate'):
+            result = self.schema.load_for_instance(document, data)
         if result.errors:
             raise ValidationError(result.errors)
 
         return document, result.data
 
-    async def update_player_statistic(self, raw_data):
+    async def update_player_statistic(self, data):
+        mode = self.app.config["UPDATE_STATISTICS_MODE"]
+        if mode == 'atomic':
+            return await self.atomic_update_player_statistic(data)
+        elif mode == 'buffered':
+            return await self.buffered_update_player_statistic(data)
+        return await self.commit_player_statistic(data)
+
+    async def commit_player_statistic(self, data):
         try:
-            document, data = await self.validate_data(raw_data)
-            document._data._data.update(data)
-            await document.commit()
+            document, data = await self.validate_data(data)
+            with self.measure_stage('mongo'):
+                raw_document = await self.repository.update(
+                    StatisticsUpdate(
+                        document.player_id, set_values=data,
+                        **self.app.statistics_windows.get_update_options(data)
+                    )
+                )
+            if raw_document is None:
+                raise ValueError()
         except ValidationError as exc:
             return Response.from_error(VALIDATION_ERROR, exc.normalized_messages())
         except ValueError:
             return Response.from_error(NOT_FOUND_ERROR, self.PLAYER_NOT_FOUND_ERROR)
 
-        return Response.with_content(document.dump())
+        content = self.player_statistic_document.build_from_mongo(raw_document).dump()
+        self.statistics_changed(
+            content, raw_document.get('version', None),
+            rating_changed=document.rating != raw_document.get('rating', None)
+        )
+        return Response.with_content(content)
+
+    async def atomic_update_player_statistic(self, data):
+        try:
+            with self.measure_stage('validate'):
+                player_id, values = self.load_values(data)
+        except ValidationError as exc:
+            return await self.get_validation_error_response(data, exc)
+
+        # Guards on the monotonic fields let the storage reject decreasing values, so
+        # the check and the write happen atomically in the same call
+        update = StatisticsUpdate(
+            player_id, set_values=values,
+            not_greater={
+                field: values[field] for field in self.schema.MONOTONIC_FIELDS if field in values
+            },
+            **self.app.statistics_windows.get_update_options(values)
+        )
 
-    async def process_request(self, channel, body, envelope, properties):
-        response = await self.update_player_statistic(body)
-        response.data[Response.EVENT_FIELD_NAME] = properties.correlation_id
+        for _ in range(self.MAX_ATOMIC_UPDATE_ATTEMPTS):
+            with self.measure_stage('mongo'):
+                raw_document = await self.repository.update(update)
+
+            if raw_document is not None:
+                document = self.player_statistic_document.build_from_mongo(raw_document)
+                content = document.dump()
+                # Without the previous document the repeated ratings are skipped by the history
+                self.statistics_changed(
+                    content, raw_document.get('version', None), rating_changed='rating' in values
+                )
+                return Response.with_content(content)
+
+            # The filter didn't match, so find out the reason with the same messages that
+            # are used by the regular validation
+            with self.measure_stage('mongo'):
+                raw_document = await self.repository.get(player_id)
+            if raw_document is None:
+                return Response.from_error(NOT_FOUND_ERROR, self.PLAYER_NOT_FOUND_ERROR)
+
+            try:
+                document = self.player_statistic_document.build_from_mongo(raw_document)
+                self.schema.load_for_instance(document, data)
+            except ValidationError as exc:
+                return Response.from_error(VALIDATION_ERROR, exc.normalized_messages())
+
+        return Response.from_error(VALIDATION_ERROR, self.CONCURRENT_UPDATE_ERROR)
+
+    async def buffered_update_player_statistic(self, data):
+        try:
+            with self.measure_stage('validate'):
+                player_id, values = self.load_values(data)
+        except ValidationError as exc:
+            return await self.get_validation_error_response(data, exc)
+
+        # Includes the time spent in the buffer until the flush
+        with self.measure_stage('mongo'):
+            return await self.update_buffer.submit(player_id, values)
+
+    async def get_validation_error_response(self, data, exc):
+        # Keep the same responses as in the commit mode, where the document is
+        # looked up before the validation
+        errors = exc.normalized_messages()
+        if 'player_id' not in data or 'player_id' not in errors and \
+                not await self.is_player_exists(ObjectId(data['player_id'])):
+            return Response.from_error(NOT_FOUND_ERROR, self.PLAYER_NOT_FOUND_ERROR)
+        return Response.from_error(VALIDATION_ERROR, errors)
 
-        if properties.reply_to:
-            await channel.publish(
-                json.dumps(response.data),
-                exchange_name=self.RESPONSE_EXCHANGE_NAME,
-                routing_key=properties.reply_to,
-                properties={
-                    'content_type': self.CONTENT_TYPE,
-                    'delivery_mode': 2,
-                    'correlation_id': properties.correlation_id
-                },
-                mandatory=True
-            )
+    def load_values(self, data):
+        result = self.schema.load(data)
+        if result.errors:
+            raise ValidationError(result.errors)
 
-        await channel.basic_client_ack(delivery_tag=envelope.delivery_tag)
+        values = dict(result.data)
+        player_id = values.pop('player_id')
+        return player_id, values
 
-    async def consume_callback(self, channel, body, envelope, properties):
-        self.app.loop.create_task(self.process_request(channel, body, envelope, properties))
+    async def is_player_exists(self, player_id):
+        with self.measure_stage('mongo'):
+            return await self.repository.exists(player_id)
 
-    async def run(self, *args, **kwargs):
-        try:
-            _transport, protocol = await self.connect()
-        except AmqpClosedConnection as exc:
-            print(exc)
-            return
-
-        channel = await protocol.channel()
-        await channel.queue_declare(
-            queue_name=self.QUEUE_NAME,
-            durable=True,
-            passive=False,
-            auto_delete=False
-        )
-        await channel.queue_bind(
-            queue_name=self.QUEUE_NAME,
-            exchange_name=self.REQUEST_EXCHANGE_NAME,
-            routing_key=self.QUEUE_NAME
-        )
-        await channel.basic_qos(prefetch_count=1, prefetch_size=0, connection_global=False)
-        await channel.basic_consume(self.consume_callback, queue_name=self.QUEUE_NAME)
-        print('done')
+    async def get_response(self, data):
+        return await self.update_player_statistic(data)
@@ -0,0 +1,365 @@
+"""
+In-process stand-ins for the MongoDB collection and the AMQP channel, so
+that the workers can be benchmarked without running services.
+
+The collection implements only the subset of the Motor API used by the
+workers and umongo, keeps the documents in a dict by `player_id` (or by
+the fields of the unique index, e.g. for the rating history buckets) and
+can add a fixed delay to each call to emulate the network round trip.
+"""
+import asyncio
+import copy
+from collections import namedtuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+
+InsertOneResult = namedtuple('InsertOneResult', ['inserted_id', 'acknowledged'])
+UpdateResult = namedtuple('UpdateResult', ['matched_count', 'modified_count', 'upserted_id'])
+BulkWriteResult = namedtuple(
+    'BulkWriteResult', ['matched_count', 'modified_count', 'upserted_count']
+)
+
+
+def match_condition(value, condition):
+    if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+        for operator, argument in condition.items():
+            if operator == '$in' and value not in argument:
+                return False
+            elif operator == '$nin' and value in argument:
+                return False
+            elif operator == '$ne' and value == argument:
+                return False
+            elif operator == '$not' and match_condition(value, argument):
+                return False
+            elif operator in ('$gt', '$gte', '$lt', '$lte'):
+                if value is None:
+                    return False
+                if operator == '$gt' and not value > argument or \
+                        operator == '$gte' and not value >= argument or \
+                        operator == '$lt' and not value < argument or \
+                        operator == '$lte' and not value <= argument:
+                    return False
+        return True
+    return value == condition
+
+
+def get_value(document, key):
+    # Dotted keys refer to the fields of the subdocuments
+    for name in key.split('.'):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(name)
+    return document
+
+
+def get_parent(document, key):
+    *path, name = key.split('.')
+    for part in path:
+        document = document.setdefault(part, {})
+    return document, name
+
+
+def match_filter(document, query):
+    return all(
+        match_condition(get_value(document, key), condition) for key, condition in query.items()
+    )
+
+
+def evaluate(document, expression):
+    # The subset of the aggregation expressions used by the update pipelines
+    if isinstance(expression, str) and expression.startswith('$'):
+        return get_value(document, expression[1:])
+    if not isinstance(expression, dict) or len(expression) != 1:
+        return expression
+
+    (operator, argument), = expression.items()
+    if operator == '$literal':
+        return copy.deepcopy(argument)
+    values = [evaluate(document, item) for item in argument]
+    if operator == '$add':
+        return sum(values)
+    elif operator == '$subtract':
+        return values[0] - values[1]
+    elif operator == '$max':
+        values = [value for value in values if value is not None]
+        return max(values) if values else None
+    elif operator == '$ifNull':
+        return values[0] if values[0] is not None else values[1]
+    elif operator == '$concatArrays':
+        return [item for value in values for item in value]
+    elif operator == '$eq':
+        return values[0] == values[1]
+    elif operator == '$cond':
+        return values[1] if values[0] else values[2]
+    raise NotImplementedError("The {} expression isn't supported.".format(operator))
+
+
+def apply_pipeline(document, pipeline):
+    for stage in pipeline:
+        (operator, values), = stage.items()
+        if operator != '$set':
+            raise NotImplementedError("The {} stage isn't supported.".format(operator))
+        # Expressions of a stage see the document before the stage
+        evaluated = {key: evaluate(document, value) for key, value in values.items()}
+        for key, value in evaluated.items():
+            parent, name = get_parent(document, key)
+            parent[name] = value
+
+
+def apply_update(document, update, inserting=False):
+    if isinstance(update, list):
+        apply_pipeline(document, update)
+        return
+
+    for operator, values in update.items():
+        for key, value in values.items():
+            parent, name = get_parent(document, key)
+            if operator == '$set':
+                parent[name] = value
+            elif operator == '$setOnInsert':
+                if inserting:
+                    parent[name] = value
+            elif operator == '$unset':
+                parent.pop(name, None)
+            elif operator == '$inc':
+                parent[name] = parent.get(name, 0) + value
+            elif operator == '$push':
+                parent.setdefault(name, []).append(value)
+            elif operator == '$max':
+                parent[name] = value if name not in parent else max(parent[name], value)
+            elif operator == '$min':
+                parent[name] = value if name not in parent else min(parent[name], value)
+            else:
+                raise NotImplementedError("The {} operator isn't supported.".format(operator))
+
+
+def apply_projection(document, projection):
+    if not projection:
+        return dict(document)
+    included = [key for key, value in projection.items() if value]
+    if included:
+        result = {key: document[key] for key in included if key in document}
+        if projection.get('_id', True) and '_id' in document:
+            result['_id'] = document['_id']
+        return result
+    return {key: value for key, value in document.items() if projection.get(key, True)}
+
+
+class StubCursor(object):
+
+    def __init__(self, documents):
+        self.documents = documents
+        self._iterator = None
+
+    def sort(self, key_or_list, direction=None):
+        keys = [(key_or_list, direction)] if isinstance(key_or_list, str) else key_or_list
+        for key, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document.get(key), reverse=direction < 0)
+        return self
+
+    def skip(self, count):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    def batch_size(self, count):
+        return self
+
+    async def _to_list(self, length):
+        return self.documents[:length] if length else self.documents
+
+    def to_list(self, length, callback=None):
+        # umongo adds a done callback to the returned object, so it must be a future
+        return asyncio.ensure_future(self._to_list(length))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iterator is None:
+            self._iterator = iter(self.documents)
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration()
+
+
+class StubCollection(object):
+
+    def __init__(self, name, latency=0.0, key_fields=('player_id', )):
+        self.name = name
+        self.latency = latency
+        self.key_fields = tuple(key_fields)
+        self.calls = 0
+        self._documents = {}
+
+    def get_key(self, document):
+        if self.key_fields == ('player_id', ):
+            return document['player_id']
+        return tuple(document.get(field) for field in self.key_fields)
+
+    def __len__(self):
+        return len(self._documents)
+
+    async def _round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    def _find(self, query):
+        query = query or {}
+        player_id = query.get('player_id', None)
+        if self.key_fields != ('player_id', ):
+            candidates = self._documents.values()
+        elif isinstance(player_id, ObjectId):
+            candidates = [self._documents[player_id]] if player_id in self._documents else []
+        elif isinstance(player_id, dict) and '$in' in player_id:
+            candidates = [
+                self._documents[key] for key in player_id['$in'] if key in self._documents
+            ]
+        else:
+            candidates = self._documents.values()
+        return [document for document in candidates if match_filter(document, query)]
+
+    def _insert(self, document):
+        document = dict(document)
+        document.setdefault('_id', ObjectId())
+        self._documents[self.get_key(document)] = document
+        return document
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def index_information(self):
+        return {}
+
+    async def insert_one(self, document):
+        await self._round_trip()
+        document = self._insert(document)
+        return InsertOneResult(document['_id'], True)
+
+    async def find_one(self, filter=None, projection=None, **kwargs):
+        await self._round_trip()
+        documents = self._find(filter)
+        return apply_projection(documents[0], projection) if documents else None
+
+    def find(self, filter=None, projection=None, **kwargs):
+        self.calls += 1
+        return StubCursor([
+            apply_projection(document, projection) for document in self._find(filter)
+        ])
+
+    async def count_documents(self, filter, limit=None, **kwargs):
+        await self._round_trip()
+        count = len(self._find(filter))
+        return min(count, limit) if limit else count
+
+    async def estimated_document_count(self, **kwargs):
+        await self._round_trip()
+        return len(self._documents)
+
+    async def distinct(self, key, filter=None, **kwargs):
+        await self._round_trip()
+        return list({document[key] for document in self._find(filter) if key in document})
+
+    def _update(self, filter, update, upsert=False):
+        documents = self._find(filter)
+        if documents:
+            before = copy.deepcopy(documents[0])
+            apply_update(documents[0], update)
+            return documents[0], None, documents[0] != before
+        if not upsert:
+            return None, None, False
+
+        document = {key: value for key, value in filter.items() if not isinstance(value, dict)}
+        apply_update(document, update, inserting=True)
+        document = self._insert(document)
+        return document, document['_id'], False
+
+    async def update_one(self, filter, update, upsert=False, **kwargs):
+        await self._round_trip()
+        document, upserted_id, modified = self._update(filter, update, upsert)
+        matched = int(document is not None and upserted_id is None)
+        return UpdateResult(matched, int(modified), upserted_id)
+
+    async def find_one_and_update(self, filter, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, **kwargs):
+        await self._round_trip()
+        documents = self._find(filter)
+        before = dict(documents[0]) if documents else None
+        document, _upserted_id, _modified = self._update(filter, update, upsert)
+        result = document if return_document == ReturnDocument.AFTER else before
+        return apply_projection(result, projection) if result is not None else None
+
+    async def find_one_and_replace(self, filter, replacement, projection=None, upsert=False,
+                                   return_document=ReturnDocument.BEFORE, **kwargs):
+        await self._round_trip()
+        documents = self._find(filter)
+        before = dict(documents[0]) if documents else None
+        if before is None and not upsert:
+            return None
+
+        document = dict(replacement)
+        document['_id'] = before['_id'] if before is not None else ObjectId()
+        self._insert(document)
+        result = document if return_document == ReturnDocument.AFTER else before
+        return apply_projection(result, projection) if result is not None else None
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        await self._round_trip()
+        matched = modified = upserted = 0
+        for request in requests:
+            document, upserted_id, is_modified = self._update(
+                request._filter, request._doc, request._upsert
+            )
+            upserted += int(upserted_id is not None)
+            matched += int(document is not None and upserted_id is None)
+            modified += int(is_modified)
+        return BulkWriteResult(matched, modified, upserted)
+
+    async def delete_many(self, filter):
+        await self._round_trip()
+        for document in self._find(filter):
+            del self._documents[self.get_key(document)]
+
+
+class StubDatabase(object):
+    KEY_FIELDS = {'rating_history': ('player_id', 'start')}
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = StubCollection(
+                name, latency=self.latency,
+                key_fields=self.KEY_FIELDS.get(name, ('player_id', ))
+            )
+        return self._collections[name]
+
+
+class StubChannel(object):
+    """
+    AMQP channel which only counts the published replies and acknowledgements.
+    """
+
+    def __init__(self):
+        self.published = 0
+        self.acknowledged = 0
+        self.rejected = 0
+
+    async def publish(self, payload, exchange_name, routing_key, properties=None, mandatory=False,
+                      immediate=False):
+        self.published += 1
+
+    async def basic_client_ack(self, delivery_tag, multiple=False):
+        self.acknowledged += 1
+
+    async def basic_client_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.rejected += 1
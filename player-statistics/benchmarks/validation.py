@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of the request validation used by the workers.
+
+Compares the per-message cost of building a new schema for each message with
+the cost of reusing one schema instance, created when the worker starts.
+
+Usage:
+    APP_CONFIG_PATH=./config.py python -m benchmarks.validation [iterations]
+"""
+import sys
+import timeit
+
+from bson import ObjectId
+
+from app.statistics.documents import PlayerStatistic
+from app.statistics.schemas import InitPlayerStatisticSchema, RetrievePlayerStatisticSchema, \
+    BatchRetrievePlayerStatisticSchema, UpdatePlayerStatisticSchema
+
+
+def get_cases():
+    player_id = str(ObjectId())
+    document = PlayerStatistic(
+        player_id=player_id, total_games=10, wins=5, loses=5, rating=2500
+    )
+    update_data = {
+        'player_id': player_id, 'total_games': 12, 'wins': 6, 'loses': 6, 'rating': 2510
+    }
+    batch_data = {'player_ids': [str(ObjectId()) for _ in range(50)]}
+
+    init_schema = InitPlayerStatisticSchema()
+    retrieve_schema = RetrievePlayerStatisticSchema()
+    batch_schema = BatchRetrievePlayerStatisticSchema()
+    update_schema = UpdatePlayerStatisticSchema()
+    return [
+        (
+            'init',
+            lambda: InitPlayerStatisticSchema().load({'player_id': player_id}),
+            lambda: init_schema.load({'player_id': player_id}),
+        ),
+        (
+            'retrieve',
+            lambda: RetrievePlayerStatisticSchema().load({'player_id': player_id}),
+            lambda: retrieve_schema.load({'player_id': player_id}),
+        ),
+        (
+            'batch-retrieve (50 ids)',
+            lambda: BatchRetrievePlayerStatisticSchema().load(batch_data),
+            lambda: batch_schema.load(batch_data),
+        ),
+        (
+            'update',
+            lambda: UpdatePlayerStatisticSchema().load_for_instance(document, update_data),
+            lambda: update_schema.load_for_instance(document, update_data),
+        ),
+    ]
+
+
+def run(iterations):
+    print("{:<24} {:>16} {:>16} {:>8}".format(
+        'schema', 'per message, us', 'reused, us', 'speedup'
+    ))
+    for name, per_message, reused in get_cases():
+        before = timeit.timeit(per_message, number=iterations) / iterations * 10 ** 6
+        after = timeit.timeit(reused, number=iterations) / iterations * 10 ** 6
+        print("{:<24} {:>16.1f} {:>16.1f} {:>7.1f}x".format(name, before, after, before / after))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
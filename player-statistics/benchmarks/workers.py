@@ -0,0 +1,222 @@
+"""
+Load test of the workers' `process_request` path with the in-process
+stand-ins for MongoDB and RabbitMQ (see `benchmarks.stubs`), or with the
+in-memory statistics repository to profile the workers alone.
+
+Messages of the requested mix are processed by `concurrency` concurrent
+tasks, and for each message kind the throughput and the p50/p99 latencies
+are reported. Run it with `python manage.py benchmark --help`.
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from bson import ObjectId
+from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
+
+from app.statistics.repositories import MemoryStatisticsRepository, MotorStatisticsRepository, \
+    MemoryRatingHistoryRepository, MotorRatingHistoryRepository
+from benchmarks.stubs import StubChannel, StubDatabase
+
+
+DEFAULT_MIX = 'retrieve=60,update=20,record-match-result=10,batch-retrieve=5,init=5'
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[int(round(percentile / 100.0 * (len(sorted_values) - 1)))]
+
+
+class MessageFactory(object):
+    """
+    Builds the request bodies for each kind of messages over the set of the
+    existing players.
+    """
+
+    def __init__(self, player_ids, seed=None):
+        self.player_ids = player_ids
+        self.random = random.Random(seed)
+        self.counter = itertools.count(1)
+
+    def get_player_id(self):
+        return str(self.random.choice(self.player_ids))
+
+    def init(self):
+        return {'player_id': str(ObjectId()), 'if_absent': self.random.random() < 0.5}
+
+    def retrieve(self):
+        return {'player_id': self.get_player_id()}
+
+    def batch_retrieve(self):
+        return {'player_ids': [self.get_player_id() for _ in range(20)]}
+
+    def update(self):
+        # Growing values, so that most updates pass the "can't decrease" validation
+        value = next(self.counter)
+        return {
+            'player_id': self.get_player_id(),
+            'total_games': value,
+            'rating': self.random.randint(0, 3000),
+        }
+
+    def record_match_result(self):
+        winner, loser = self.random.sample(self.player_ids, 2)
+        delta = self.random.randint(1, 30)
+        return {'participants': [
+            {'player_id': str(winner), 'result': 'win', 'rating_delta': delta},
+            {'player_id': str(loser), 'result': 'lose', 'rating_delta': -delta},
+        ]}
+
+    def leaderboard(self):
+        return {
+            'offset': self.random.randint(0, 100),
+            'limit': 10,
+            'player_id': self.get_player_id(),
+        }
+
+    def search_by_rating(self):
+        return {'rating': self.random.randint(0, 3000), 'delta': 100, 'limit': 10}
+
+    def build(self, kind):
+        return getattr(self, kind.replace('-', '_'))()
+
+
+def get_workers(app):
+    return {worker.name: worker for worker in app.amqp.workers}
+
+
+def use_repository(app, repository, history_repository=None):
+    app.statistics_repository = repository
+    if history_repository is not None:
+        app.rating_history_repository = history_repository
+    # The update buffer gets the repository when the worker is created
+    for worker in app.amqp.workers:
+        if hasattr(worker, 'update_buffer'):
+            worker.update_buffer.repository = repository
+
+
+async def seed_players(repository, players):
+    player_ids = []
+    for _ in range(players):
+        player_id = ObjectId()
+        total_games = random.randint(0, 500)
+        wins = random.randint(0, total_games)
+        await repository.upsert(player_id, {
+            'total_games': total_games,
+            'wins': wins,
+            'loses': total_games - wins,
+            'rating': random.randint(0, 3000),
+        })
+        player_ids.append(player_id)
+    return player_ids
+
+
+async def run_benchmark(app, messages=10000, concurrency=64, mix=DEFAULT_MIX, players=10000,
+                        db_latency=0.0, use_rating_index=True, seed=None, storage='mongodb'):
+    if storage == 'memory':
+        repository = MemoryStatisticsRepository()
+        history_repository = MemoryRatingHistoryRepository()
+    else:
+        # Route every document access to the in-memory collection. `init()` accepts only
+        # Motor databases, so the database is replaced directly.
+        app.config["LAZY_UMONGO"]._db = StubDatabase()
+        repository = MotorStatisticsRepository()
+        history_repository = MotorRatingHistoryRepository()
+    use_repository(app, repository, history_repository)
+
+    player_ids = await seed_players(repository, players)
+    app.statistics_cache.clear()
+    if use_rating_index:
+        await app.leaderboard.refresh()
+    if storage != 'memory':
+        repository.collection.latency = db_latency
+
+    workers = get_workers(app)
+    weights = parse_mix(mix)
+    unknown = set(weights) - set(workers)
+    if unknown:
+        raise ValueError("Unknown message kinds: {}. Available: {}.".format(
+            ', '.join(sorted(unknown)), ', '.join(sorted(workers))
+        ))
+
+    factory = MessageFactory(player_ids, seed=seed)
+    kinds = factory.random.choices(list(weights), weights=list(weights.values()), k=messages)
+    requests = [(kind, json.dumps(factory.build(kind)).encode('utf-8')) for kind in kinds]
+
+    channel = StubChannel()
+    latencies = {kind: [] for kind in weights}
+    queue = iter(enumerate(requests, start=1))
+    # The metrics of the application keep counting across the runs
+    errors_before = {kind: count_errors(app, worker.QUEUE_NAME) for kind, worker in workers.items()}
+
+    async def consume():
+        for delivery_tag, (kind, body) in queue:
+            envelope = SimpleNamespace(delivery_tag=delivery_tag, is_redeliver=False)
+            properties = SimpleNamespace(
+                content_type='application/json',
+                correlation_id=str(delivery_tag),
+                reply_to='benchmark'
+            )
+            started_at = time.perf_counter()
+            await workers[kind].process_request(channel, body, envelope, properties)
+            latencies[kind].append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[consume() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started_at
+    await app.rating_history.flush()
+
+    results = []
+    for kind, values in sorted(latencies.items()):
+        values.sort()
+        errors = count_errors(app, workers[kind].QUEUE_NAME) - errors_before[kind]
+        results.append({
+            'kind': kind,
+            'messages': len(values),
+            'errors': errors,
+            'throughput': len(values) / elapsed if elapsed else 0.0,
+            'p50': get_percentile(values, 50),
+            'p99': get_percentile(values, 99),
+        })
+
+    all_values = sorted(value for values in latencies.values() for value in values)
+    results.append({
+        'kind': 'total',
+        'messages': len(all_values),
+        'errors': sum(result['errors'] for result in results),
+        'throughput': len(all_values) / elapsed if elapsed else 0.0,
+        'p50': get_percentile(all_values, 50),
+        'p99': get_percentile(all_values, 99),
+    })
+    return results
+
+
+def count_errors(app, queue_name):
+    return sum(
+        app.metrics.errors.get(queue=queue_name, type=error_type)
+        for error_type in (VALIDATION_ERROR, NOT_FOUND_ERROR)
+    )
+
+
+def format_results(results):
+    lines = ["{:<22} {:>9} {:>7} {:>12} {:>10} {:>10}".format(
+        'kind', 'messages', 'errors', 'msg/s', 'p50, ms', 'p99, ms'
+    )]
+    for result in results:
+        lines.append("{:<22} {:>9} {:>7} {:>12.1f} {:>10.3f} {:>10.3f}".format(
+            result['kind'], result['messages'], result['errors'], result['throughput'],
+            result['p50'] * 1000, result['p99'] * 1000
+        ))
+    return '\n'.join(lines)
@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 
 from umongo import MotorAsyncIOInstance
 
@@ -44,6 +45,13 @@ MONGODB_URI = 'mongodb://{}:{}@{}:{}/{}'.format(
 )
 LAZY_UMONGO = MotorAsyncIOInstance()
 
+# Storage of the statistics: mongodb or memory (kept in the process, for tests and benchmarks)
+STATISTICS_STORAGE = os.environ.get("STATISTICS_STORAGE", "mongodb")
+
+# Create the missing indexes on start, otherwise they are only verified (readiness fails)
+MONGODB_ENSURE_INDEXES = to_bool(os.environ.get("MONGODB_ENSURE_INDEXES", True))
+MONGODB_INDEXES_CHECK_INTERVAL = to_int(os.environ.get("MONGODB_INDEXES_CHECK_INTERVAL", 30))
+
 # AMQP settings
 AMQP_USERNAME = os.environ.get("AMQP_USERNAME", "user")
 AMQP_PASSWORD = os.environ.get("AMQP_PASSWORD", "password")
@@ -51,6 +59,88 @@ AMQP_HOST = os.environ.get("AMQP_HOST", "rabbitmq")
 AMQP_PORT = to_int(os.environ.get("AMQP_PORT", 5672))
 AMQP_VIRTUAL_HOST = os.environ.get("AMQP_VIRTUAL_HOST", "vhost")
 AMQP_USING_SSL = to_bool(os.environ.get("AMQP_USING_SSL", False))
+AMQP_RECONNECT_MIN_DELAY = to_int(os.environ.get("AMQP_RECONNECT_MIN_DELAY", 1))
+AMQP_RECONNECT_MAX_DELAY = to_int(os.environ.get("AMQP_RECONNECT_MAX_DELAY", 30))
+# Completed messages are acknowledged in batches of this size or after this delay (in ms)
+AMQP_ACK_BATCH_SIZE = to_int(os.environ.get("AMQP_ACK_BATCH_SIZE", 32))
+AMQP_ACK_BATCH_DELAY = to_int(os.environ.get("AMQP_ACK_BATCH_DELAY", 50))
+# Time (in seconds) given to the in-flight requests to finish on shutdown
+AMQP_SHUTDOWN_TIMEOUT = to_int(os.environ.get("AMQP_SHUTDOWN_TIMEOUT", 10))
+
+# AMQP workers settings
+# Prefetch count is the amount of unacknowledged messages delivered to the worker, and
+# max in-flight is the amount of requests processed concurrently (defaults to prefetch)
+INIT_WORKER_PREFETCH_COUNT = to_int(os.environ.get("INIT_WORKER_PREFETCH_COUNT", 32))
+INIT_WORKER_MAX_IN_FLIGHT = to_int(os.environ.get("INIT_WORKER_MAX_IN_FLIGHT", None))
+RETRIEVE_WORKER_PREFETCH_COUNT = to_int(os.environ.get("RETRIEVE_WORKER_PREFETCH_COUNT", 256))
+RETRIEVE_WORKER_MAX_IN_FLIGHT = to_int(os.environ.get("RETRIEVE_WORKER_MAX_IN_FLIGHT", None))
+BATCH_RETRIEVE_WORKER_PREFETCH_COUNT = to_int(
+    os.environ.get("BATCH_RETRIEVE_WORKER_PREFETCH_COUNT", 32)
+)
+BATCH_RETRIEVE_WORKER_MAX_IN_FLIGHT = to_int(
+    os.environ.get("BATCH_RETRIEVE_WORKER_MAX_IN_FLIGHT", None)
+)
+UPDATE_WORKER_PREFETCH_COUNT = to_int(os.environ.get("UPDATE_WORKER_PREFETCH_COUNT", 32))
+UPDATE_WORKER_MAX_IN_FLIGHT = to_int(os.environ.get("UPDATE_WORKER_MAX_IN_FLIGHT", None))
+RECORD_MATCH_RESULT_WORKER_PREFETCH_COUNT = to_int(
+    os.environ.get("RECORD_MATCH_RESULT_WORKER_PREFETCH_COUNT", 32)
+)
+RECORD_MATCH_RESULT_WORKER_MAX_IN_FLIGHT = to_int(
+    os.environ.get("RECORD_MATCH_RESULT_WORKER_MAX_IN_FLIGHT", None)
+)
+LEADERBOARD_WORKER_PREFETCH_COUNT = to_int(os.environ.get("LEADERBOARD_WORKER_PREFETCH_COUNT", 64))
+LEADERBOARD_WORKER_MAX_IN_FLIGHT = to_int(os.environ.get("LEADERBOARD_WORKER_MAX_IN_FLIGHT", None))
+SEARCH_BY_RATING_WORKER_PREFETCH_COUNT = to_int(
+    os.environ.get("SEARCH_BY_RATING_WORKER_PREFETCH_COUNT", 64)
+)
+SEARCH_BY_RATING_WORKER_MAX_IN_FLIGHT = to_int(
+    os.environ.get("SEARCH_BY_RATING_WORKER_MAX_IN_FLIGHT", None)
+)
+
+# Consumer processes started by `manage.py consume`, and the comma-separated names of the
+# workers run by each of them (e.g. "retrieve,batch-retrieve"; empty means all workers)
+CONSUMER_PROCESSES = to_int(os.environ.get("CONSUMER_PROCESSES", 1))
+CONSUMER_WORKERS = os.environ.get("CONSUMER_WORKERS", "")
+
+# Statistics cache settings
+STATISTICS_CACHE_MAX_SIZE = to_int(os.environ.get("STATISTICS_CACHE_MAX_SIZE", 10000))
+STATISTICS_CACHE_TTL = to_int(os.environ.get("STATISTICS_CACHE_TTL", 10))
+
+# Amount of the documents read and written at once by the statistics export
+EXPORT_BATCH_SIZE = to_int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+# Records written by one bulk write of the statistics import, and the amount of
+# bulk writes running at the same time
+IMPORT_BATCH_SIZE = to_int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+IMPORT_CONCURRENCY = to_int(os.environ.get("IMPORT_CONCURRENCY", 4))
+
+# Leaderboard settings (in seconds, zero disables the in-memory rating index)
+RATING_INDEX_REFRESH_INTERVAL = to_int(os.environ.get("RATING_INDEX_REFRESH_INTERVAL", 300))
+
+# Rating history settings (in seconds, zero disables recording the history), and the
+# amount of the points waiting to be written before the oldest ones are dropped
+RATING_HISTORY_BUCKET_SIZE = to_int(os.environ.get("RATING_HISTORY_BUCKET_SIZE", 86400))
+RATING_HISTORY_MAX_PENDING = to_int(os.environ.get("RATING_HISTORY_MAX_PENDING", 10000))
+
+# Windowed statistics: comma-separated list of the windows (day, week, season) with
+# the counters of the games, and the seasons of SEASON_LENGTH days from SEASON_START
+STATISTICS_WINDOWS = os.environ.get("STATISTICS_WINDOWS", "day,week,season")
+SEASON_START = datetime.strptime(os.environ.get("SEASON_START", "2026-01-01"), "%Y-%m-%d")
+SEASON_LENGTH = to_int(os.environ.get("SEASON_LENGTH", 91))
+
+# Statistics changed events: the changes of each player are coalesced during the window
+# (in ms), and the old values are remembered for the latest STATISTICS_EVENTS_MAX_PLAYERS
+STATISTICS_EVENTS_ENABLED = to_bool(os.environ.get("STATISTICS_EVENTS_ENABLED", True))
+STATISTICS_EVENTS_WINDOW = to_int(os.environ.get("STATISTICS_EVENTS_WINDOW", 1000))
+STATISTICS_EVENTS_MAX_PLAYERS = to_int(os.environ.get("STATISTICS_EVENTS_MAX_PLAYERS", 10000))
+
+# Update worker settings
+# atomic - single conditional find_one_and_update call, checks are done by MongoDB
+# buffered - updates are merged during the window (in ms) and flushed with one bulk_write
+# commit - find the document, validate it in Python and commit changes
+UPDATE_STATISTICS_MODE = os.environ.get("UPDATE_STATISTICS_MODE", "atomic")
+UPDATE_BUFFER_WINDOW = to_int(os.environ.get("UPDATE_BUFFER_WINDOW", 50))
+UPDATE_BUFFER_MAX_SIZE = to_int(os.environ.get("UPDATE_BUFFER_MAX_SIZE", 500))
 
 # Settings for tests
 TEST_MONGODB_USERNAME = os.environ.get("TEST_MONGODB_USERNAME", "root")
@@ -1,6 +1,11 @@
 from sanic_script import Manager
 
 from app import app
+from app.commands.ensure_indexes import EnsureIndexesCommand
+from app.commands.export_statistics import ExportStatisticsCommand
+from app.commands.import_statistics import ImportStatisticsCommand
+from app.commands.run_benchmarks import RunBenchmarksCommand
+from app.commands.run_consumers import RunConsumersCommand
 from app.commands.run_tests import RunTestsCommand
 from app.commands.run_server import RunServerCommand
 
@@ -8,6 +13,11 @@ from app.commands.run_server import RunServerCommand
 manager = Manager(app)
 manager.add_command('run', RunServerCommand)
 manager.add_command('test', RunTestsCommand)
+manager.add_command('ensure_indexes', EnsureIndexesCommand)
+manager.add_command('benchmark', RunBenchmarksCommand)
+manager.add_command('consume', RunConsumersCommand)
+manager.add_command('export', ExportStatisticsCommand)
+manager.add_command('import', ImportStatisticsCommand)
 
 
 if __name__ == '__main__':
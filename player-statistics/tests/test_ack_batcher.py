@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.workers.acks import AckBatcher
+
+
+class FakeChannel(object):
+
+    def __init__(self):
+        self.calls = []
+
+    async def basic_client_ack(self, delivery_tag, multiple=False):
+        self.calls.append(('ack', delivery_tag, multiple))
+
+    async def basic_client_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.calls.append(('nack', delivery_tag, requeue))
+
+
+@pytest.mark.asyncio
+async def test_batcher_acknowledges_completed_tags_with_multiple_flag():
+    channel = FakeChannel()
+    batcher = AckBatcher(channel, max_batch_size=3, max_delay=60)
+    for delivery_tag in range(1, 4):
+        batcher.track(delivery_tag)
+
+    await batcher.complete(1)
+    await batcher.complete(2)
+    assert channel.calls == []
+
+    await batcher.complete(3)
+    assert channel.calls == [('ack', 3, True)]
+    batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_batcher_never_acknowledges_tags_before_they_complete():
+    channel = FakeChannel()
+    batcher = AckBatcher(channel, max_batch_size=2, max_delay=60)
+    for delivery_tag in range(1, 5):
+        batcher.track(delivery_tag)
+
+    await batcher.complete(3)
+    await batcher.complete(2)
+    assert channel.calls == []
+
+    await batcher.complete(1)
+    assert channel.calls == [('ack', 3, True)]
+    batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_batcher_acknowledges_out_of_order_tags_on_timer():
+    channel = FakeChannel()
+    batcher = AckBatcher(channel, max_batch_size=10, max_delay=0.01)
+    for delivery_tag in range(1, 4):
+        batcher.track(delivery_tag)
+
+    await batcher.complete(2)
+    await batcher.complete(3)
+    await asyncio.sleep(0.05)
+
+    assert channel.calls == [('ack', 2, False), ('ack', 3, False)]
+
+    await batcher.complete(1)
+    await asyncio.sleep(0.05)
+
+    assert channel.calls[-1] == ('ack', 1, True)
+
+
+@pytest.mark.asyncio
+async def test_batcher_rejects_failed_tags():
+    channel = FakeChannel()
+    batcher = AckBatcher(channel, max_batch_size=2, max_delay=60)
+    for delivery_tag in range(1, 4):
+        batcher.track(delivery_tag)
+
+    await batcher.reject(1, requeue=False)
+    await batcher.complete(2)
+    await batcher.complete(3)
+
+    assert channel.calls == [('nack', 1, False), ('ack', 3, True)]
+    batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_batcher_flush_by_size_keeps_timer_of_waiting_tags():
+    channel = FakeChannel()
+    batcher = AckBatcher(channel, max_batch_size=2, max_delay=0.05)
+    for delivery_tag in range(1, 10):
+        batcher.track(delivery_tag)
+
+    # The request 1 is slow, and the later ones keep filling the batches
+    await batcher.complete(2)
+    for delivery_tag in range(3, 10):
+        await asyncio.sleep(0.01)
+        await batcher.complete(delivery_tag)
+    assert channel.calls[:2] == [('ack', 2, False), ('ack', 3, False)]
+    batcher.close()
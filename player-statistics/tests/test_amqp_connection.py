@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aioamqp.protocol import OPEN, CLOSED
+
+from app.workers import connection
+from app.workers.connection import AmqpConnectionManager
+
+
+class FakeChannel(object):
+
+    def __init__(self):
+        self.close_event = asyncio.Event()
+
+    @property
+    def is_open(self):
+        return not self.close_event.is_set()
+
+    async def close(self):
+        self.close_event.set()
+
+
+class FakeProtocol(object):
+
+    def __init__(self):
+        self.state = OPEN
+        self.channels = []
+
+    async def channel(self):
+        channel = FakeChannel()
+        self.channels.append(channel)
+        return channel
+
+    async def close(self):
+        self.state = CLOSED
+        for channel in self.channels:
+            channel.close_event.set()
+
+
+class Worker(object):
+
+    def __init__(self):
+        self.channels = []
+
+    async def setup_channel(self, channel):
+        self.channels.append(channel)
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = SimpleNamespace(protocols=[], failures=[])
+
+    async def amqp_connect(**kwargs):
+        if broker.failures:
+            raise broker.failures.pop()
+        protocol = FakeProtocol()
+        broker.protocols.append(protocol)
+        return SimpleNamespace(close=lambda: None), protocol
+
+    monkeypatch.setattr(connection, 'amqp_connect', amqp_connect)
+    return broker
+
+
+def create_manager():
+    app = SimpleNamespace(amqp=SimpleNamespace(get_config=lambda app: {}))
+    return AmqpConnectionManager(app, min_delay=0.01, max_delay=0.04)
+
+
+@pytest.mark.asyncio
+async def test_workers_share_one_connection(broker):
+    manager = create_manager()
+    first, second = Worker(), Worker()
+
+    await manager.register(first)
+    await manager.register(second)
+
+    assert len(broker.protocols) == 1
+    assert first.channels[0] is not second.channels[0]
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_channels_are_opened_again_after_connection_is_dropped(broker):
+    manager = create_manager()
+    worker = Worker()
+    await manager.register(worker)
+
+    broker.failures.append(OSError('Connection refused'))
+    await broker.protocols[0].close()
+    await manager.on_connection_error(OSError('Connection reset'))
+    await manager._reconnect_task
+
+    assert len(broker.protocols) == 2
+    assert worker.channels[-1] is broker.protocols[1].channels[0]
+    assert manager.channels[worker] is worker.channels[-1]
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_channel_closed_by_broker_is_reopened(broker):
+    manager = create_manager()
+    worker, other = Worker(), Worker()
+    await manager.register(worker)
+    await manager.register(other)
+
+    # The connection stays open, e.g. after a failed queue declaration
+    worker.channels[0].close_event.set()
+    await asyncio.sleep(0.05)
+
+    assert len(broker.protocols) == 1
+    assert len(worker.channels) == 2 and worker.channels[-1].is_open
+    assert len(other.channels) == 1
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_channels_are_not_reopened_after_unregister(broker):
+    manager = create_manager()
+    worker, other = Worker(), Worker()
+    await manager.register(worker)
+    await manager.register(other)
+
+    await manager.unregister(worker)
+    await asyncio.sleep(0.05)
+
+    assert len(worker.channels) == 1
+    assert worker not in manager.channels
+    await manager.close()
@@ -0,0 +1,99 @@
+import pytest
+from bson import ObjectId
+from sage_utils.amqp.clients import RpcAmqpClient
+from sage_utils.constants import VALIDATION_ERROR
+from sage_utils.wrappers import Response
+
+from app.statistics.documents import PlayerStatistic
+from app.workers.batch_retrieve_player_statistics import BatchRetrievePlayerStatisticsWorker
+
+
+REQUEST_QUEUE = BatchRetrievePlayerStatisticsWorker.QUEUE_NAME
+REQUEST_EXCHANGE = BatchRetrievePlayerStatisticsWorker.REQUEST_EXCHANGE_NAME
+RESPONSE_EXCHANGE = BatchRetrievePlayerStatisticsWorker.RESPONSE_EXCHANGE_NAME
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_found_and_missing_players(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_ids = [str(ObjectId()) for _ in range(3)]
+    for index, player_id in enumerate(player_ids):
+        object = PlayerStatistic(**{
+            'player_id': player_id,
+            'total_games': 10 + index,
+            'wins': 5,
+            'loses': 5 + index,
+            'rating': 2500
+        })
+        await object.commit()
+
+    missing_player_id = str(ObjectId())
+    retrieve_data = {'player_ids': [player_ids[2], missing_player_id, player_ids[0]]}
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload=retrieve_data)
+
+    assert Response.EVENT_FIELD_NAME in response.keys()
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert set(content.keys()) == {'found', 'missing'}
+    assert [player['player_id'] for player in content['found']] == [
+        player_ids[2], player_ids[0]
+    ]
+    assert content['found'][0]['total_games'] == 12
+    assert content['found'][1]['total_games'] == 10
+    assert content['missing'] == [missing_player_id]
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_validation_error_per_player_id(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    retrieve_data = {'player_ids': [str(ObjectId()), "INVALID_OBJECT_ID"]}
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload=retrieve_data)
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert error[Response.ERROR_TYPE_FIELD_NAME] == VALIDATION_ERROR
+
+    details = error[Response.ERROR_DETAILS_FIELD_NAME]
+    assert len(details) == 1
+    assert set(details['player_ids'].keys()) == {'1'}
+    assert details['player_ids']['1'] == ['Invalid ObjectId.']
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_validation_error_for_empty_list(sanic_server):
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload={'player_ids': []})
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert error[Response.ERROR_TYPE_FIELD_NAME] == VALIDATION_ERROR
+    assert 'player_ids' in error[Response.ERROR_DETAILS_FIELD_NAME]
@@ -0,0 +1,65 @@
+import pytest
+from sage_utils.constants import NOT_FOUND_ERROR
+
+from app import app
+from app.workers.retrieve_player_statistics import RetrievePlayerStatisticsWorker
+from benchmarks.workers import run_benchmark, parse_mix, use_repository
+
+
+@pytest.yield_fixture
+def restore_database():
+    instance = app.config["LAZY_UMONGO"]
+    database = instance._db
+    repository = app.statistics_repository
+    history_repository = app.rating_history_repository
+    yield
+    instance._db = database
+    use_repository(app, repository, history_repository)
+    app.statistics_cache.clear()
+
+
+def test_parse_mix_returns_weights():
+    assert parse_mix('retrieve=70, update=30,init') == {'retrieve': 70, 'update': 30, 'init': 1}
+
+
+@pytest.mark.asyncio
+async def test_benchmark_processes_all_messages_without_services(restore_database):
+    results = await run_benchmark(
+        app, messages=200, concurrency=8, players=50, seed=1,
+        mix='init=1,retrieve=1,batch-retrieve=1,update=1,record-match-result=1,'
+            'leaderboard=1,search-by-rating=1'
+    )
+
+    total = results[-1]
+    assert total['kind'] == 'total'
+    assert total['messages'] == 200
+    assert sum(result['messages'] for result in results[:-1]) == 200
+    assert all(result['p50'] <= result['p99'] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_benchmark_with_in_memory_repository(restore_database):
+    results = await run_benchmark(
+        app, messages=100, concurrency=4, players=20, seed=1, storage='memory',
+        mix='retrieve=1,update=1,record-match-result=1,search-by-rating=1'
+    )
+
+    assert results[-1]['messages'] == 100
+
+
+@pytest.mark.asyncio
+async def test_benchmark_counts_only_errors_of_its_run(restore_database):
+    queue_name = RetrievePlayerStatisticsWorker.QUEUE_NAME
+    app.metrics.errors.inc(5, queue=queue_name, type=NOT_FOUND_ERROR)
+
+    results = await run_benchmark(
+        app, messages=20, concurrency=2, players=10, seed=1, storage='memory', mix='retrieve=1'
+    )
+
+    assert [result['errors'] for result in results] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_rejects_unknown_message_kinds(restore_database):
+    with pytest.raises(ValueError):
+        await run_benchmark(app, messages=10, players=5, mix='unknown=1')
@@ -0,0 +1,36 @@
+import pytest
+
+from app.workers.codecs import CODECS, JSON_CODEC, JsonCodec, MsgPackCodec, get_codec
+
+
+def test_get_codec_returns_json_codec_by_default():
+    assert get_codec(None) is JSON_CODEC
+    assert get_codec('') is JSON_CODEC
+    assert get_codec('text/plain') is JSON_CODEC
+
+
+def test_get_codec_ignores_content_type_parameters():
+    assert get_codec('application/json; charset=utf-8') is JSON_CODEC
+
+
+def test_json_codec_encodes_and_decodes_data():
+    codec = JsonCodec()
+    data = {'player_id': '5c5f1b5c5f1b5c5f1b5c5f1b', 'errors': {0: ['Invalid ObjectId.']}}
+
+    assert codec.decode(codec.encode(data)) == {
+        'player_id': '5c5f1b5c5f1b5c5f1b5c5f1b',
+        'errors': {'0': ['Invalid ObjectId.']}
+    }
+
+
+def test_json_codec_returns_empty_dict_for_invalid_data():
+    assert JSON_CODEC.decode(b'{invalid json') == {}
+
+
+@pytest.mark.skipif(MsgPackCodec.CONTENT_TYPE not in CODECS, reason='msgpack is not installed')
+def test_msgpack_codec_encodes_and_decodes_data():
+    codec = get_codec(MsgPackCodec.CONTENT_TYPE)
+    data = {'player_id': '5c5f1b5c5f1b5c5f1b5c5f1b', 'rating': 2500}
+
+    assert isinstance(codec, MsgPackCodec)
+    assert codec.decode(codec.encode(data)) == data
@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.statistics.export import StatisticsExporter
+from app.statistics.repositories import MemoryStatisticsRepository
+
+
+async def create_exporter(players, batch_size=2):
+    repository = MemoryStatisticsRepository()
+    for rating in range(players):
+        await repository.upsert(ObjectId(), {'total_games': 1, 'wins': 1, 'loses': 0,
+                                             'rating': rating})
+    return StatisticsExporter(SimpleNamespace(statistics_repository=repository), batch_size)
+
+
+async def export(exporter, **kwargs):
+    chunks = []
+
+    async def write(data):
+        chunks.append(data)
+
+    count, last_id = await exporter.export(write, **kwargs)
+    return chunks, count, last_id
+
+
+@pytest.mark.asyncio
+async def test_export_writes_ndjson_in_batches():
+    exporter = await create_exporter(players=5)
+
+    chunks, count, last_id = await export(exporter)
+
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in ''.join(chunks).splitlines()]
+    assert count == 5
+    assert [row['rating'] for row in rows] == [0, 1, 2, 3, 4]
+    assert rows[-1]['id'] == str(last_id)
+    assert 'version' not in rows[0]
+
+
+@pytest.mark.asyncio
+async def test_export_resumes_after_the_token():
+    exporter = await create_exporter(players=5)
+    chunks, _count, _last_id = await export(exporter)
+    rows = [json.loads(line) for line in ''.join(chunks).splitlines()]
+
+    chunks, count, last_id = await export(exporter, after_id=ObjectId(rows[2]['id']))
+
+    resumed = [json.loads(line) for line in ''.join(chunks).splitlines()]
+    assert count == 2
+    assert resumed == rows[3:]
+    assert str(last_id) == rows[-1]['id']
+
+
+@pytest.mark.asyncio
+async def test_export_writes_csv_with_header():
+    exporter = await create_exporter(players=2)
+
+    chunks, count, _last_id = await export(exporter, export_format='csv')
+
+    lines = ''.join(chunks).splitlines()
+    assert lines[0] == 'id,player_id,total_games,wins,loses,rating'
+    assert len(lines) == 3
+    assert lines[1].endswith(',1,1,0,0')
+
+    chunks, _count, _last_id = await export(exporter, export_format='csv', with_header=False)
+    assert len(''.join(chunks).splitlines()) == 2
@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.statistics.importer import StatisticsImporter
+from app.statistics.repositories import MemoryStatisticsRepository
+
+
+def create_importer(batch_size=2, concurrency=2):
+    app = SimpleNamespace(statistics_repository=MemoryStatisticsRepository())
+    return StatisticsImporter(app, batch_size=batch_size, concurrency=concurrency)
+
+
+@pytest.mark.asyncio
+async def test_import_writes_valid_records_in_batches():
+    importer = create_importer()
+    player_ids = [ObjectId() for _ in range(5)]
+    lines = [
+        json.dumps({'player_id': str(player_id), 'total_games': 3, 'rating': index})
+        for index, player_id in enumerate(player_ids)
+    ]
+    progress = []
+
+    stats = await importer.import_lines(lines, on_progress=lambda stats: progress.append(
+        stats.imported
+    ))
+
+    assert (stats.read, stats.imported, stats.invalid) == (5, 5, 0)
+    assert progress[-1] == 5
+    assert len(progress) == 3
+    raw_document = await importer.repository.get(player_ids[4])
+    assert (raw_document['total_games'], raw_document['wins'], raw_document['rating']) == (3, 0, 4)
+
+
+@pytest.mark.asyncio
+async def test_import_reports_invalid_records():
+    importer = create_importer()
+    lines = [
+        json.dumps({'player_id': str(ObjectId()), 'rating': -1}),
+        'not a json',
+        '',
+        json.dumps({'id': str(ObjectId()), 'player_id': str(ObjectId()), 'wins': 1}),
+    ]
+    errors = []
+
+    stats = await importer.import_lines(lines, on_error=lambda number, error: errors.append(
+        (number, sorted(error))
+    ))
+
+    assert (stats.read, stats.imported, stats.invalid) == (3, 1, 2)
+    assert errors == [(1, ['rating']), (2, ['_schema'])]
+
+
+@pytest.mark.asyncio
+async def test_import_reads_csv_of_the_export():
+    importer = create_importer()
+    player_id = ObjectId()
+    lines = [
+        'id,player_id,total_games,wins,loses,rating\n',
+        '{},{},10,6,4,\n'.format(ObjectId(), player_id),
+    ]
+
+    stats = await importer.import_lines(lines, import_format='csv')
+
+    assert stats.imported == 1
+    raw_document = await importer.repository.get(player_id)
+    assert (raw_document['wins'], raw_document['loses'], raw_document['rating']) == (6, 4, 0)
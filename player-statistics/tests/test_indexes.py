@@ -0,0 +1,75 @@
+import pytest
+
+from app.statistics.documents import PlayerStatistic
+from app.statistics.indexes import IndexManager
+
+
+class FakeCollection(object):
+    name = 'player_statistic'
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+        self.created = []
+
+    async def index_information(self):
+        return self.indexes
+
+    async def create_indexes(self, indexes):
+        for index in indexes:
+            self.indexes[index.document['name']] = dict(
+                index.document, key=list(index.document['key'].items())
+            )
+            self.created.append(index.document)
+        return [index.document['name'] for index in indexes]
+
+
+class FakeDocument(object):
+    opts = PlayerStatistic.opts
+
+    def __init__(self, indexes):
+        self.collection = FakeCollection(indexes)
+
+
+def get_existing_indexes():
+    return {
+        '_id_': {'key': [('_id', 1)]},
+        'player_id_1': {'key': [('player_id', 1.0)], 'unique': True},
+    }
+
+
+@pytest.mark.asyncio
+async def test_manager_reports_missing_indexes_without_creating_them():
+    document = FakeDocument(get_existing_indexes())
+    manager = IndexManager(None, [document], ensure=False)
+
+    missing = await manager.verify()
+
+    assert missing == {'player_statistic': ['rating_-1_player_id_1']}
+    assert not manager.ready
+    assert document.collection.created == []
+
+
+@pytest.mark.asyncio
+async def test_manager_creates_missing_indexes_in_background():
+    document = FakeDocument(get_existing_indexes())
+    manager = IndexManager(None, [document])
+
+    missing = await manager.verify()
+
+    assert missing == {}
+    assert manager.ready
+    assert len(document.collection.created) == 1
+    assert document.collection.created[0]['name'] == 'rating_-1_player_id_1'
+    assert document.collection.created[0]['background'] is True
+
+
+@pytest.mark.asyncio
+async def test_manager_treats_not_unique_index_as_missing():
+    indexes = get_existing_indexes()
+    indexes['player_id_1'].pop('unique')
+    document = FakeDocument(indexes)
+    manager = IndexManager(None, [document], ensure=False)
+
+    missing = await manager.verify()
+
+    assert 'player_id_1' in missing['player_statistic']
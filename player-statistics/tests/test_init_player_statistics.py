@@ -168,3 +168,75 @@ async def test_worker_returns_validation_for_invalid_player_id(sanic_server):
     assert players_count == 0
 
     await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_keeps_existing_player_when_initialized_if_absent(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id = str(ObjectId())
+    create_data = {
+        'player_id': player_id,
+        'total_games': 10,
+        'wins': 6,
+        'loses': 4,
+        'rating': 2676
+    }
+    object = PlayerStatistic(**create_data)
+    await object.commit()
+
+    init_data = {'player_id': player_id, 'if_absent': True}
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload=init_data)
+
+    assert Response.EVENT_FIELD_NAME in response.keys()
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert set(content.keys()) == {'id', 'player_id', 'total_games', 'wins', 'loses', 'rating'}
+    assert content['player_id'] == player_id
+    assert content['total_games'] == create_data['total_games']
+    assert content['wins'] == create_data['wins']
+    assert content['loses'] == create_data['loses']
+    assert content['rating'] == create_data['rating']
+
+    players_count = await PlayerStatistic.collection.count_documents({})
+    assert players_count == 1
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_creates_player_when_initialized_if_absent(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id = str(ObjectId())
+    init_data = {'player_id': player_id, 'if_absent': True}
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload=init_data)
+
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert content['player_id'] == player_id
+    assert content['total_games'] == 0
+    assert content['wins'] == 0
+    assert content['loses'] == 0
+    assert content['rating'] == 0
+
+    players_count = await PlayerStatistic.collection.count_documents({})
+    assert players_count == 1
+
+    await PlayerStatistic.collection.delete_many({})
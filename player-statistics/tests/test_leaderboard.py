@@ -0,0 +1,83 @@
+import pytest
+from bson import ObjectId
+from sage_utils.amqp.clients import RpcAmqpClient
+from sage_utils.constants import VALIDATION_ERROR
+from sage_utils.wrappers import Response
+
+from app.statistics.documents import PlayerStatistic
+from app.workers.leaderboard import LeaderboardWorker
+
+
+REQUEST_QUEUE = LeaderboardWorker.QUEUE_NAME
+REQUEST_EXCHANGE = LeaderboardWorker.REQUEST_EXCHANGE_NAME
+RESPONSE_EXCHANGE = LeaderboardWorker.RESPONSE_EXCHANGE_NAME
+
+
+async def create_players(app, ratings):
+    player_ids = []
+    for rating in ratings:
+        player_id = str(ObjectId())
+        await PlayerStatistic(player_id=player_id, rating=rating).commit()
+        player_ids.append(player_id)
+    await app.leaderboard.refresh()
+    return player_ids
+
+
+def get_client(app):
+    return RpcAmqpClient(
+        app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_top_players_with_ranks(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+    player_ids = await create_players(sanic_server.app, [100, 300, 200, 200])
+
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={'limit': 3, 'player_id': player_ids[0]})
+
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert content['total'] == 4
+    assert [player['rating'] for player in content['players']] == [300, 200, 200]
+    assert [player['rank'] for player in content['players']] == [1, 2, 2]
+    assert content['players'][0]['player_id'] == player_ids[1]
+
+    assert content['player']['player_id'] == player_ids[0]
+    assert content['player']['rank'] == 4
+    assert content['player']['percentile'] == 0.0
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_an_error_for_invalid_limit(sanic_server):
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={'limit': 0})
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert Response.ERROR_TYPE_FIELD_NAME in error.keys()
+    assert error[Response.ERROR_TYPE_FIELD_NAME] == VALIDATION_ERROR
+
+
+@pytest.mark.asyncio
+async def test_http_route_returns_leaderboard_page(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+    player_ids = await create_players(sanic_server.app, [100, 300])
+
+    response = await sanic_server.get('/player-statistics/api/leaderboard?offset=1&limit=1')
+    assert response.status == 200
+    content = await response.json()
+
+    assert content['total'] == 2
+    assert content['players'] == [{'player_id': player_ids[0], 'rating': 100, 'rank': 2}]
+
+    await PlayerStatistic.collection.delete_many({})
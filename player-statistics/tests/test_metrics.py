@@ -0,0 +1,42 @@
+from app.metrics import MetricsRegistry, WorkerMetrics
+
+
+def test_counter_renders_series_per_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'Requests.', ('queue', ))
+    counter.inc(queue='update')
+    counter.inc(2, queue='retrieve')
+
+    assert registry.render() == (
+        '# HELP requests_total Requests.\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{queue="retrieve"} 2.0\n'
+        'requests_total{queue="update"} 1.0\n'
+    )
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency.', ('queue', ), buckets=(0.1, 1.0))
+    histogram.observe(0.05, queue='update')
+    histogram.observe(0.1, queue='update')
+    histogram.observe(2, queue='update')
+
+    assert histogram.get_count(queue='update') == 3
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{queue="update",le="0.1"} 2.0',
+        'latency_seconds_bucket{queue="update",le="1.0"} 2.0',
+        'latency_seconds_bucket{queue="update",le="+Inf"} 3.0',
+        'latency_seconds_sum{queue="update"} 2.15',
+        'latency_seconds_count{queue="update"} 3.0',
+    ]
+
+
+def test_worker_metrics_track_in_flight_messages():
+    metrics = WorkerMetrics()
+    metrics.in_flight.inc(queue='update')
+    metrics.in_flight.inc(queue='update')
+    metrics.in_flight.dec(queue='update')
+
+    assert metrics.in_flight.get(queue='update') == 1
+    assert 'player_statistics_messages_in_flight{queue="update"} 1.0' in metrics.render()
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.statistics.history import RatingHistory
+from app.statistics.repositories import MemoryRatingHistoryRepository, \
+    MotorRatingHistoryRepository
+from app.statistics.schemas import RatingHistorySchema
+from app.workers.base import BaseStatisticsWorker
+from benchmarks.stubs import StubCollection
+
+
+START = datetime(2026, 1, 1)
+
+
+def create_history(bucket_size=3600):
+    app = SimpleNamespace(rating_history_repository=MemoryRatingHistoryRepository())
+    return RatingHistory(app, bucket_size=bucket_size)
+
+
+@pytest.mark.asyncio
+async def test_points_are_packed_into_buckets_without_repeated_ratings():
+    history = create_history()
+    player_id = ObjectId()
+
+    for minutes, rating in [(0, 10), (10, 10), (20, 15), (70, 15), (80, 20)]:
+        history.record(player_id, rating, START + timedelta(minutes=minutes))
+    await history.flush()
+
+    raw_buckets = await history.repository.find(player_id)
+    assert raw_buckets == [
+        {'start': START, 'offsets': [0, 1200], 'ratings': [10, 15]},
+        {'start': START + timedelta(hours=1), 'offsets': [600, 1200], 'ratings': [15, 20]},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_recording_is_disabled_by_zero_bucket_size():
+    history = create_history(bucket_size=0)
+    player_id = ObjectId()
+
+    history.record(player_id, 10, START)
+    await history.flush()
+
+    assert await history.repository.find(player_id) == []
+
+
+@pytest.mark.asyncio
+async def test_history_is_downsampled_for_time_range():
+    history = create_history()
+    player_id = ObjectId()
+    for minutes, rating in enumerate([10, 30, 20, 40, 5, 50]):
+        await history.append(player_id, rating, START + timedelta(minutes=minutes * 30))
+
+    result = await history.get_history(
+        player_id, start=START + timedelta(minutes=30), end=START + timedelta(hours=2, minutes=30),
+        points=2
+    )
+
+    assert result['start'] == '2026-01-01T00:30:00Z'
+    assert result['points'] == [
+        {'time': '2026-01-01T01:00:00Z', 'rating': 20, 'min': 20, 'max': 30},
+        {'time': '2026-01-01T02:30:00Z', 'rating': 50, 'min': 5, 'max': 50},
+    ]
+
+
+def test_schema_converts_range_to_utc_and_validates_it():
+    schema = RatingHistorySchema()
+    player_id = str(ObjectId())
+
+    result = schema.load({
+        'player_id': player_id, 'from': '2026-01-01T03:00:00+02:00', 'to': '2026-01-01T02:00:00'
+    })
+    assert not result.errors
+    assert result.data['start'] == datetime(2026, 1, 1, 1)
+    assert result.data['start'].tzinfo is None
+
+    result = schema.load({
+        'player_id': player_id, 'from': '2026-01-02T00:00:00', 'to': datetime(
+            2026, 1, 1, tzinfo=timezone.utc
+        ).isoformat()
+    })
+    assert result.errors == {'start': [RatingHistorySchema.INVALID_RANGE_ERROR]}
+
+
+@pytest.mark.parametrize('repository', [
+    MemoryRatingHistoryRepository(),
+    MotorRatingHistoryRepository(document=SimpleNamespace(collection=StubCollection(
+        'rating_history', key_fields=('player_id', 'start')
+    ))),
+], ids=['memory', 'motor'])
+@pytest.mark.asyncio
+async def test_append_upserts_bucket_and_skips_repeated_rating(repository):
+    player_id = ObjectId()
+
+    assert await repository.append(player_id, START, 0, 10)
+    assert not await repository.append(player_id, START, 5, 10)
+    assert await repository.append(player_id, START, 10, 20)
+    assert await repository.append(player_id, START + timedelta(hours=1), 0, 20)
+
+    assert await repository.find(player_id) == [
+        {'start': START, 'offsets': [0, 10], 'ratings': [10, 20]},
+        {'start': START + timedelta(hours=1), 'offsets': [0], 'ratings': [20]},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pending_points_are_bounded():
+    history = create_history()
+    history.max_pending, history.concurrency = 2, 1
+    player_id = ObjectId()
+
+    for minutes, rating in enumerate([10, 20, 30, 40]):
+        history.record(player_id, rating, START + timedelta(minutes=minutes))
+    await history.flush()
+
+    raw_buckets = await history.repository.find(player_id)
+    assert raw_buckets[0]['ratings'] == [30, 40]
+    assert history.dropped == 2
+
+
+def test_history_gets_a_point_only_when_the_rating_was_changed():
+    recorded = []
+    app = SimpleNamespace(
+        statistics_cache=SimpleNamespace(set=lambda player_id, content: None),
+        rating_index=SimpleNamespace(update=lambda player_id, rating: None),
+        rating_history=SimpleNamespace(record=lambda player_id, rating: recorded.append(rating)),
+        statistics_events=SimpleNamespace(publish=lambda content, version: None),
+    )
+    worker = SimpleNamespace(app=app)
+    player_id = str(ObjectId())
+
+    BaseStatisticsWorker.statistics_changed(worker, {'player_id': player_id, 'rating': 10})
+    BaseStatisticsWorker.statistics_changed(
+        worker, {'player_id': player_id, 'rating': 20}, 2, rating_changed=True
+    )
+
+    assert recorded == [20]
@@ -0,0 +1,71 @@
+from app.statistics.ratings import RatingIndex
+
+
+def test_index_orders_players_by_rating_and_identifier():
+    index = RatingIndex()
+    index.load([('c', 10), ('a', 30), ('b', 10)])
+
+    assert index.top(0, 10) == [('a', 30), ('b', 10), ('c', 10)]
+    assert index.top(1, 1) == [('b', 10)]
+
+
+def test_index_counts_players_with_higher_and_lower_rating():
+    index = RatingIndex()
+    index.load([('a', 30), ('b', 10), ('c', 10), ('d', 5)])
+
+    assert index.count_higher(10) == 1
+    assert index.count_lower(10) == 1
+    assert index.count_higher(30) == 0
+    assert index.count_lower(5) == 0
+
+
+def test_index_moves_updated_player():
+    index = RatingIndex()
+    index.load([('a', 30), ('b', 10)])
+    index.update('b', 40)
+    index.update('c', 20)
+
+    assert index.top(0, 10) == [('b', 40), ('a', 30), ('c', 20)]
+    assert index.get_rating('b') == 40
+    assert len(index) == 3
+
+    index.remove('a')
+    assert index.top(0, 10) == [('b', 40), ('c', 20)]
+
+
+def test_index_keeps_updates_received_during_refresh():
+    index = RatingIndex()
+    index.start_refresh()
+    index.update('a', 50)
+    index.load([('a', 30), ('b', 10)])
+
+    assert index.loaded
+    assert index.top(0, 10) == [('a', 50), ('b', 10)]
+
+
+def test_index_iterates_players_around_rating():
+    index = RatingIndex()
+    index.load([('a', 50), ('b', 40), ('c', 30), ('d', 30), ('e', 20), ('f', 5)])
+
+    assert list(index.iter_higher(30, 45)) == [('d', 30), ('c', 30), ('b', 40)]
+    assert list(index.iter_lower(30, 10)) == [('e', 20)]
+
+
+def test_index_iterates_rating_range_in_both_directions():
+    index = RatingIndex()
+    index.load([('a', 30), ('b', 20), ('c', 20), ('d', 10)])
+
+    assert list(index.iter_range(15, 30)) == [('a', 30), ('b', 20), ('c', 20)]
+    assert list(index.iter_range(15, 30, descending=False)) == [('c', 20), ('b', 20), ('a', 30)]
+    assert list(index.iter_range(max_rating=20)) == [('b', 20), ('c', 20), ('d', 10)]
+
+
+def test_index_ignores_updates_until_loaded():
+    index = RatingIndex()
+    index.update('a', 50)
+    index.update('b', 10)
+    index.remove('a')
+
+    assert not index.loaded
+    assert len(index) == 0
+    assert index.get_rating('b') is None
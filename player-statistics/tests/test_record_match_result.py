@@ -0,0 +1,136 @@
+import pytest
+from bson import ObjectId
+from sage_utils.amqp.clients import RpcAmqpClient
+from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
+from sage_utils.wrappers import Response
+
+from app.statistics.documents import PlayerStatistic
+from app.workers.record_match_result import RecordMatchResultWorker
+
+
+REQUEST_QUEUE = RecordMatchResultWorker.QUEUE_NAME
+REQUEST_EXCHANGE = RecordMatchResultWorker.REQUEST_EXCHANGE_NAME
+RESPONSE_EXCHANGE = RecordMatchResultWorker.RESPONSE_EXCHANGE_NAME
+
+
+def get_client(app):
+    return RpcAmqpClient(
+        app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_increments_statistics_of_one_player(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id = str(ObjectId())
+    await PlayerStatistic(
+        player_id=player_id, total_games=10, wins=5, loses=5, rating=2500
+    ).commit()
+
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={
+        'player_id': player_id,
+        'result': 'win',
+        'rating_delta': 25
+    })
+
+    assert Response.EVENT_FIELD_NAME in response.keys()
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert content['player_id'] == player_id
+    assert content['total_games'] == 11
+    assert content['wins'] == 6
+    assert content['loses'] == 5
+    assert content['rating'] == 2525
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_records_match_for_all_participants_and_clamps_rating(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    winner_id = str(ObjectId())
+    loser_id = str(ObjectId())
+    await PlayerStatistic(player_id=winner_id, total_games=1, wins=1, loses=0, rating=30).commit()
+    await PlayerStatistic(player_id=loser_id, total_games=1, wins=0, loses=1, rating=10).commit()
+
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={
+        'participants': [
+            {'player_id': winner_id, 'result': 'win', 'rating_delta': 25},
+            {'player_id': loser_id, 'result': 'lose', 'rating_delta': -25},
+        ]
+    })
+
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    winner, loser = response[Response.CONTENT_FIELD_NAME]
+
+    assert winner['player_id'] == winner_id
+    assert winner['total_games'] == 2
+    assert winner['wins'] == 2
+    assert winner['rating'] == 55
+
+    assert loser['player_id'] == loser_id
+    assert loser['total_games'] == 2
+    assert loser['loses'] == 2
+    assert loser['rating'] == 0
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_an_error_for_duplicated_participants(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id = str(ObjectId())
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={
+        'participants': [
+            {'player_id': player_id, 'result': 'win'},
+            {'player_id': player_id, 'result': 'lose'},
+        ]
+    })
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert Response.ERROR_TYPE_FIELD_NAME in error.keys()
+    assert error[Response.ERROR_TYPE_FIELD_NAME] == VALIDATION_ERROR
+
+
+@pytest.mark.asyncio
+async def test_worker_reports_not_existing_participants(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id, missing_id = str(ObjectId()), str(ObjectId())
+    await PlayerStatistic(player_id=player_id, total_games=1, wins=1, loses=0, rating=30).commit()
+
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={
+        'participants': [
+            {'player_id': player_id, 'result': 'win', 'rating_delta': 10},
+            {'player_id': missing_id, 'result': 'lose', 'rating_delta': -10},
+        ]
+    })
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert Response.ERROR_TYPE_FIELD_NAME in error.keys()
+    assert error[Response.ERROR_TYPE_FIELD_NAME] == NOT_FOUND_ERROR
+    assert error[Response.ERROR_DETAILS_FIELD_NAME] == \
+        RecordMatchResultWorker.PLAYERS_NOT_FOUND_ERROR.format(missing_id)
+
+    # Without reading the participants first, the existing ones are recorded
+    document = await PlayerStatistic.find_one({'player_id': ObjectId(player_id)})
+    assert document.total_games == 2
+    assert document.rating == 40
+
+    await PlayerStatistic.collection.delete_many({})
@@ -0,0 +1,165 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.statistics.candidates import CandidateSearch
+from app.statistics.repositories import MemoryStatisticsRepository, MotorStatisticsRepository, \
+    StatisticsUpdate
+from benchmarks.stubs import StubCollection
+
+
+@pytest.fixture
+def repository():
+    return MemoryStatisticsRepository()
+
+
+@pytest.mark.asyncio
+async def test_upsert_replaces_or_keeps_existing_document(repository):
+    player_id = ObjectId()
+    inserted = await repository.upsert(player_id, {'total_games': 1, 'rating': 10})
+    replaced = await repository.upsert(player_id, {'total_games': 2, 'rating': 20})
+    kept = await repository.upsert(player_id, {'total_games': 3}, only_if_absent=True)
+
+    assert inserted['player_id'] == player_id
+    assert replaced['_id'] == inserted['_id']
+    assert replaced['total_games'] == 2
+    assert kept == replaced
+    assert await repository.get(player_id) == replaced
+    assert await repository.get(ObjectId()) is None
+
+
+@pytest.mark.asyncio
+async def test_get_many_returns_only_found_documents(repository):
+    player_ids = [ObjectId(), ObjectId()]
+    await repository.upsert(player_ids[0], {'rating': 10})
+
+    found = await repository.get_many(player_ids)
+
+    assert list(found.keys()) == [player_ids[0]]
+    assert await repository.exists(player_ids[0])
+    assert not await repository.exists(player_ids[1])
+
+
+@pytest.mark.asyncio
+async def test_conditional_update_is_rejected_for_greater_values(repository):
+    player_id = ObjectId()
+    await repository.upsert(player_id, {'total_games': 10, 'rating': 10})
+
+    rejected = await repository.update(StatisticsUpdate(
+        player_id, set_values={'total_games': 5}, not_greater={'total_games': 5}
+    ))
+    updated = await repository.update(StatisticsUpdate(
+        player_id, set_values={'total_games': 15}, not_greater={'total_games': 15}
+    ))
+
+    assert rejected is None
+    assert updated['total_games'] == 15
+    assert await repository.update(StatisticsUpdate(ObjectId(), set_values={'rating': 1})) is None
+
+
+@pytest.mark.parametrize('repository', [
+    MemoryStatisticsRepository(),
+    MotorStatisticsRepository(document=SimpleNamespace(collection=StubCollection('statistics'))),
+], ids=['memory', 'motor'])
+@pytest.mark.asyncio
+async def test_conditional_update_matches_document_without_counters(repository):
+    # Players initialized before the counters got the default values have only the identifier
+    player_id = ObjectId()
+    await repository.bulk_upsert([(player_id, {})])
+
+    updated = await repository.update(StatisticsUpdate(
+        player_id, set_values={'total_games': 3, 'wins': 2},
+        not_greater={'total_games': 3, 'wins': 2}
+    ))
+
+    assert updated is not None
+    assert (updated['total_games'], updated['wins']) == (3, 2)
+    assert 'loses' not in updated
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_increments_and_clamps_values(repository):
+    winner, loser = ObjectId(), ObjectId()
+    await repository.upsert(winner, {'total_games': 5, 'wins': 2, 'rating': 100})
+    await repository.upsert(loser, {'total_games': 5, 'loses': 2, 'rating': 10})
+
+    await repository.bulk_update([
+        StatisticsUpdate(winner, inc_values={'total_games': 1, 'wins': 1, 'rating': 25},
+                         max_values={'wins': 1}),
+        StatisticsUpdate(loser, inc_values={'total_games': 1, 'loses': 1, 'rating': -25},
+                         non_negative=('rating', )),
+    ])
+
+    found = await repository.get_many([winner, loser])
+    assert (found[winner]['total_games'], found[winner]['wins'], found[winner]['rating']) == \
+        (6, 3, 125)
+    assert (found[loser]['total_games'], found[loser]['loses'], found[loser]['rating']) == \
+        (6, 3, 0)
+
+
+@pytest.mark.asyncio
+async def test_range_queries_follow_rating_order(repository):
+    player_ids = [ObjectId() for _ in range(4)]
+    for player_id, rating in zip(player_ids, [30, 20, 20, 10]):
+        await repository.upsert(player_id, {'rating': rating})
+
+    descending = await repository.find_by_rating()
+    assert [rating for _, rating in descending] == [30, 20, 20, 10]
+    assert await repository.find_by_rating(offset=1, limit=2) == descending[1:3]
+    assert await repository.find_by_rating(15, 25, descending=False) == descending[1:3][::-1]
+    assert await repository.find_by_rating(
+        exclude_player_ids=[player_ids[0]], limit=1
+    ) == descending[1:2]
+
+    assert await repository.count() == 4
+    assert await repository.count(greater_than=10) == 3
+    assert await repository.count(less_than=30) == 3
+    assert await repository.count(greater_than=10, less_than=30) == 2
+
+
+@pytest.mark.parametrize('repository', [
+    MemoryStatisticsRepository(),
+    MotorStatisticsRepository(document=SimpleNamespace(collection=StubCollection('statistics'))),
+], ids=['memory', 'motor'])
+@pytest.mark.asyncio
+async def test_candidates_are_merged_from_lazy_range_iterators(repository):
+    player_ids = [ObjectId() for _ in range(5)]
+    for player_id, rating in zip(player_ids, [100, 104, 97, 90, 120]):
+        await repository.upsert(player_id, {'rating': rating})
+
+    higher = [item async for item in repository.iter_by_rating(100, 110, descending=False)]
+    assert higher == [(str(player_ids[0]), 100), (str(player_ids[1]), 104)]
+
+    search = CandidateSearch(
+        SimpleNamespace(statistics_repository=repository), SimpleNamespace(loaded=False)
+    )
+    candidates = await search.find_candidates(
+        100, 15, limit=3, exclude_player_ids=[player_ids[0]]
+    )
+    assert candidates == [
+        {'player_id': str(player_ids[2]), 'rating': 97},
+        {'player_id': str(player_ids[1]), 'rating': 104},
+        {'player_id': str(player_ids[3]), 'rating': 90},
+    ]
+
+
+@pytest.mark.parametrize('repository', [
+    MemoryStatisticsRepository(),
+    MotorStatisticsRepository(document=SimpleNamespace(collection=StubCollection('statistics'))),
+], ids=['memory', 'motor'])
+@pytest.mark.asyncio
+async def test_clamped_update_is_one_write_and_counts_matched_players(repository):
+    player_id = ObjectId()
+    await repository.upsert(player_id, {'total_games': 1, 'wins': 1, 'rating': 10})
+    update = StatisticsUpdate(player_id, inc_values={'total_games': 1, 'rating': -25},
+                              max_values={'wins': 3}, non_negative=('rating', ))
+
+    raw_document = await repository.update(update)
+    assert (raw_document['total_games'], raw_document['wins'], raw_document['rating']) == \
+        (2, 3, 0)
+    assert raw_document['version'] == 2
+
+    missing = StatisticsUpdate(ObjectId(), inc_values={'total_games': 1})
+    assert await repository.bulk_update([update, missing]) == 1
+    assert (await repository.get(player_id))['version'] == 3
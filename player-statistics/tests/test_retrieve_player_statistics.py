@@ -1,3 +1,5 @@
+from datetime import datetime
+
 import pytest
 from bson import ObjectId
 from sage_utils.amqp.clients import RpcAmqpClient
@@ -83,3 +85,39 @@ async def test_worker_returns_a_not_found_error(sanic_server):
     assert error[Response.ERROR_DETAILS_FIELD_NAME] == PLAYER_NOT_FOUND_ERROR
 
     await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_windowed_statistics_on_request(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id = str(ObjectId())
+    await PlayerStatistic(player_id=player_id, total_games=10, wins=6, loses=4).commit()
+    week_start = sanic_server.app.statistics_windows.get_starts()['week']
+    await PlayerStatistic.collection.update_one({'player_id': ObjectId(player_id)}, {'$set': {
+        'windows': {
+            'week': {'start': week_start, 'total_games': 2, 'wins': 2},
+            'day': {'start': datetime(2000, 1, 1), 'total_games': 5, 'loses': 5},
+        }
+    }})
+
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload={'player_id': player_id, 'with_windows': True})
+
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert content['total_games'] == 10
+    assert set(content['windows'].keys()) == {'day', 'week', 'season'}
+    assert content['windows']['week']['total_games'] == 2
+    assert content['windows']['week']['wins'] == 2
+    assert content['windows']['day']['total_games'] == 0
+    assert content['windows']['day']['loses'] == 0
+
+    await PlayerStatistic.collection.delete_many({})
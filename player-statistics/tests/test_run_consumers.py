@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.commands.run_consumers import RunConsumersCommand
+
+
+def create_command(names):
+    command = RunConsumersCommand()
+    workers = [SimpleNamespace(name=name) for name in names]
+    command.app = SimpleNamespace(amqp=SimpleNamespace(workers=list(workers)), serves_http=True)
+    return command, workers
+
+
+def test_only_requested_workers_are_registered():
+    command, (retrieve, update, leaderboard) = create_command(
+        ['retrieve', 'update', 'leaderboard']
+    )
+
+    command.register_workers(command.select_workers(['update', 'retrieve']))
+
+    assert command.app.amqp.workers == [update, retrieve]
+    assert not command.app.serves_http
+
+
+def test_all_workers_are_selected_without_names():
+    command, workers = create_command(['retrieve', 'update'])
+
+    assert command.select_workers([]) == workers
+
+
+def test_unknown_workers_are_rejected():
+    command, _workers = create_command(['retrieve'])
+
+    with pytest.raises(SystemExit):
+        command.select_workers(['retrieve', 'unknown'])
+    assert len(command.app.amqp.workers) == 1
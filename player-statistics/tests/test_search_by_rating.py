@@ -0,0 +1,65 @@
+import pytest
+from bson import ObjectId
+from sage_utils.amqp.clients import RpcAmqpClient
+from sage_utils.constants import VALIDATION_ERROR
+from sage_utils.wrappers import Response
+
+from app.statistics.documents import PlayerStatistic
+from app.workers.search_by_rating import SearchByRatingWorker
+
+
+REQUEST_QUEUE = SearchByRatingWorker.QUEUE_NAME
+REQUEST_EXCHANGE = SearchByRatingWorker.REQUEST_EXCHANGE_NAME
+RESPONSE_EXCHANGE = SearchByRatingWorker.RESPONSE_EXCHANGE_NAME
+
+
+def get_client(app):
+    return RpcAmqpClient(
+        app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_closest_players_in_rating_range(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_ids = {}
+    for rating in [60, 80, 95, 100, 120, 200]:
+        player_id = str(ObjectId())
+        await PlayerStatistic(player_id=player_id, rating=rating).commit()
+        player_ids[rating] = player_id
+
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={
+        'rating': 100,
+        'delta': 25,
+        'limit': 3,
+        'exclude_player_ids': [player_ids[95]]
+    })
+
+    assert Response.CONTENT_FIELD_NAME in response.keys()
+    content = response[Response.CONTENT_FIELD_NAME]
+
+    assert content['players'] == [
+        {'player_id': player_ids[100], 'rating': 100},
+        {'player_id': player_ids[120], 'rating': 120},
+        {'player_id': player_ids[80], 'rating': 80},
+    ]
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_an_error_for_missing_range(sanic_server):
+    client = get_client(sanic_server.app)
+    response = await client.send(payload={'rating': 100})
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert Response.ERROR_TYPE_FIELD_NAME in error.keys()
+    assert error[Response.ERROR_TYPE_FIELD_NAME] == VALIDATION_ERROR
@@ -0,0 +1,91 @@
+from app.statistics.cache import StatisticsCache
+
+
+class FakeTimer(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_returns_stored_value():
+    cache = StatisticsCache(max_size=10, ttl=10)
+    cache.set('player', {'rating': 2500})
+
+    assert cache.get('player') == {'rating': 2500}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 0
+
+
+def test_cache_evicts_least_recently_used_value():
+    cache = StatisticsCache(max_size=2, ttl=10)
+    cache.set('first', {'rating': 1})
+    cache.set('second', {'rating': 2})
+    cache.get('first')
+    cache.set('third', {'rating': 3})
+
+    assert cache.get('second') is None
+    assert cache.get('first') == {'rating': 1}
+    assert cache.get('third') == {'rating': 3}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_expires_values_after_ttl():
+    timer = FakeTimer()
+    cache = StatisticsCache(max_size=10, ttl=5, timer=timer)
+    cache.set('player', {'rating': 2500})
+
+    timer.now = 5
+    assert cache.get('player') is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['misses'] == 1
+    assert len(cache) == 0
+
+
+def test_cache_invalidates_value():
+    cache = StatisticsCache(max_size=10, ttl=10)
+    cache.set('player', {'rating': 2500})
+    cache.invalidate('player')
+
+    assert cache.get('player') is None
+
+
+def test_disabled_cache_does_not_store_values():
+    cache = StatisticsCache(max_size=0, ttl=10)
+    cache.set('player', {'rating': 2500})
+
+    assert cache.get('player') is None
+    assert len(cache) == 0
+
+
+def test_cache_skips_value_read_before_concurrent_change():
+    cache = StatisticsCache(max_size=10, ttl=10)
+    generation = cache.get_generation()
+    # The write finishes while the reader waits for the repository
+    cache.set('player', {'rating': 2600})
+    cache.set('player', {'rating': 2500}, generation)
+    cache.set('other', {'rating': 10}, generation)
+
+    assert cache.get('player') == {'rating': 2600}
+    assert cache.get('other') == {'rating': 10}
+    assert cache.stats()['stale_skips'] == 1
+
+    generation = cache.get_generation()
+    cache.invalidate('player')
+    cache.set('player', {'rating': 2500}, generation)
+    assert cache.get('player') is None
+
+
+def test_cache_skips_value_when_change_is_forgotten():
+    cache = StatisticsCache(max_size=1, ttl=10)
+    generation = cache.get_generation()
+    cache.set('first', {'rating': 1})
+    cache.set('second', {'rating': 2})
+
+    # The change of "first" isn't tracked anymore, so any earlier read is skipped
+    cache.set('first', {'rating': 0}, generation)
+    assert cache.get('first') is None
+    cache.set('first', {'rating': 1}, cache.get_generation())
+    assert cache.get('first') == {'rating': 1}
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.metrics import WorkerMetrics
+from app.workers.connection import AmqpConnectionManager
+from app.workers.events import StatisticsEventPublisher
+
+
+class FakeChannel(object):
+    is_open = True
+
+    def __init__(self):
+        self.published = []
+
+    async def exchange_declare(self, **kwargs):
+        pass
+
+    async def publish(self, payload, exchange_name, routing_key, properties=None):
+        self.published.append((routing_key, json.loads(payload)))
+
+
+async def create_publisher(window=60.0, max_players=10000):
+    publisher = StatisticsEventPublisher(
+        SimpleNamespace(metrics=WorkerMetrics()), window=window, max_players=max_players
+    )
+    channel = FakeChannel()
+    await publisher.setup_channel(channel)
+    return publisher, channel
+
+
+def get_content(player_id, **values):
+    return dict({'id': 'x', 'player_id': player_id, 'total_games': 0, 'wins': 0, 'loses': 0,
+                 'rating': 0}, **values)
+
+
+@pytest.mark.asyncio
+async def test_changes_of_one_player_are_coalesced_into_one_event():
+    publisher, channel = await create_publisher()
+    publisher.publish(get_content('a', total_games=1, wins=1), version=1)
+    await publisher.flush()
+
+    publisher.publish(get_content('a', total_games=2, wins=2), version=2)
+    publisher.publish(get_content('a', total_games=3, wins=2, loses=1, rating=10), version=3)
+    publisher.publish(get_content('b'), version=1)
+    await publisher.flush()
+
+    assert channel.published == [
+        ('player-stats.statistic.changed.a', {
+            'player_id': 'a', 'old': None,
+            'new': {'total_games': 1, 'wins': 1, 'loses': 0, 'rating': 0},
+        }),
+        ('player-stats.statistic.changed.a', {
+            'player_id': 'a',
+            'old': {'total_games': 1, 'wins': 1, 'loses': 0, 'rating': 0},
+            'new': {'total_games': 3, 'wins': 2, 'loses': 1, 'rating': 10},
+        }),
+        ('player-stats.statistic.changed.b', {
+            'player_id': 'b', 'old': None,
+            'new': {'total_games': 0, 'wins': 0, 'loses': 0, 'rating': 0},
+        }),
+    ]
+    assert publisher.metrics.get(status='coalesced') == 1
+    assert publisher.metrics.get(status='published') == 3
+
+
+@pytest.mark.asyncio
+async def test_unchanged_statistics_are_not_published():
+    publisher, channel = await create_publisher(max_players=1)
+    publisher.publish(get_content('a', rating=5), version=1)
+    publisher.publish(get_content('b', rating=5), version=1)
+    await publisher.flush()
+
+    # Only the latest player is remembered, and the write didn't change its version
+    publisher.publish(get_content('a', rating=5), version=1)
+    publisher.publish(get_content('b', rating=5), version=1)
+    await publisher.flush()
+
+    assert [routing_key for routing_key, _event in channel.published] == [
+        'player-stats.statistic.changed.a',
+        'player-stats.statistic.changed.b',
+        'player-stats.statistic.changed.a',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_old_values_are_sent_only_for_the_next_version():
+    publisher, channel = await create_publisher()
+    publisher.publish(get_content('a', wins=1), version=1)
+    await publisher.flush()
+
+    # Another process wrote the versions 2 and 3
+    publisher.publish(get_content('a', wins=1), version=4)
+    await publisher.flush()
+    publisher.publish(get_content('a', wins=2), version=5)
+    await publisher.flush()
+
+    assert [event['old'] for _routing_key, event in channel.published] == [
+        None, None, {'wins': 1}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pending_events_are_published_after_the_window():
+    publisher, channel = await create_publisher(window=0.01)
+    publisher.publish(get_content('a', wins=1))
+    assert channel.published == []
+
+    await asyncio.sleep(0.05)
+
+    assert [event['new']['wins'] for _routing_key, event in channel.published] == [1]
+
+
+@pytest.mark.asyncio
+async def test_changes_received_during_slow_flush_are_published():
+    publisher, channel = await create_publisher(window=0.01)
+    publish = channel.publish
+
+    async def slow_publish(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        await publish(*args, **kwargs)
+
+    channel.publish = slow_publish
+    publisher.publish(get_content('a'), version=1)
+    await asyncio.sleep(0.02)
+    # The timer fires while the previous flush is still publishing
+    publisher.publish(get_content('b'), version=1)
+    await asyncio.sleep(0.2)
+
+    assert [event['player_id'] for _routing_key, event in channel.published] == ['a', 'b']
+
+
+@pytest.mark.asyncio
+async def test_drain_publishes_pending_events():
+    publisher, channel = await create_publisher(window=60.0)
+    publisher.publish(get_content('a', wins=1))
+
+    await publisher.drain(timeout=1)
+
+    assert len(channel.published) == 1
+    assert publisher._timer is None
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_publishers_after_consumers():
+    calls = []
+    manager = AmqpConnectionManager(SimpleNamespace())
+
+    class Drained(object):
+        def __init__(self, name):
+            self.name = name
+
+        async def drain(self, timeout):
+            calls.append(self.name)
+
+    publisher, consumer = Drained('publisher'), Drained('consumer')
+    manager.workers = [publisher, consumer]
+    manager.publishers = [publisher]
+
+    await manager.shutdown(timeout=1)
+
+    assert calls == ['consumer', 'publisher']
+    assert manager.workers == [] and manager.publishers == []
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.statistics.documents import PlayerStatistic
+from app.statistics.reader import StatisticsReader
+
+
+def test_etag_depends_on_ids_and_versions_of_requested_documents():
+    player_ids = [ObjectId(), ObjectId()]
+    _id = ObjectId()
+    raw_documents = {player_ids[0]: {'_id': _id, 'version': 3}}
+
+    assert StatisticsReader.get_etag(player_ids[:1], raw_documents) == '"{}-3"'.format(_id)
+    etag = StatisticsReader.get_etag(player_ids, raw_documents)
+    assert etag != StatisticsReader.get_etag(
+        player_ids, {player_ids[0]: {'_id': _id, 'version': 4}}
+    )
+    assert etag != StatisticsReader.get_etag(player_ids[::-1], raw_documents)
+
+    # The same version of the document created again
+    recreated = {player_ids[0]: {'_id': ObjectId(), 'version': 3}}
+    assert StatisticsReader.get_etag(player_ids[:1], recreated) != \
+        StatisticsReader.get_etag(player_ids[:1], raw_documents)
+    assert StatisticsReader.get_etag(player_ids, recreated) != etag
+
+
+def test_not_modified_checks_etag_before_modification_time():
+    last_modified = datetime(2019, 3, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+    assert StatisticsReader.is_not_modified({'If-None-Match': '"2", "3"'}, '"3"', last_modified)
+    assert StatisticsReader.is_not_modified({'If-None-Match': 'W/"3"'}, '"3"', last_modified)
+    assert not StatisticsReader.is_not_modified({
+        'If-None-Match': '"2"', 'If-Modified-Since': 'Fri, 01 Mar 2019 12:00:00 GMT'
+    }, '"3"', last_modified)
+    assert StatisticsReader.is_not_modified(
+        {'If-Modified-Since': 'Fri, 01 Mar 2019 12:00:00 GMT'}, '"3"', last_modified
+    )
+    assert not StatisticsReader.is_not_modified(
+        {'If-Modified-Since': 'Fri, 01 Mar 2019 11:59:59 GMT'}, '"3"', last_modified
+    )
+    assert not StatisticsReader.is_not_modified({'If-Modified-Since': 'invalid'}, '"3"', None)
+
+
+@pytest.mark.asyncio
+async def test_http_route_returns_statistic_with_caching_headers(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+    player_id = ObjectId()
+    await sanic_server.app.statistics_repository.upsert(player_id, {'total_games': 1})
+
+    url = '/player-statistics/api/statistics/{}'.format(player_id)
+    response = await sanic_server.get(url)
+    assert response.status == 200
+    content = await response.json()
+    assert content['player_id'] == str(player_id)
+    assert 'version' not in content
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    response = await sanic_server.get(url, headers={'If-None-Match': etag})
+    assert response.status == 304
+
+    await sanic_server.app.statistics_repository.upsert(player_id, {'total_games': 2})
+    response = await sanic_server.get(url, headers={'If-None-Match': etag})
+    assert response.status == 200
+    assert response.headers['ETag'] != etag
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_http_route_returns_not_found_for_unknown_player(sanic_server):
+    response = await sanic_server.get('/player-statistics/api/statistics/{}'.format(ObjectId()))
+    assert response.status == 404
+
+
+@pytest.mark.asyncio
+async def test_http_route_returns_batch_of_statistics(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+    player_id, missing_id = ObjectId(), ObjectId()
+    await sanic_server.app.statistics_repository.upsert(player_id, {'total_games': 1})
+
+    url = '/player-statistics/api/statistics?player_ids={},{}'.format(player_id, missing_id)
+    response = await sanic_server.get(url)
+    assert response.status == 200
+    content = await response.json()
+    assert [statistic['player_id'] for statistic in content['found']] == [str(player_id)]
+    assert content['missing'] == [str(missing_id)]
+
+    response = await sanic_server.get(url, headers={'If-None-Match': response.headers['ETag']})
+    assert response.status == 304
+
+    response = await sanic_server.get('/player-statistics/api/statistics?player_ids=invalid')
+    assert response.status == 400
+
+    await PlayerStatistic.collection.delete_many({})
@@ -0,0 +1,134 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.statistics.repositories import MemoryStatisticsRepository, MotorStatisticsRepository, \
+    StatisticsUpdate
+from app.statistics.windows import StatisticsWindows
+from benchmarks.stubs import StubCollection
+
+
+NOW = datetime(2026, 10, 18, 15, 30)
+
+
+def test_windows_start_at_day_week_and_season_boundaries():
+    windows = StatisticsWindows(season_start=datetime(2026, 1, 1), season_length=91)
+
+    assert windows.get_starts(NOW) == {
+        'day': datetime(2026, 10, 18),
+        'week': datetime(2026, 10, 12),
+        'season': datetime(2026, 10, 1),
+    }
+
+
+def test_unknown_windows_are_rejected():
+    with pytest.raises(ValueError):
+        StatisticsWindows(names=['day', 'month'])
+
+
+def test_dump_reports_ended_windows_as_zeros():
+    windows = StatisticsWindows(names=['day', 'week'])
+    raw_document = {'windows': {
+        'day': {'start': datetime(2026, 10, 17), 'total_games': 3, 'wins': 2, 'loses': 1},
+        'week': {'start': datetime(2026, 10, 12), 'total_games': 5, 'wins': 3},
+    }}
+
+    assert windows.dump(raw_document, NOW) == {
+        'day': {'start': '2026-10-18T00:00:00Z', 'total_games': 0, 'wins': 0, 'loses': 0},
+        'week': {'start': '2026-10-12T00:00:00Z', 'total_games': 5, 'wins': 3, 'loses': 0},
+    }
+
+
+def get_update(player_id, window_starts):
+    return StatisticsUpdate(
+        player_id, inc_values={'total_games': 1, 'wins': 1},
+        window_starts=window_starts, window_inc_values={'total_games': 1, 'wins': 1}
+    )
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_resets_counters_of_new_window():
+    repository = MemoryStatisticsRepository()
+    player_id = ObjectId()
+    await repository.upsert(player_id, {'total_games': 10, 'wins': 5})
+    yesterday, today = datetime(2026, 10, 17), datetime(2026, 10, 18)
+
+    await repository.bulk_update([get_update(player_id, {'day': yesterday})] * 2)
+    raw_document = await repository.update(get_update(player_id, {'day': today}))
+
+    assert raw_document['total_games'] == 13
+    assert raw_document['windows'] == {'day': {'start': today, 'total_games': 1, 'wins': 1}}
+
+
+@pytest.mark.asyncio
+async def test_motor_repository_resets_windows_in_the_same_update():
+    collection = StubCollection('statistics')
+    repository = MotorStatisticsRepository(document=SimpleNamespace(collection=collection))
+    player_id = ObjectId()
+    await repository.upsert(player_id, {'total_games': 10, 'wins': 5})
+    yesterday, today = datetime(2026, 10, 17), datetime(2026, 10, 18)
+
+    assert await repository.bulk_update([get_update(player_id, {'day': yesterday})] * 2) == 2
+    raw_document = await repository.update(get_update(player_id, {'day': today}))
+
+    assert raw_document['total_games'] == 13
+    assert raw_document['windows'] == {'day': {'start': today, 'total_games': 1, 'wins': 1}}
+    # One pipeline update: the reset and the increments can't be split by another write
+    operation = repository.get_operation(get_update(player_id, {'day': today}))
+    assert isinstance(operation._doc, list)
+
+
+def test_update_options_are_given_only_for_windowed_fields():
+    windows = StatisticsWindows(names=['day'])
+
+    assert windows.get_update_options({'rating': 10}, NOW) == {}
+    assert windows.get_update_options({'wins': 3, 'rating': 10}, NOW) == {
+        'window_starts': {'day': datetime(2026, 10, 18)}, 'window_fields': ('wins', ),
+    }
+    assert StatisticsWindows(names=[]).get_update_options({'wins': 3}, NOW) == {}
+
+
+@pytest.mark.parametrize('repository', [
+    MemoryStatisticsRepository(),
+    MotorStatisticsRepository(document=SimpleNamespace(collection=StubCollection('statistics'))),
+], ids=['memory', 'motor'])
+@pytest.mark.asyncio
+async def test_absolute_updates_add_the_change_to_windows(repository):
+    player_id = ObjectId()
+    await repository.upsert(player_id, {'total_games': 10, 'wins': 5, 'loses': 5})
+    yesterday, today = {'day': datetime(2026, 10, 17)}, {'day': datetime(2026, 10, 18)}
+
+    await repository.update(get_update(player_id, yesterday))
+    await repository.update(StatisticsUpdate(
+        player_id, set_values={'total_games': 14, 'loses': 7}, window_starts=today,
+        window_fields=('total_games', 'loses')
+    ))
+    raw_document = await repository.update(StatisticsUpdate(
+        player_id, max_values={'total_games': 13, 'wins': 7}, window_starts=today,
+        window_fields=('total_games', 'wins')
+    ))
+
+    assert raw_document['total_games'] == 14
+    assert raw_document['windows'] == {
+        'day': {'start': today['day'], 'total_games': 3, 'wins': 1, 'loses': 2},
+    }
+
+
+@pytest.mark.parametrize('repository', [
+    MemoryStatisticsRepository(),
+    MotorStatisticsRepository(document=SimpleNamespace(collection=StubCollection('statistics'))),
+], ids=['memory', 'motor'])
+@pytest.mark.asyncio
+async def test_init_resets_windows_with_lifetime_counters(repository):
+    player_id = ObjectId()
+    await repository.upsert(player_id, {'total_games': 10, 'wins': 5})
+    await repository.update(get_update(player_id, {'week': datetime(2026, 10, 12)}))
+
+    kept = await repository.upsert(player_id, {'total_games': 0, 'wins': 0}, only_if_absent=True)
+    reset = await repository.upsert(player_id, {'total_games': 0, 'wins': 0})
+
+    assert kept['windows']['week']['wins'] == 1
+    assert reset['wins'] == 0
+    assert 'windows' not in reset
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from sage_utils.constants import VALIDATION_ERROR, NOT_FOUND_ERROR
+
+from app.statistics.documents import PlayerStatistic
+from app.statistics.repositories import MemoryStatisticsRepository, StatisticsUpdate
+from app.statistics.schemas import UpdatePlayerStatisticSchema
+from app.statistics.windows import StatisticsWindows
+from app.workers.update_buffer import UpdateBuffer
+
+
+def test_update_keeps_monotonic_fields_from_decreasing():
+    buffer = UpdateBuffer(None, None, UpdatePlayerStatisticSchema(), None, None)
+    update = buffer.get_update('player', {'total_games': 5, 'wins': 3, 'rating': 10})
+
+    assert update == StatisticsUpdate(
+        'player',
+        max_values={'total_games': 5, 'wins': 3},
+        set_values={'rating': 10}
+    )
+
+
+def test_update_without_monotonic_fields():
+    buffer = UpdateBuffer(None, None, UpdatePlayerStatisticSchema(), None, None)
+    update = buffer.get_update('player', {'rating': 10})
+
+    assert update == StatisticsUpdate('player', set_values={'rating': 10})
+    assert not update.max_values
+
+
+def create_buffer(repository, changes, window=60.0, max_size=100):
+    return UpdateBuffer(
+        repository,
+        PlayerStatistic,
+        UpdatePlayerStatisticSchema(),
+        lambda content, version, rating_changed: changes.append(content),
+        'Player was not found.',
+        window=window,
+        max_size=max_size
+    )
+
+
+async def create_player(repository, **values):
+    player_id = ObjectId()
+    await repository.upsert(player_id, dict(
+        {'total_games': 0, 'wins': 0, 'loses': 0, 'rating': 0}, **values
+    ))
+    return player_id
+
+
+@pytest.mark.asyncio
+async def test_updates_of_the_same_player_are_merged_into_one_write():
+    repository = MemoryStatisticsRepository()
+    changes = []
+    buffer = create_buffer(repository, changes, max_size=2)
+    player_id = await create_player(repository, total_games=1)
+
+    first, second = await asyncio.gather(
+        buffer.submit(player_id, {'total_games': 2, 'rating': 10}),
+        buffer.submit(player_id, {'wins': 1}),
+    )
+
+    assert first.data['content']['total_games'] == 2
+    assert first.data['content']['wins'] == 0
+    assert second.data['content']['wins'] == 1
+    assert second.data['content']['rating'] == 10
+    assert (await repository.get(player_id))['version'] == 2
+    assert changes == [second.data['content']]
+
+
+@pytest.mark.asyncio
+async def test_errors_are_reported_in_the_arrival_order():
+    repository = MemoryStatisticsRepository()
+    buffer = create_buffer(repository, [], max_size=4)
+    player_id = await create_player(repository, total_games=5)
+
+    responses = await asyncio.gather(
+        buffer.submit(ObjectId(), {'total_games': 1}),
+        buffer.submit(player_id, {'total_games': 7}),
+        buffer.submit(player_id, {'total_games': 6}),
+        buffer.submit(player_id, {'total_games': 8}),
+    )
+
+    assert responses[0].data['error']['type'] == NOT_FOUND_ERROR
+    assert responses[1].data['content']['total_games'] == 7
+    # Validated against the previous update of the same batch
+    assert responses[2].data['error']['type'] == VALIDATION_ERROR
+    assert responses[3].data['content']['total_games'] == 8
+
+
+@pytest.mark.asyncio
+async def test_responses_have_greater_values_written_by_another_process():
+    repository = MemoryStatisticsRepository()
+    changes = []
+    buffer = create_buffer(repository, changes, max_size=2)
+    player_id = await create_player(repository, total_games=1)
+    get_many = repository.get_many
+
+    async def get_many_and_write_concurrently(player_ids):
+        states = await get_many(player_ids)
+        repository.get_many = get_many
+        await repository.upsert(player_id, {'total_games': 20, 'wins': 0, 'loses': 0, 'rating': 0})
+        return states
+
+    repository.get_many = get_many_and_write_concurrently
+    first, second = await asyncio.gather(
+        buffer.submit(player_id, {'total_games': 5}),
+        buffer.submit(player_id, {'total_games': 6, 'rating': 3}),
+    )
+
+    assert first.data['content']['total_games'] == 20
+    assert second.data['content']['total_games'] == 20
+    assert second.data['content']['rating'] == 3
+    assert changes[0]['total_games'] == 20
+
+
+@pytest.mark.asyncio
+async def test_all_responses_fail_when_the_flush_fails():
+    repository = MemoryStatisticsRepository()
+    buffer = create_buffer(repository, [], max_size=2)
+    player_id = await create_player(repository)
+
+    async def bulk_update(updates, durable=False):
+        raise RuntimeError('write failed')
+
+    repository.bulk_update = bulk_update
+    results = await asyncio.gather(
+        buffer.submit(player_id, {'wins': 1}),
+        buffer.submit(ObjectId(), {'wins': 1}),
+        return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+
+
+@pytest.mark.asyncio
+async def test_changes_report_whether_the_rating_was_changed():
+    repository = MemoryStatisticsRepository()
+    changes = []
+    buffer = UpdateBuffer(
+        repository, PlayerStatistic, UpdatePlayerStatisticSchema(),
+        lambda content, version, rating_changed: changes.append(rating_changed),
+        'Player was not found.', max_size=3
+    )
+    player_ids = [await create_player(repository, rating=10) for _ in range(3)]
+
+    await asyncio.gather(
+        buffer.submit(player_ids[0], {'wins': 1}),
+        buffer.submit(player_ids[1], {'rating': 10}),
+        buffer.submit(player_ids[2], {'rating': 20}),
+    )
+
+    assert sorted(changes) == [False, False, True]
+
+
+@pytest.mark.asyncio
+async def test_merged_updates_add_the_change_to_windows():
+    repository = MemoryStatisticsRepository()
+    buffer = UpdateBuffer(
+        repository, PlayerStatistic, UpdatePlayerStatisticSchema(),
+        lambda content, version, rating_changed: None, 'Player was not found.',
+        windows=StatisticsWindows(names=['day']), max_size=2
+    )
+    player_id = await create_player(repository, total_games=10, wins=5)
+
+    await asyncio.gather(
+        buffer.submit(player_id, {'total_games': 11, 'wins': 6}),
+        buffer.submit(player_id, {'total_games': 12, 'loses': 1}),
+    )
+
+    counters = (await repository.get(player_id))['windows']['day']
+    assert {field: counters[field] for field in ('total_games', 'wins', 'loses')} == {
+        'total_games': 2, 'wins': 1, 'loses': 1,
+    }
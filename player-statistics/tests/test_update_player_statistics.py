@@ -163,3 +163,80 @@ async def test_worker_returns_no_changed_player_statistics(sanic_server):
     assert content['rating'] == update_data['rating']
 
     await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_an_error_for_decreased_values(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    player_id = str(ObjectId())
+    create_data = {
+        'player_id': player_id,
+        'total_games': 10,
+        'wins': 5,
+        'loses': 5,
+        'rating': 2500
+    }
+    object = PlayerStatistic(**create_data)
+    await object.commit()
+
+    update_data = deepcopy(create_data)
+    update_data.update({
+        'total_games': 11,
+        'wins': 4,
+        'rating': 2400
+    })
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload=update_data)
+
+    assert Response.EVENT_FIELD_NAME in response.keys()
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert error['type'] == VALIDATION_ERROR
+    assert error['details'] == {
+        'wins': ["The passed value='4' must be greater or equal to the current."]
+    }
+
+    document = await PlayerStatistic.find_one({'player_id': ObjectId(player_id)})
+    assert document.total_games == create_data['total_games']
+    assert document.wins == create_data['wins']
+    assert document.rating == create_data['rating']
+
+    await PlayerStatistic.collection.delete_many({})
+
+
+@pytest.mark.asyncio
+async def test_worker_returns_a_not_found_error(sanic_server):
+    await PlayerStatistic.collection.delete_many({})
+
+    update_data = {
+        'player_id': str(ObjectId()),
+        'total_games': 10,
+        'wins': 5,
+        'loses': 5,
+        'rating': 2500
+    }
+    client = RpcAmqpClient(
+        sanic_server.app,
+        routing_key=REQUEST_QUEUE,
+        request_exchange=REQUEST_EXCHANGE,
+        response_queue='',
+        response_exchange=RESPONSE_EXCHANGE
+    )
+    response = await client.send(payload=update_data)
+
+    assert Response.ERROR_FIELD_NAME in response.keys()
+    error = response[Response.ERROR_FIELD_NAME]
+
+    assert error['type'] == NOT_FOUND_ERROR
+    assert error['details'] == PLAYER_NOT_FOUND_ERROR
+
+    players_count = await PlayerStatistic.collection.count_documents({})
+    assert players_count == 0
@@ -0,0 +1,130 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sage_utils.wrappers import Response
+
+from app.metrics import WorkerMetrics
+from app.workers.base import BaseStatisticsWorker
+
+
+class FakeChannel(object):
+    is_open = True
+
+    def __init__(self):
+        self.calls = []
+
+    async def queue_declare(self, **kwargs):
+        pass
+
+    async def queue_bind(self, **kwargs):
+        pass
+
+    async def basic_qos(self, **kwargs):
+        pass
+
+    async def basic_consume(self, callback, queue_name=''):
+        return {'consumer_tag': 'ctag'}
+
+    async def basic_cancel(self, consumer_tag, no_wait=False):
+        self.calls.append(('cancel', consumer_tag))
+
+    async def publish(self, payload, exchange_name, routing_key, properties=None,
+                      mandatory=False):
+        self.calls.append(('publish', properties['correlation_id']))
+
+    async def basic_client_ack(self, delivery_tag, multiple=False):
+        self.calls.append(('ack', delivery_tag, multiple))
+
+    async def basic_client_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.calls.append(('nack', delivery_tag, requeue))
+
+
+class SlowWorker(BaseStatisticsWorker):
+    QUEUE_NAME = 'player-stats.statistic.slow'
+    CONFIG_PREFIX = 'SLOW_WORKER'
+
+    def __init__(self, app, delay):
+        super(SlowWorker, self).__init__(app)
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def get_response(self, data):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        return Response.with_content(data)
+
+
+async def create_worker(delay, max_in_flight=None):
+    app = SimpleNamespace(
+        loop=asyncio.get_event_loop(),
+        metrics=WorkerMetrics(),
+        config={
+            'SLOW_WORKER_PREFETCH_COUNT': 10,
+            'SLOW_WORKER_MAX_IN_FLIGHT': max_in_flight,
+            'AMQP_ACK_BATCH_SIZE': 100,
+            'AMQP_ACK_BATCH_DELAY': 60000,
+        }
+    )
+    worker = SlowWorker(app, delay)
+    worker.in_flight_semaphore = asyncio.Semaphore(worker.max_in_flight)
+    channel = FakeChannel()
+    await worker.setup_channel(channel)
+    return worker, channel
+
+
+async def deliver(worker, channel, delivery_tag):
+    await worker.consume_callback(
+        channel,
+        b'{}',
+        SimpleNamespace(delivery_tag=delivery_tag, is_redeliver=False),
+        SimpleNamespace(content_type='application/json', correlation_id=str(delivery_tag),
+                        reply_to='client')
+    )
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_in_flight_requests():
+    worker, channel = await create_worker(delay=0.05)
+    for delivery_tag in range(1, 4):
+        await deliver(worker, channel, delivery_tag)
+
+    await worker.drain(timeout=5)
+
+    assert channel.calls[0] == ('cancel', 'ctag')
+    assert sorted(call for call in channel.calls if call[0] == 'publish') == \
+        [('publish', '1'), ('publish', '2'), ('publish', '3')]
+    assert channel.calls[-1] == ('ack', 3, True)
+    assert not worker.tasks
+
+
+@pytest.mark.asyncio
+async def test_drain_gives_up_after_timeout_and_rejects_new_messages():
+    worker, channel = await create_worker(delay=60)
+    await deliver(worker, channel, 1)
+
+    await worker.drain(timeout=0.01)
+    await deliver(worker, channel, 2)
+
+    assert not worker.tasks
+    assert ('publish', '1') not in channel.calls
+    assert ('ack', 1, True) not in channel.calls
+    assert channel.calls[-1] == ('nack', 2, True)
+
+
+@pytest.mark.asyncio
+async def test_in_flight_limit_caps_concurrent_requests_below_prefetch_count():
+    worker, channel = await create_worker(delay=0.02, max_in_flight=2)
+    for delivery_tag in range(1, 6):
+        await deliver(worker, channel, delivery_tag)
+    assert len(worker.tasks) == 5
+
+    await asyncio.wait(list(worker.tasks))
+
+    assert worker.max_running == 2
+    assert len([call for call in channel.calls if call[0] == 'publish']) == 5